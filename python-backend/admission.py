@@ -0,0 +1,314 @@
+"""
+Admission control for expensive routes.
+
+Each rule matches a path prefix and can apply:
+- a concurrency limit with a bounded wait queue: requests beyond
+  `concurrency` wait up to `queue_timeout` seconds for a slot; when
+  `max_queue` requests are already waiting, the request is shed at once
+  with 503 + Retry-After (estimated from recent service times).
+- a per-user token bucket (`rate_per_minute`, `burst`): over the limit the
+  request gets 429 + Retry-After. Users are identified by the subject of a
+  verified Supabase access token (Authorization: Bearer, checked against
+  SUPABASE_JWT_SECRET), else by client address. Client-supplied values
+  (`user_id` parameters, X-Forwarded-For) never pick the bucket on their
+  own: X-Forwarded-For is only read when the connecting peer is one of
+  ADMISSION_TRUSTED_PROXIES, and then the nearest hop it didn't add is used.
+
+Routes no rule matches (status checks, /metrics, cheap reads) pass straight
+through, so they stay fast while heavy routes degrade. Limits are per
+process; with several workers each enforces its own.
+
+Rules are the defaults below, optionally overridden per prefix with JSON:
+  ADMISSION_RULES='{"/summarize-update": {"concurrency": 4}, "/api/spotify/": null}'
+(null removes a rule).
+
+Env (python-backend/.env):
+  ADMISSION_CONTROL=1                       # 0 disables the middleware
+  ADMISSION_RULES=...                       # JSON overrides, see above
+  ADMISSION_TRUSTED_PROXIES=10.0.0.0/8,...  # peers whose X-Forwarded-For is trusted (IPs or CIDRs)
+  SUPABASE_JWT_SECRET=...                   # HS256 secret used to verify access tokens
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+import metrics
+from cache_utils import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("ADMISSION_CONTROL", "1") not in ("0", "false", "no")
+JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
+
+
+@dataclass
+class Rule:
+    prefix: str
+    concurrency: Optional[int] = None  # None: no concurrency limit
+    max_queue: int = 0
+    queue_timeout: float = 5.0
+    rate_per_minute: Optional[float] = None  # None: no per-user rate limit
+    burst: int = 1
+    # Cheap paths under the prefix that are never limited.
+    exempt_suffixes: tuple[str, ...] = ("/status", "/disconnect")
+
+
+DEFAULT_RULES = [
+    # LLM-bound.
+    Rule("/summarize-update", concurrency=8, max_queue=16, queue_timeout=10.0, rate_per_minute=6, burst=3),
+    Rule("/api/wrap/", concurrency=8, max_queue=16, queue_timeout=10.0, rate_per_minute=12, burst=4),
+    # Provider proxies: protect the upstream quotas.
+    Rule("/api/spotify/", concurrency=32, max_queue=64, queue_timeout=5.0, rate_per_minute=60, burst=20),
+    Rule("/api/strava/", concurrency=16, max_queue=32, queue_timeout=5.0, rate_per_minute=30, burst=10),
+    Rule("/api/google/", concurrency=32, max_queue=64, queue_timeout=5.0, rate_per_minute=60, burst=20),
+    Rule("/api/timeline", concurrency=32, max_queue=64, queue_timeout=5.0, rate_per_minute=120, burst=30),
+    Rule("/api/dashboard", concurrency=32, max_queue=64, queue_timeout=5.0, rate_per_minute=60, burst=20),
+    # Login warm-up: a handful per user is plenty.
+    Rule("/api/prefetch", concurrency=16, max_queue=32, queue_timeout=5.0, rate_per_minute=6, burst=3),
+]
+
+
+def load_rules() -> list[Rule]:
+    rules = {rule.prefix: rule for rule in DEFAULT_RULES}
+    raw = os.getenv("ADMISSION_RULES")
+    if raw:
+        try:
+            overrides = json.loads(raw)
+            for prefix, values in overrides.items():
+                if values is None:
+                    rules.pop(prefix, None)
+                    continue
+                if "exempt_suffixes" in values:
+                    values["exempt_suffixes"] = tuple(values["exempt_suffixes"])
+                rules[prefix] = replace(rules.get(prefix) or Rule(prefix), **values)
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.error("Ignoring invalid ADMISSION_RULES: %s", e)
+    # Longest prefix wins.
+    return sorted(rules.values(), key=lambda rule: len(rule.prefix), reverse=True)
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = max(1, retry_after)
+
+
+@dataclass
+class RouteLimiter:
+    rule: Rule
+    active: int = 0
+    waiting: int = 0
+    # EWMA of seconds per request, for Retry-After estimates.
+    avg_seconds: float = 1.0
+    _semaphore: Optional[asyncio.Semaphore] = None
+    _buckets: TTLCache = field(default_factory=lambda: TTLCache(maxsize=50_000, ttl=15 * 60))
+
+    def _retry_after_busy(self) -> int:
+        slots = self.rule.concurrency or 1
+        return math.ceil(self.avg_seconds * (self.waiting + 1) / slots)
+
+    def take_token(self, user_key: str) -> None:
+        rule = self.rule
+        if not rule.rate_per_minute:
+            return
+        rate = rule.rate_per_minute / 60.0
+        now = time.monotonic()
+        tokens, last = self._buckets.get(user_key) or (float(rule.burst), now)
+        tokens = min(float(rule.burst), tokens + (now - last) * rate)
+        if tokens < 1.0:
+            self._buckets.set(user_key, (tokens, now))
+            raise Rejected(429, "rate_limited", math.ceil((1.0 - tokens) / rate))
+        self._buckets.set(user_key, (tokens - 1.0, now))
+
+    async def acquire(self) -> None:
+        if not self.rule.concurrency:
+            self.active += 1
+            return
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.rule.concurrency)
+        if self._semaphore.locked():
+            if self.waiting >= self.rule.max_queue:
+                raise Rejected(503, "queue_full", self._retry_after_busy())
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.rule.queue_timeout)
+            except asyncio.TimeoutError:
+                raise Rejected(503, "queue_timeout", self._retry_after_busy())
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+
+    def release(self, elapsed: float) -> None:
+        self.active -= 1
+        self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * elapsed
+        if self._semaphore is not None and self.rule.concurrency:
+            self._semaphore.release()
+
+
+admission_rejections = metrics.Counter(
+    "admission_rejections_total",
+    "Requests shed by admission control, by rule and reason.",
+    ("rule", "reason"),
+)
+
+_limiters: dict[str, RouteLimiter] = {}
+
+
+def _collect_metrics():
+    limiters = list(_limiters.values())
+    yield (
+        "admission_active_requests",
+        "gauge",
+        "Requests holding an admission slot, by rule.",
+        [({"rule": limiter.rule.prefix}, limiter.active) for limiter in limiters],
+    )
+    yield (
+        "admission_queued_requests",
+        "gauge",
+        "Requests waiting for an admission slot, by rule.",
+        [({"rule": limiter.rule.prefix}, limiter.waiting) for limiter in limiters],
+    )
+
+
+metrics.register_collector(_collect_metrics)
+
+
+def load_trusted_proxies() -> list:
+    networks = []
+    for value in (os.getenv("ADMISSION_TRUSTED_PROXIES") or "").split(","):
+        if value.strip():
+            try:
+                networks.append(ipaddress.ip_network(value.strip(), strict=False))
+            except ValueError:
+                logger.error("Ignoring invalid ADMISSION_TRUSTED_PROXIES entry: %s", value)
+    return networks
+
+
+TRUSTED_PROXIES = load_trusted_proxies()
+
+
+def _trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def verified_subject(token: str) -> Optional[str]:
+    """`sub` of an unexpired HS256 Supabase access token signed with JWT_SECRET, else None."""
+    if not JWT_SECRET:
+        return None
+    try:
+        header, payload, signature = token.split(".")
+        if json.loads(_b64decode(header)).get("alg") != "HS256":
+            return None
+        expected = hmac.new(JWT_SECRET.encode(), f"{header}.{payload}".encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        claims = json.loads(_b64decode(payload))
+        if float(claims.get("exp") or 0) <= time.time():
+            return None
+    except (ValueError, TypeError, AttributeError):
+        return None
+    subject = claims.get("sub")
+    return str(subject) if subject else None
+
+
+def client_address(scope) -> str:
+    """Peer address, or the nearest X-Forwarded-For hop not added by a trusted proxy."""
+    client = scope.get("client")
+    peer = client[0] if client else "unknown"
+    if not TRUSTED_PROXIES or not _trusted(peer):
+        return peer
+    forwarded: list[str] = []
+    for key, value in scope.get("headers") or []:
+        if key == b"x-forwarded-for":
+            forwarded += [hop.strip() for hop in value.decode("latin-1").split(",") if hop.strip()]
+    for hop in reversed(forwarded):
+        if not _trusted(hop):
+            return hop
+    return forwarded[0] if forwarded else peer
+
+
+def user_key(scope) -> str:
+    for key, value in scope.get("headers") or []:
+        if key == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            subject = verified_subject(token.strip()) if scheme.lower() == "bearer" else None
+            if subject:
+                return f"user:{subject}"
+            break
+    return f"ip:{client_address(scope)}"
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, rules: Optional[list[Rule]] = None):
+        self.app = app
+        for rule in rules or load_rules():
+            _limiters[rule.prefix] = RouteLimiter(rule)
+        self.limiters = sorted(_limiters.values(), key=lambda limiter: len(limiter.rule.prefix), reverse=True)
+
+    def match(self, path: str) -> Optional[RouteLimiter]:
+        for limiter in self.limiters:
+            if path.startswith(limiter.rule.prefix):
+                if path.endswith(limiter.rule.exempt_suffixes):
+                    return None
+                return limiter
+        return None
+
+    async def __call__(self, scope, receive, send):
+        limiter = None
+        if scope["type"] == "http" and scope.get("method") != "OPTIONS":
+            limiter = self.match(scope.get("path", ""))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            limiter.take_token(user_key(scope))
+            await limiter.acquire()
+        except Rejected as rejected:
+            admission_rejections.inc(rule=limiter.rule.prefix, reason=rejected.reason)
+            await self.reject(send, rejected)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - started)
+
+    @staticmethod
+    async def reject(send, rejected: Rejected) -> None:
+        detail = "Too many requests" if rejected.status_code == 429 else "Server busy, try again shortly"
+        body = json.dumps({"detail": detail, "reason": rejected.reason}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": rejected.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(rejected.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
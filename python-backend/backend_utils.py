@@ -1,5 +1,7 @@
 import base64
 import re
+from typing import Optional
+from urllib.parse import unquote
 def _to_data_url(image_bytes: bytes, filename: str) -> str:
     ext = (filename.split(".")[-1] or "png").lower()
     if ext not in {"png","jpg","jpeg","webp","gif"}:
@@ -16,4 +18,13 @@ def clean_storage_url(u: str) -> str:
     # remove trailing punctuation that breaks fetches
     while u and u[-1] in ").,;!?\"'":
         u = u[:-1]
-    return u
\ No newline at end of file
+    return u
+
+def storage_path_from_url(url: str, bucket: str) -> Optional[str]:
+    # Supabase public/signed object URLs look like .../storage/v1/object/<public|sign>/<bucket>/<path>[?token=...]
+    u = clean_storage_url(url).split("?", 1)[0]
+    for kind in ("public", "sign", "authenticated"):
+        marker = f"/storage/v1/object/{kind}/{bucket}/"
+        if marker in u:
+            return unquote(u.split(marker, 1)[1]) or None
+    return None
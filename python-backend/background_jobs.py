@@ -0,0 +1,60 @@
+"""
+Tiny periodic-task runner for in-process background jobs.
+
+Jobs are started from the FastAPI startup hook in main.py and cancelled on
+shutdown. A failing run is logged and retried on the next tick; it never
+kills the loop. Each run gets its own trace id, so its upstream spans group
+together in the logs like a request's do.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+_tasks: dict[str, asyncio.Task] = {}
+
+
+def start_periodic(
+    name: str,
+    interval_seconds: float,
+    job: Callable[[], Awaitable[object]],
+    initial_delay: float = 0.0,
+) -> Optional[asyncio.Task]:
+    """Run `job` every `interval_seconds`. A non-positive interval disables the job."""
+    if interval_seconds <= 0 or name in _tasks:
+        return None
+
+    async def runner() -> None:
+        if initial_delay > 0:
+            await asyncio.sleep(initial_delay)
+        while True:
+            try:
+                with tracing.request_context(f"job-{name}-{tracing.new_id()}"), tracing.span(f"job.{name}"):
+                    await job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Background job failed", extra={"job": name})
+            await asyncio.sleep(interval_seconds)
+
+    task = asyncio.create_task(runner(), name=f"background:{name}")
+    _tasks[name] = task
+    return task
+
+
+def running_jobs() -> list[str]:
+    return [name for name, task in _tasks.items() if not task.done()]
+
+
+async def stop_all() -> None:
+    tasks = list(_tasks.values())
+    _tasks.clear()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
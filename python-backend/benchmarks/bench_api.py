@@ -0,0 +1,255 @@
+"""
+End-to-end API benchmark against local fakes of Supabase, OpenAI and the
+integration providers (see benchmarks/fakes.py), so latency numbers are
+reproducible and no real accounts or credentials are touched.
+
+The fake server starts first and its URLs are exported before `main` is
+imported; every client in the backend reads its base URL from the env
+(SUPABASE_URL, OPENAI_BASE_URL, SPOTIFY_API_BASE, SPOTIFY_ACCOUNTS_BASE,
+STRAVA_BASE_URL, GOOGLE_CALENDAR_API_BASE, GOOGLE_OAUTH_TOKEN_URL). Requests
+go through httpx's ASGI transport straight into main.app, so background jobs
+do not run.
+
+Run from python-backend/:
+  python benchmarks/bench_api.py [--requests 2000] [--concurrency 32]
+      [--mix summarize=1,wrap=2,spotify=3,strava=2,google=3]
+      [--db-ms 3] [--storage-ms 15] [--openai-ms 600] [--provider-ms 60]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import JWT_SECRET, FakeUpstream, Latency  # noqa: E402
+
+DEFAULT_MIX = "summarize=1,wrap=2,spotify=3,strava=2,google=3"
+PHOTO_BYTES = os.urandom(64 * 1024)
+# Fixed so a user's token (part of the coalescing key) is the same on every request.
+TOKEN_EXPIRES_AT = int(time.time()) + 24 * 60 * 60
+
+
+# ---------- Seed data ----------
+def seed(upstream: FakeUpstream, users: int, rng: random.Random) -> list[str]:
+    tables = upstream.state.tables
+    now = datetime.now(timezone.utc)
+    far_future = int((now + timedelta(days=365)).timestamp())
+    user_ids = [f"00000000-0000-4000-8000-{index:012d}" for index in range(users)]
+    for user_id in user_ids:
+        for provider in ("spotify", "strava"):
+            tables.setdefault("integrations", []).append({
+                "user_id": user_id,
+                "provider": provider,
+                "access_token": f"{provider}-token",
+                "refresh_token": f"{provider}-refresh",
+                "expires_at": far_future,
+            })
+        tables["integrations"].append({
+            "user_id": user_id,
+            "provider": "google_calendar",
+            "access_token": "google-token",
+            "refresh_token": "google-refresh",
+            "expires_at": (now + timedelta(days=365)).isoformat(),
+            "scope": "https://www.googleapis.com/auth/calendar.readonly",
+        })
+        for index in range(rng.randint(3, 12)):
+            created = now - timedelta(days=rng.randint(0, max(0, now.day - 1)), hours=rng.randint(0, 23))
+            tables.setdefault("life_updates", []).append({
+                "id": f"{user_id[-6:]}-{index}",
+                "user_id": user_id,
+                "title": f"Update {index}",
+                "user_summary": "Went climbing, cooked for friends and finally finished the book.",
+                "ai_summary": "A busy, happy week of climbing and cooking. #weekend #friends",
+                "photos": [f"{upstream.base_url}/storage/v1/object/public/photos/updates/{index}/a.jpg"],
+                "created_at": created.isoformat(),
+            })
+        for index in range(rng.randint(50, 300)):
+            played = now - timedelta(minutes=rng.randint(0, 60 * 24 * max(1, now.day - 1)))
+            tables.setdefault("spotify_plays", []).append({
+                "user_id": user_id,
+                "played_at": played.isoformat(),
+                "track_id": f"track{rng.randint(0, 60)}",
+                "duration_ms": rng.randint(120_000, 300_000),
+            })
+    return user_ids
+
+
+# ---------- Workload ----------
+def auth_headers(user_id: str) -> dict[str, str]:
+    """A Supabase-style HS256 access token, like the frontend sends."""
+    def encode(part: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(part).encode()).decode().rstrip("=")
+
+    signing_input = f"{encode({'alg': 'HS256', 'typ': 'JWT'})}.{encode({'sub': user_id, 'exp': TOKEN_EXPIRES_AT})}"
+    signature = hmac.new(JWT_SECRET.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return {"Authorization": f"Bearer {signing_input}.{base64.urlsafe_b64encode(signature).decode().rstrip('=')}"}
+
+
+async def call_summarize(client, user_id: str, rng: random.Random):
+    files = [("photos", (f"p{i}.jpg", PHOTO_BYTES, "image/jpeg")) for i in range(rng.randint(0, 3))]
+    data = {"user_summary": "Ran my first 10k and had dinner with the team.", "update_id": f"{user_id[-6:]}-bench"}
+    return await client.post("/summarize-update", data=data, files=files or None, headers=auth_headers(user_id))
+
+
+async def call_wrap(client, user_id: str, rng: random.Random):
+    return await client.get("/api/wrap/this-month", params={"user_id": user_id}, headers=auth_headers(user_id))
+
+
+async def call_spotify(client, user_id: str, rng: random.Random):
+    return await client.get(
+        "/api/spotify/top", params={"user_id": user_id, "limit": rng.choice([5, 10])}, headers=auth_headers(user_id)
+    )
+
+
+async def call_strava(client, user_id: str, rng: random.Random):
+    return await client.get(
+        "/api/strava/activities", params={"user_id": user_id, "per_page": 30}, headers=auth_headers(user_id)
+    )
+
+
+async def call_google(client, user_id: str, rng: random.Random):
+    return await client.get(
+        "/api/google/events", params={"user_id": user_id, "max_results": 25}, headers=auth_headers(user_id)
+    )
+
+
+ENDPOINTS = {
+    "summarize": ("POST /summarize-update", call_summarize),
+    "wrap": ("GET /api/wrap/this-month", call_wrap),
+    "spotify": ("GET /api/spotify/top", call_spotify),
+    "strava": ("GET /api/strava/activities", call_strava),
+    "google": ("GET /api/google/events", call_google),
+}
+
+
+def parse_mix(spec: str) -> list[tuple[str, float]]:
+    weights: list[tuple[str, float]] = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"unknown endpoint in --mix: {name} (choose from {', '.join(ENDPOINTS)})")
+        weights.append((name, float(weight or 1)))
+    return weights
+
+
+async def run(app, user_ids: list[str], args, rng: random.Random) -> tuple[dict, dict, float]:
+    import httpx
+
+    mix = parse_mix(args.mix)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    plan = [(rng.choices(names, weights)[0], rng.choice(user_ids)) for _ in range(args.requests)]
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120.0) as client:
+
+        async def worker(worker_rng: random.Random) -> None:
+            while True:
+                try:
+                    name, user_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                try:
+                    resp = await ENDPOINTS[name][1](client, user_id, worker_rng)
+                    ok = resp.status_code < 400
+                except Exception:
+                    ok = False
+                latencies[name].append(time.perf_counter() - started)
+                if not ok:
+                    errors[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(random.Random(rng.random())) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+# ---------- Report ----------
+def percentile(sorted_values: list[float], share: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(share * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def report(latencies: dict, errors: dict, elapsed: float) -> None:
+    import metrics
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"\n{total} requests in {elapsed:.2f}s ({total / elapsed:.1f} req/s)\n")
+    header = f"{'endpoint':<28}{'n':>6}{'err':>6}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)"
+    print(header)
+    print("-" * len(header))
+    for name, (label, _) in ENDPOINTS.items():
+        values = sorted(latencies.get(name, []))
+        if not values:
+            continue
+        cells = [percentile(values, share) * 1000 for share in (0.5, 0.9, 0.95, 0.99)] + [values[-1] * 1000]
+        print(f"{label:<28}{len(values):>6}{errors.get(name, 0):>6}" + "".join(f"{cell:>9.1f}" for cell in cells))
+
+    print("\nUpstream calls (client side, as seen by the backend):")
+    rows = sorted(metrics.upstream_duration.snapshot(), key=lambda row: -row[2])
+    for labels, count, total_seconds in rows:
+        if not count:
+            continue
+        name = f"{labels['service']}.{labels['operation']} [{labels['outcome']}]"
+        print(f"  {name:<52}{count:>7} calls  {total_seconds / count * 1000:>8.1f} ms avg  {total_seconds:>8.2f} s total")
+
+    all_values = [value for values in latencies.values() for value in values]
+    if len(all_values) > 1:
+        print(f"\noverall mean {statistics.mean(all_values) * 1000:.1f} ms, stdev {statistics.stdev(all_values) * 1000:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--db-ms", type=float, default=3.0)
+    parser.add_argument("--storage-ms", type=float, default=15.0)
+    parser.add_argument("--openai-ms", type=float, default=600.0)
+    parser.add_argument("--provider-ms", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    latency = Latency(db=args.db_ms, storage=args.storage_ms, openai=args.openai_ms, provider=args.provider_ms)
+    upstream = FakeUpstream(latency).start()
+    try:
+        os.environ.update(upstream.env())
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        os.environ.setdefault("TRACE_SPANS", "0")
+        user_ids = seed(upstream, args.users, rng)
+
+        import main as backend  # noqa: E402 - must follow the env overrides above
+
+        latencies, errors, elapsed = asyncio.run(run(backend.app, user_ids, args, rng))
+        report(latencies, errors, elapsed)
+        print("\nFake upstream hits:", ", ".join(f"{k}={v}" for k, v in sorted(upstream.state.calls.items())))
+    finally:
+        upstream.stop()
+
+
+if __name__ == "__main__":
+    main()
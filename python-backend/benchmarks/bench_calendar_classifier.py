@@ -0,0 +1,263 @@
+"""
+Micro-benchmark: single-pass calendar summary scanner and parse-once event
+dates vs the old per-pattern / parse-per-helper code.
+
+Run from python-backend/:
+  python benchmarks/bench_calendar_classifier.py [--events 100000]
+
+The "legacy" functions below are verbatim copies of the implementation that
+scan_summary, parse_event and describe_events replaced, kept here only for
+comparison.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routers import google_calendar as gc  # noqa: E402
+
+
+# ---------- Legacy implementation ----------
+def legacy_sanitize_summary_text(summary):
+    if not summary:
+        return "Calendar event"
+    cleaned = summary
+    for pattern in gc.SENSITIVE_PATTERNS:
+        cleaned = re.sub(pattern, "", cleaned, flags=re.IGNORECASE).strip()
+    noisy_words = ["sync", "1:1", "interview", "standup", "meeting", "touchpoint", "check-in"]
+    tokens = [
+        token for token in cleaned.split()
+        if not any(noise in token.lower() for noise in noisy_words)
+    ]
+    cleaned_final = " ".join(tokens).strip()
+    return cleaned_final or "Calendar event"
+
+
+def legacy_looks_like_work_event(summary):
+    if not summary:
+        return False
+    lowered = summary.lower()
+    return any(keyword in lowered for keyword in gc.WORK_KEYWORDS)
+
+
+def legacy_parse_calendar_date(entry: Optional[dict]) -> Optional[datetime]:
+    if not entry:
+        return None
+    value = entry.get("dateTime") or entry.get("date")
+    if not value:
+        return None
+    try:
+        iso_val = value.replace("Z", "+00:00") if isinstance(value, str) and value.endswith("Z") else value
+        return datetime.fromisoformat(iso_val)
+    except Exception:
+        return None
+
+
+def legacy_event_duration_hours(event: dict) -> Optional[float]:
+    start = legacy_parse_calendar_date(event.get("start"))
+    end = legacy_parse_calendar_date(event.get("end"))
+    if not start or not end:
+        return None
+    diff = end - start
+    return diff.total_seconds() / 3600
+
+
+def legacy_is_all_day_event(event: dict) -> bool:
+    start = event.get("start") or {}
+    end = event.get("end") or {}
+    if start.get("date") or end.get("date"):
+        return True
+    duration = legacy_event_duration_hours(event)
+    return bool(duration and duration >= 20)
+
+
+def legacy_describe_calendar_window(
+    start: Optional[dict],
+    end: Optional[dict],
+) -> str:
+    start_date = legacy_parse_calendar_date(start)
+    if not start_date:
+        return "Coming up soon"
+    bucket = "Early" if start_date.day <= 10 else "Mid" if start_date.day <= 20 else "Late"
+    month = start_date.strftime("%B")
+    short_date = start_date.strftime("%b %-d") if hasattr(start_date, "strftime") else start_date.isoformat()
+    try:
+        short_date = start_date.strftime("%b %-d")
+    except ValueError:
+        short_date = start_date.strftime("%b %d")
+
+    if start and start.get("dateTime"):
+        if hasattr(start_date, "strftime"):
+            try:
+                time_string = start_date.strftime("%-I:%M %p")
+            except ValueError:
+                time_string = start_date.strftime("%I:%M %p")
+        else:
+            time_string = None
+    else:
+        time_string = None
+
+    end_date = legacy_parse_calendar_date(end)
+    spans_multiple_days = bool(
+        end_date and abs((end_date - start_date).total_seconds()) > 60 * 60 * 24
+    )
+    if spans_multiple_days and end_date:
+        try:
+            end_short = end_date.strftime("%b %-d")
+        except ValueError:
+            end_short = end_date.strftime("%b %d")
+        return f"{bucket} {month} ({short_date} – {end_short})"
+    if time_string:
+        return f"{bucket} {month} • {time_string}"
+    return f"{bucket} {month} ({short_date})"
+
+
+def legacy_should_include_event(event: dict, settings: dict) -> bool:
+    summary = event.get("summary") or ""
+    work_event = legacy_looks_like_work_event(summary)
+    allow_work = settings.get("work_calendars", False)
+    allow_personal = settings.get("only_personal_calendars", True)
+
+    if not allow_personal and not allow_work:
+        allow_personal = True
+
+    if work_event and not allow_work:
+        return False
+    if not work_event and not allow_personal:
+        return False
+
+    all_day = legacy_is_all_day_event(event)
+    if all_day and not settings.get("include_all_day_events", True):
+        return False
+    if (not all_day) and work_event and not settings.get("include_regular_meetings", False):
+        return False
+
+    return True
+
+
+def legacy_build_event_descriptor(event: dict, settings: dict) -> dict:
+    label = legacy_sanitize_summary_text(event.get("summary"))
+    window = legacy_describe_calendar_window(event.get("start"), event.get("end"))
+    location = gc.sanitize_location_text(event.get("location"), settings.get("include_locations", False))
+    bullet = f"{window}: '{label}'"
+    if location:
+        bullet = f"{bullet} in {location}"
+    return {
+        "id": event.get("id") or f"{label}-{window}",
+        "label": label,
+        "window": window,
+        "location": location,
+        "bullet": bullet,
+    }
+
+
+def legacy_describe_events(events, settings):
+    filtered = [event for event in events if legacy_should_include_event(event, settings)]
+    return [legacy_build_event_descriptor(event, settings) for event in filtered]
+
+
+# ---------- Synthetic data ----------
+WORDS = [
+    "Dinner", "with", "Sam", "Birthday", "party", "Trip", "to", "Lisbon", "Team", "sync",
+    "Weekly", "standup", "1:1", "Client", "review", "Coffee", "Yoga", "class", "Flight",
+    "check-in", "Interview", "planning", "Concert", "Retro", "all", "hands", "Touchpoint",
+    "Brunch", "Wedding", "Q3", "status", "Dentist",
+]
+EXTRAS = [
+    "bob@corp.com", "https://meet.google.com/abc-defg-hij", "zoom.us/j/123456",
+    "555-123-4567", "meet.google.com/xyz", "(details)",
+]
+
+
+def synthetic_events(count: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    base = datetime(2026, 10, 1, tzinfo=timezone.utc)
+    events = []
+    for index in range(count):
+        words = rng.choices(WORDS, k=rng.randint(2, 6))
+        if rng.random() < 0.3:
+            words.insert(rng.randint(0, len(words)), rng.choice(EXTRAS))
+        start = base + timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+        if rng.random() < 0.15:
+            event = {
+                "start": {"date": start.date().isoformat()},
+                "end": {"date": (start + timedelta(days=rng.randint(1, 3))).date().isoformat()},
+            }
+        else:
+            event = {
+                "start": {"dateTime": start.isoformat()},
+                "end": {"dateTime": (start + timedelta(minutes=rng.choice([30, 60, 90]))).isoformat()},
+            }
+        event.update({"id": f"evt-{index}", "summary": " ".join(words)})
+        events.append(event)
+    return events
+
+
+# Work keywords straddling the end of a removed URL/email span; the random corpus
+# rarely produces these, so they are always checked.
+EDGE_SUMMARIES = [
+    "https://x.com/all hands",
+    "http://a.co/one on one",
+    "https://corp.example/weekly review",
+    "Notes at zoom.us/j/1 status update",
+    "ping bob@corp.com/client call",
+    "meet.google.com/abc one on one",
+    "review@corp.com",
+    "İstanbul planning",
+]
+
+
+def timed(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=100_000)
+    args = parser.parse_args()
+
+    events = synthetic_events(args.events)
+    summaries = [event["summary"] for event in events]
+    settings = {**gc.DEFAULT_CALENDAR_SETTINGS, "work_calendars": True, "include_regular_meetings": True}
+
+    mismatches = sum(
+        1 for summary in summaries + EDGE_SUMMARIES
+        if gc.scan_summary(summary) != (legacy_sanitize_summary_text(summary), legacy_looks_like_work_event(summary))
+    )
+
+    legacy_scan = timed(lambda: [
+        (legacy_sanitize_summary_text(s), legacy_looks_like_work_event(s)) for s in summaries
+    ])
+    new_scan = timed(lambda: [gc.scan_summary(s) for s in summaries])
+    legacy_windows = timed(lambda: [
+        legacy_describe_calendar_window(e.get("start"), e.get("end")) for e in events
+    ])
+    new_windows = timed(lambda: [gc.describe_parsed_window(gc.parse_event(e)) for e in events])
+    descriptor_mismatches = int(legacy_describe_events(events, settings) != gc.describe_events(events, settings))
+    legacy_batch = timed(legacy_describe_events, events, settings)
+    new_batch = timed(gc.describe_events, events, settings)
+
+    print(f"events: {len(events):,}  classifier mismatches vs legacy: {mismatches}  "
+          f"descriptor lists differ: {bool(descriptor_mismatches)}")
+    print(f"{'stage':<24}{'legacy (s)':>12}{'new (s)':>18}{'speedup':>10}")
+    print(f"{'summary scan':<24}{legacy_scan:>12.3f}{new_scan:>18.3f}{legacy_scan / new_scan:>9.2f}x")
+    print(f"{'dates + window label':<24}{legacy_windows:>12.3f}{new_windows:>18.3f}{legacy_windows / new_windows:>9.2f}x")
+    print(f"{'filter + describe':<24}{legacy_batch:>12.3f}{new_batch:>18.3f}{legacy_batch / new_batch:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
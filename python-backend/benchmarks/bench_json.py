@@ -0,0 +1,157 @@
+"""
+Micro-benchmark: response serialization for the large read endpoints, the
+default FastAPI path vs fast_json.
+
+  default    jsonable_encoder (dicts) or response_model validate + serialize
+             (WrapResponse), then JSONResponse (json.dumps)
+  fast_json  FastJSONResponse straight from the handler's value (orjson, or
+             model_dump_json for models)
+
+Run from python-backend/:
+  python benchmarks/bench_json.py [--rounds 200] [--large 10]
+
+--large multiplies the list sizes for the "large" payloads.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+import fast_json  # noqa: E402
+from routers import wrap  # noqa: E402
+
+
+# ---------- Payloads ----------
+def strava_payload(rng: random.Random, count: int) -> dict:
+    now = datetime.now(timezone.utc)
+    items = [
+        {
+            "id": 9_000_000_000 + i,
+            "name": f"Morning run {i}",
+            "type": rng.choice(["Run", "Ride", "Walk", "Hike"]),
+            "distance": rng.uniform(1000, 40000),
+            "moving_time": rng.randint(600, 9000),
+            "elapsed_time": rng.randint(600, 9500),
+            "total_elevation_gain": rng.uniform(0, 800),
+            "start_date": (now - timedelta(days=i)).isoformat(),
+            "start_latlng": [rng.uniform(-90, 90), rng.uniform(-180, 180)],
+            "map": {"id": f"a{i}", "summary_polyline": "".join(rng.choices("abcdefghij_~@?", k=400))},
+            "average_speed": rng.uniform(1, 10),
+            "kudos_count": rng.randint(0, 40),
+        }
+        for i in range(count)
+    ]
+    return {"items": items, "page": 1, "per_page": count}
+
+
+def calendar_payload(rng: random.Random, count: int) -> dict:
+    events = [
+        {
+            "label": f"Dinner with friends {i}",
+            "window": "Sat, Oct 18 · 7:00 PM",
+            "bullet": f"Sat, Oct 18 · 7:00 PM — Dinner with friends {i}",
+            "all_day": bool(i % 5 == 0),
+            "location": "Lisbon" if i % 3 == 0 else None,
+        }
+        for i in range(count)
+    ]
+    return {
+        "events": events,
+        "bullets": [event["bullet"] for event in events],
+        "settings": {"include_work_events": False, "calendars": ["primary"], "detail_level": "summary"},
+    }
+
+
+def wrap_payload(rng: random.Random, count: int) -> wrap.WrapResponse:
+    updates = [
+        wrap.LifeUpdateSnippet(
+            id=str(i),
+            title=f"Update {i}",
+            snippet="Went climbing, cooked for friends and finally finished the book. " * 3,
+            created_at=datetime.now(timezone.utc).isoformat(),
+            photo_urls=[f"https://cdn.example/photos/{i}/{j}.jpg" for j in range(3)],
+        )
+        for i in range(count)
+    ]
+    return wrap.WrapResponse(
+        month_label="October 2026",
+        ai_summary="A month of miles, music and friends.",
+        strava=wrap.StravaSummary(total_activities=12, total_distance_km=84.2, moving_time_hours=7.5),
+        music=wrap.MusicSummary(top_track="Track 1", top_genres=["indie pop", "jazz"], total_minutes_listened=1830),
+        calendar=wrap.CalendarSummary(
+            highlights=[wrap.CalendarHighlight(title="Trip to Lisbon", date_label="Oct 10–12")] * 6
+        ),
+        life_updates=updates,
+        photo_urls=[url for update in updates for url in update.photo_urls],
+    )
+
+
+# ---------- Paths ----------
+def default_dict(payload) -> bytes:
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+_wrap_adapter = TypeAdapter(wrap.WrapResponse)
+
+
+def default_model(payload) -> bytes:
+    # What FastAPI does with response_model: validate the returned value, then serialize it.
+    validated = _wrap_adapter.validate_python(payload, from_attributes=True)
+    return JSONResponse(_wrap_adapter.dump_python(validated, mode="json", by_alias=True)).body
+
+
+def fast(payload) -> bytes:
+    return fast_json.FastJSONResponse(payload).body
+
+
+def measure(fn, payload, rounds: int) -> tuple[float, int]:
+    body = fn(payload)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn(payload)
+    return (time.perf_counter() - started) / rounds, len(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--large", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    cases = [
+        ("strava activities (30)", strava_payload(rng, 30), default_dict),
+        (f"strava activities ({30 * args.large})", strava_payload(rng, 30 * args.large), default_dict),
+        ("calendar events (25)", calendar_payload(rng, 25), default_dict),
+        (f"calendar events ({25 * args.large})", calendar_payload(rng, 25 * args.large), default_dict),
+        ("wrap (8 updates)", wrap_payload(rng, 8), default_model),
+        (f"wrap ({8 * args.large} updates)", wrap_payload(rng, 8 * args.large), default_model),
+    ]
+
+    print(f"orjson: {'yes' if fast_json.orjson is not None else 'no (json fallback)'}\n")
+    header = f"{'payload':<30}{'bytes':>10}{'default ms':>12}{'fast ms':>10}{'speedup':>9}{'fast bytes':>12}"
+    print(header)
+    print("-" * len(header))
+    for label, payload, default_fn in cases:
+        default_time, default_bytes = measure(default_fn, payload, args.rounds)
+        fast_time, fast_bytes = measure(fast, payload, args.rounds)
+        print(
+            f"{label:<30}{default_bytes:>10}{default_time * 1000:>12.3f}{fast_time * 1000:>10.3f}"
+            f"{default_time / fast_time:>8.1f}x{fast_bytes:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,485 @@
+"""
+Local stand-ins for every upstream the backend talks to, served from one
+Starlette app so the benchmark never leaves the machine:
+
+- PostgREST subset (/rest/v1/<table>, /rest/v1/rpc/<fn>) over in-memory tables:
+  eq/neq/gt/gte/lt/lte/in filters, order, limit, upsert via on_conflict +
+  Prefer: resolution=..., delete/patch with return=representation.
+- Supabase storage uploads/removals and public object reads.
+- OpenAI Responses API (POST /v1/responses).
+- Spotify Web API + accounts token endpoint, Strava v3 + OAuth token,
+  Google Calendar v3 (calendarList, events with pageToken/syncToken) + OAuth.
+
+Every route sleeps for its service's configured latency first, and provider
+GETs answer If-None-Match with 304 like the real APIs. FakeUpstream.start()
+runs the app with uvicorn on a background thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+from urllib.parse import unquote
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+# Composite keys for upserts without an explicit on_conflict.
+PRIMARY_KEYS = {
+    "integrations": ("user_id", "provider"),
+    "spotify_plays": ("user_id", "played_at"),
+    "calendar_highlights": ("user_id", "month"),
+}
+
+JWT_SECRET = "benchmark-jwt-secret"
+
+
+@dataclass
+class Latency:
+    """Milliseconds added before each response, per upstream."""
+
+    db: float = 3.0
+    storage: float = 15.0
+    openai: float = 600.0
+    provider: float = 60.0
+    jitter: float = 0.2  # +/- share of the base latency
+
+    async def wait(self, service: str) -> None:
+        base = getattr(self, service) / 1000.0
+        if base > 0:
+            await asyncio.sleep(base * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+@dataclass
+class FakeState:
+    latency: Latency = field(default_factory=Latency)
+    tables: dict[str, list[dict]] = field(default_factory=dict)
+    objects: dict[str, bytes] = field(default_factory=dict)
+    calls: dict[str, int] = field(default_factory=dict)
+
+    def count(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+
+# ---------- PostgREST ----------
+def _parse_value(raw: str) -> str:
+    raw = unquote(raw)
+    return raw[1:-1] if len(raw) >= 2 and raw[0] == raw[-1] == '"' else raw
+
+
+def _matches(row: dict, column: str, expr: str) -> bool:
+    op, _, raw = expr.partition(".")
+    value = row.get(column)
+    text = "" if value is None else (json.dumps(value) if isinstance(value, (dict, list)) else str(value))
+    if op == "in":
+        options = [_parse_value(part) for part in raw.strip("()").split(",") if part]
+        return text in options
+    target = _parse_value(raw)
+    if op == "eq":
+        return text == target
+    if op == "neq":
+        return text != target
+    if op == "is":
+        return value is None if target == "null" else str(value).lower() == target
+    if value is None:
+        return False
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            left, right = float(value), float(target)
+        except ValueError:
+            left, right = text, target
+    else:
+        left, right = text, target
+    return {"gt": left > right, "gte": left >= right, "lt": left < right, "lte": left <= right}.get(op, False)
+
+
+def _filter_rows(rows: list[dict], params) -> list[dict]:
+    reserved = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+    filters = [(key, value) for key, value in params.multi_items() if key not in reserved]
+    return [row for row in rows if all(_matches(row, key, expr) for key, expr in filters)]
+
+
+def _project(rows: list[dict], select: Optional[str]) -> list[dict]:
+    if not select or select.strip() == "*":
+        return [dict(row) for row in rows]
+    columns = [column.strip() for column in select.split(",") if column.strip()]
+    return [{column: row.get(column) for column in columns} for row in rows]
+
+
+def _order(rows: list[dict], order: Optional[str]) -> list[dict]:
+    if not order:
+        return rows
+    for clause in reversed(order.split(",")):
+        column, *modifiers = clause.split(".")
+        rows = sorted(rows, key=lambda row: (row.get(column) is None, row.get(column) or ""), reverse="desc" in modifiers)
+    return rows
+
+
+async def postgrest_table(request: Request) -> Response:
+    state: FakeState = request.app.state.fake
+    await state.latency.wait("db")
+    table = request.path_params["table"]
+    state.count(f"db.{table}.{request.method.lower()}")
+    rows = state.tables.setdefault(table, [])
+    params = request.query_params
+    prefer = request.headers.get("prefer", "")
+
+    if request.method == "GET":
+        result = _order(_filter_rows(rows, params), params.get("order"))
+        offset = int(params.get("offset") or 0)
+        if params.get("limit"):
+            result = result[offset:offset + int(params["limit"])]
+        return JSONResponse(_project(result, params.get("select")))
+
+    if request.method in ("POST", "PATCH"):
+        payload = json.loads(await request.body() or b"null")
+        items = payload if isinstance(payload, list) else [payload]
+
+    if request.method == "POST":
+        keys = tuple(params["on_conflict"].split(",")) if params.get("on_conflict") else PRIMARY_KEYS.get(table)
+        upsert = "resolution=" in prefer
+        written: list[dict] = []
+        for item in items:
+            existing = None
+            if upsert and keys:
+                existing = next((row for row in rows if all(str(row.get(k)) == str(item.get(k)) for k in keys)), None)
+            if existing is not None:
+                if "ignore-duplicates" in prefer:
+                    continue
+                existing.update(item)
+                written.append(existing)
+            else:
+                row = {"id": item.get("id") or len(rows) + 1, **item}
+                rows.append(row)
+                written.append(row)
+        return JSONResponse(written if "return=representation" in prefer else [], status_code=201)
+
+    matched = _filter_rows(rows, params)
+    if request.method == "PATCH":
+        for row in matched:
+            row.update(items[0] or {})
+    elif request.method == "DELETE":
+        ids = {id(row) for row in matched}
+        state.tables[table] = [row for row in rows if id(row) not in ids]
+    return JSONResponse(matched if "return=representation" in prefer else [])
+
+
+async def postgrest_rpc(request: Request) -> Response:
+    state: FakeState = request.app.state.fake
+    await state.latency.wait("db")
+    name = request.path_params["fn"]
+    state.count(f"db.rpc.{name}")
+    args = json.loads(await request.body() or b"{}")
+    if name != "spotify_listening_stats":
+        return JSONResponse({"message": f"function {name} not found"}, status_code=404)
+
+    plays = [
+        row for row in state.tables.get("spotify_plays", [])
+        if str(row["user_id"]) == str(args["p_user_id"]) and args["p_start"] <= row["played_at"] <= args["p_end"]
+    ]
+    per_track: dict[str, list[int]] = {}
+    for row in plays:
+        totals = per_track.setdefault(row["track_id"], [0, 0])
+        totals[0] += 1
+        totals[1] += int(row.get("duration_ms") or 0)
+    top = sorted(per_track.items(), key=lambda item: (-item[1][0], -item[1][1], item[0]))[: int(args.get("p_top") or 5)]
+    return JSONResponse({
+        "play_count": len(plays),
+        "total_ms": sum(int(row.get("duration_ms") or 0) for row in plays),
+        "top_tracks": [{"track_id": track, "plays": n, "total_ms": ms} for track, (n, ms) in top],
+    })
+
+
+# ---------- Storage ----------
+async def storage_object(request: Request) -> Response:
+    state: FakeState = request.app.state.fake
+    await state.latency.wait("storage")
+    bucket = request.path_params["bucket"]
+    path = request.path_params.get("path", "")
+    if request.method == "DELETE":
+        state.count("storage.remove")
+        prefixes = (json.loads(await request.body() or b"{}")).get("prefixes", [])
+        removed = [state.objects.pop(f"{bucket}/{prefix}", None) is not None for prefix in prefixes]
+        return JSONResponse([{"name": prefix} for prefix, ok in zip(prefixes, removed) if ok])
+    if request.method == "GET":
+        state.count("storage.get")
+        body = state.objects.get(f"{bucket}/{path}")
+        return Response(body, media_type="image/jpeg") if body is not None else JSONResponse({}, status_code=404)
+    state.count("storage.upload")
+    state.objects[f"{bucket}/{path}"] = await request.body()
+    return JSONResponse({"Key": f"{bucket}/{path}", "Id": hashlib.md5(path.encode()).hexdigest()})
+
+
+async def storage_public(request: Request) -> Response:
+    return await storage_object(request)
+
+
+# ---------- OpenAI ----------
+async def openai_responses(request: Request) -> Response:
+    state: FakeState = request.app.state.fake
+    await state.latency.wait("openai")
+    state.count("openai.responses")
+    body = json.loads(await request.body() or b"{}")
+    text = "Great month! Lots of miles, new music and time with friends. #goodvibes #momentum #keepgoing"
+    return JSONResponse({
+        "id": f"resp_{random.getrandbits(48):x}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": body.get("model", "gpt-5-mini"),
+        "status": "completed",
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "output": [{
+            "type": "message",
+            "id": "msg_bench",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "usage": {"input_tokens": 400, "output_tokens": 40, "total_tokens": 440},
+    })
+
+
+# ---------- Providers ----------
+def _etag_response(request: Request, payload: Any) -> Response:
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+
+async def _provider(request: Request, name: str) -> FakeState:
+    state: FakeState = request.app.state.fake
+    await state.latency.wait("provider")
+    state.count(name)
+    return state
+
+
+async def oauth_token(request: Request) -> Response:
+    await _provider(request, f"token{request.url.path}")
+    return JSONResponse({
+        "access_token": f"fresh-{random.getrandbits(32):x}",
+        "token_type": "Bearer",
+        "expires_in": 3600,
+        "expires_at": int(time.time()) + 3600,
+        "refresh_token": "bench-refresh",
+        "scope": "bench",
+    })
+
+
+def _track(index: int) -> dict:
+    return {
+        "id": f"track{index}",
+        "name": f"Track {index}",
+        "duration_ms": 180000 + (index % 7) * 10000,
+        "artists": [{"id": f"artist{index % 40}", "name": f"Artist {index % 40}"}],
+        "album": {"images": [{"url": f"https://img.example/{index}.jpg"}]},
+        "external_urls": {"spotify": f"https://open.spotify.example/track/{index}"},
+    }
+
+
+def _artist(index: int) -> dict:
+    genres = ["indie pop", "lo-fi", "jazz", "house", "folk", "hip hop"]
+    return {
+        "id": f"artist{index}",
+        "name": f"Artist {index}",
+        "genres": [genres[index % len(genres)], genres[(index + 2) % len(genres)]],
+        "images": [{"url": f"https://img.example/a{index}.jpg"}],
+        "external_urls": {"spotify": f"https://open.spotify.example/artist/{index}"},
+    }
+
+
+def _ids_param(request: Request) -> list[int]:
+    ids = request.query_params.get("ids", "")
+    return [int("".join(ch for ch in part if ch.isdigit()) or 0) for part in ids.split(",") if part]
+
+
+async def spotify_top(request: Request) -> Response:
+    await _provider(request, "spotify.top")
+    limit = int(request.query_params.get("limit", 10))
+    if request.path_params["kind"] == "artists":
+        return _etag_response(request, {"items": [_artist(i) for i in range(limit)]})
+    return _etag_response(request, {"items": [_track(i) for i in range(limit)]})
+
+
+async def spotify_tracks(request: Request) -> Response:
+    await _provider(request, "spotify.tracks")
+    return _etag_response(request, {"tracks": [_track(i) for i in _ids_param(request)]})
+
+
+async def spotify_artists(request: Request) -> Response:
+    await _provider(request, "spotify.artists")
+    return _etag_response(request, {"artists": [_artist(i) for i in _ids_param(request)]})
+
+
+async def spotify_recent(request: Request) -> Response:
+    await _provider(request, "spotify.recent")
+    now = datetime.now(timezone.utc)
+    limit = int(request.query_params.get("limit", 20))
+    items = [
+        {"played_at": (now - timedelta(minutes=4 * i)).isoformat().replace("+00:00", "Z"), "track": _track(i)}
+        for i in range(limit)
+    ]
+    return _etag_response(request, {"items": items})
+
+
+async def strava_activities(request: Request) -> Response:
+    await _provider(request, "strava.activities")
+    page = int(request.query_params.get("page", 1))
+    per_page = int(request.query_params.get("per_page", 30))
+    start = (page - 1) * per_page
+    now = datetime.now(timezone.utc)
+    items = [
+        {
+            "id": 10_000 + i,
+            "name": f"Morning run {i}",
+            "type": "Run",
+            "distance": 5000.0 + 37 * i,
+            "moving_time": 1500 + 11 * i,
+            "elapsed_time": 1600 + 11 * i,
+            "total_elevation_gain": 25.0,
+            "start_date": (now - timedelta(days=i)).isoformat().replace("+00:00", "Z"),
+        }
+        for i in range(start, start + per_page)
+    ]
+    return _etag_response(request, items)
+
+
+def _calendar_events(count: int) -> list[dict]:
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    summaries = ["Team sync", "Birthday dinner", "Trip to Lisbon", "1:1 with Sam", "Climbing", "Dentist", "Standup"]
+    events = []
+    for i in range(count):
+        start = now + timedelta(hours=9 * i - 24 * 30)
+        events.append({
+            "id": f"evt{i}",
+            "etag": f'"{i}"',
+            "status": "confirmed",
+            "summary": summaries[i % len(summaries)],
+            "location": "Somewhere" if i % 3 == 0 else None,
+            "start": {"dateTime": start.isoformat()},
+            "end": {"dateTime": (start + timedelta(hours=1)).isoformat()},
+        })
+    return events
+
+
+async def google_calendar_list(request: Request) -> Response:
+    await _provider(request, "google.calendarList")
+    return _etag_response(request, {"items": [
+        {"id": "primary", "summary": "Personal", "primary": True, "selected": True, "accessRole": "owner"},
+        {"id": "work@example.com", "summary": "Work", "selected": True, "accessRole": "reader"},
+    ]})
+
+
+async def google_events(request: Request) -> Response:
+    state = await _provider(request, "google.events")
+    params = request.query_params
+    if params.get("syncToken"):
+        return JSONResponse({"items": [], "nextSyncToken": "sync-2"})
+    events = _calendar_events(state.tables.get("_google_event_count", [{"n": 200}])[0]["n"])
+    time_min = params.get("timeMin")
+    time_max = params.get("timeMax")
+    if time_min:
+        events = [e for e in events if e["end"]["dateTime"] > time_min.replace("Z", "+00:00")]
+    if time_max:
+        events = [e for e in events if e["start"]["dateTime"] < time_max.replace("Z", "+00:00")]
+    size = int(params.get("maxResults", 250))
+    offset = int(params.get("pageToken") or 0)
+    page = {"items": events[offset:offset + size]}
+    if offset + size < len(events):
+        page["nextPageToken"] = str(offset + size)
+    else:
+        page["nextSyncToken"] = "sync-1"
+    return _etag_response(request, page)
+
+
+def build_app(state: FakeState) -> Starlette:
+    app = Starlette(routes=[
+        Route("/rest/v1/rpc/{fn}", postgrest_rpc, methods=["POST"]),
+        Route("/rest/v1/{table}", postgrest_table, methods=["GET", "POST", "PATCH", "DELETE"]),
+        Route("/storage/v1/object/public/{bucket}/{path:path}", storage_public, methods=["GET"]),
+        Route("/storage/v1/object/{bucket}/{path:path}", storage_object, methods=["POST", "PUT", "GET"]),
+        Route("/storage/v1/object/{bucket}", storage_object, methods=["DELETE"]),
+        Route("/v1/responses", openai_responses, methods=["POST"]),
+        Route("/spotify/accounts/api/token", oauth_token, methods=["POST"]),
+        Route("/spotify/v1/me/top/{kind}", spotify_top),
+        Route("/spotify/v1/tracks", spotify_tracks),
+        Route("/spotify/v1/artists", spotify_artists),
+        Route("/spotify/v1/me/player/recently-played", spotify_recent),
+        Route("/strava/oauth/token", oauth_token, methods=["POST"]),
+        Route("/strava/api/v3/athlete/activities", strava_activities),
+        Route("/google/token", oauth_token, methods=["POST"]),
+        Route("/google/calendar/v3/users/me/calendarList", google_calendar_list),
+        Route("/google/calendar/v3/calendars/{calendar_id}/events", google_events),
+    ])
+    app.state.fake = state
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeUpstream:
+    """Runs the fake app on 127.0.0.1 in a daemon thread."""
+
+    def __init__(self, latency: Optional[Latency] = None):
+        self.state = FakeState(latency=latency or Latency())
+        self.port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        config = uvicorn.Config(build_app(self.state), host="127.0.0.1", port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, name="fake-upstream", daemon=True)
+
+    def start(self) -> "FakeUpstream":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("fake upstream did not start")
+            time.sleep(0.02)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+    def env(self) -> dict[str, str]:
+        """Environment that points every client in the backend at this server."""
+        base = self.base_url
+        return {
+            "SUPABASE_URL": base,
+            # supabase-py only checks the key looks like a JWT.
+            "SUPABASE_SERVICE_ROLE_KEY": "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.benchmark",
+            "SUPABASE_BUCKET": "photos",
+            # Signs the per-user access tokens bench_api sends (admission control keys on them).
+            "SUPABASE_JWT_SECRET": JWT_SECRET,
+            "OPENAI_API_KEY": "sk-benchmark",
+            "OPENAI_BASE_URL": f"{base}/v1",
+            "SPOTIFY_API_BASE": f"{base}/spotify",
+            "SPOTIFY_ACCOUNTS_BASE": f"{base}/spotify/accounts",
+            "SPOTIFY_CLIENT_ID": "bench",
+            "SPOTIFY_CLIENT_SECRET": "bench",
+            "STRAVA_BASE_URL": f"{base}/strava",
+            "STRAVA_CLIENT_ID": "bench",
+            "STRAVA_CLIENT_SECRET": "bench",
+            "GOOGLE_CALENDAR_API_BASE": f"{base}/google/calendar/v3",
+            "GOOGLE_OAUTH_TOKEN_URL": f"{base}/google/token",
+            "GOOGLE_CLIENT_ID": "bench",
+            "GOOGLE_CLIENT_SECRET": "bench",
+        }
@@ -0,0 +1,308 @@
+"""
+Precomputed Google Calendar highlights for the monthly wrap.
+
+A background job walks every user with a Google Calendar connection, reads
+the current month through the synced event store, keeps the events their
+CalendarSettings allow, and ranks them by how much they look like a personal
+highlight (birthdays, trips, weekends away) rather than routine work. The
+sanitized top list is stored per (user, month) so the wrap only has to read
+one row.
+
+A fingerprint of the settings and the month's event versions is stored too.
+A run where nothing changed skips the ranking and the write. Saving calendar
+preferences triggers an immediate refresh for that user.
+
+Expected table (see supabase/migrations):
+
+CREATE TABLE IF NOT EXISTS calendar_highlights (
+  user_id uuid REFERENCES auth.users(id) ON DELETE CASCADE,
+  month text NOT NULL,                      -- 'YYYY-MM'
+  highlights jsonb NOT NULL DEFAULT '[]',
+  fingerprint text,
+  computed_at timestamptz DEFAULT now(),
+  PRIMARY KEY (user_id, month)
+);
+
+Env (python-backend/.env):
+  GOOGLE_HIGHLIGHTS_INTERVAL_SECONDS=3600   # 0 disables the refresher
+  GOOGLE_HIGHLIGHTS_CONCURRENCY=4
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import background_jobs
+from cache_utils import TTLCache
+from metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
+HIGHLIGHTS_INTERVAL_SECONDS = int(os.getenv("GOOGLE_HIGHLIGHTS_INTERVAL_SECONDS", "3600"))
+HIGHLIGHTS_CONCURRENCY = max(1, int(os.getenv("GOOGLE_HIGHLIGHTS_CONCURRENCY", "4")))
+MAX_HIGHLIGHTS = 6
+MONTH_EVENT_LIMIT = 250
+
+PERSONAL_HIGHLIGHT_WORDS = [
+    "birthday", "bday", "anniversary", "wedding", "graduation", "reunion",
+    "trip", "vacation", "holiday", "flight", "getaway", "weekend",
+    "concert", "festival", "show", "game", "party", "dinner", "brunch",
+    "hike", "race", "marathon", "visit", "celebration",
+]
+_PERSONAL_RE = re.compile("|".join(re.escape(word) for word in PERSONAL_HIGHLIGHT_WORDS), re.IGNORECASE)
+
+# Keep references so fire-and-forget refreshes aren't garbage collected mid-run.
+_refresh_tasks: set[asyncio.Task] = set()
+# Users with a refresh requested by a read that found no row; repeat reads don't stack more.
+_pending_first_compute: set[str] = set()
+# user_id -> whether a Google Calendar connection exists. Connecting and disconnecting
+# update it, so reads skip refreshes that can only fail for users without Google.
+_connected = TTLCache(maxsize=10_000, ttl=10 * 60)
+
+
+def _google():
+    # Imported lazily: the Google router imports this module for refresh hooks.
+    from routers import google_calendar
+    return google_calendar
+
+
+def month_window(now: Optional[datetime] = None) -> tuple[str, datetime, datetime]:
+    now = now or datetime.now(timezone.utc)
+    start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start.strftime("%Y-%m"), start, next_month
+
+
+# ---------- Ranking ----------
+def highlight_score(parsed, scan) -> float:
+    """Higher means more likely to be a personal highlight worth a wrap mention."""
+    score = 2.0 * len(_PERSONAL_RE.findall(scan.label))
+    if scan.work:
+        score -= 3.0
+    if parsed.multi_day:
+        score += 2.0
+    elif parsed.all_day:
+        score += 1.0
+    elif parsed.duration_hours and parsed.duration_hours >= 3:
+        score += 0.5
+    if parsed.start and parsed.start.weekday() >= 5:
+        score += 0.5
+    return score
+
+
+def rank_highlights(events: list[dict], settings: dict, limit: int = MAX_HIGHLIGHTS) -> list[dict]:
+    """Filtered, sanitized highlights ordered by score, then by date."""
+    gc = _google()
+    scored: list[tuple[float, float, dict, Optional[str]]] = []
+    for event in events:
+        scan = gc.scan_summary(event.get("summary"))
+        parsed = gc.parse_event(event)
+        if not gc.should_include_event(event, settings, work_event=scan.work, parsed=parsed):
+            continue
+        descriptor = gc.build_event_descriptor(event, settings, label=scan.label, parsed=parsed)
+        start_ts = parsed.start.timestamp() if parsed.start else float("inf")
+        start_iso = None
+        if parsed.start:
+            # All-day dates parse as naive; treat them as UTC midnight like calendar_sync does.
+            start = parsed.start if parsed.start.tzinfo else parsed.start.replace(tzinfo=timezone.utc)
+            start_iso = start.astimezone(timezone.utc).isoformat()
+        scored.append((highlight_score(parsed, scan), start_ts, descriptor, start_iso))
+
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [
+        # `start` orders highlights on the timeline; the wrap only shows title and label.
+        {"title": descriptor["label"], "date_label": descriptor["window"], "start": start_iso}
+        for _, _, descriptor, start_iso in scored[:limit]
+    ]
+
+
+def fingerprint(settings: dict, events: list[dict]) -> str:
+    """Changes whenever settings or any event in the month changes."""
+    digest = hashlib.sha1(json.dumps(settings, sort_keys=True).encode())
+    digest.update(_google().events_fingerprint(events).encode())
+    return digest.hexdigest()
+
+
+# ---------- Storage ----------
+def load_highlights(user_id: str, month: str) -> Optional[dict]:
+    """Stored row for (user, month) or None if not computed yet."""
+    sb = _google().supabase
+    if not sb:
+        return None
+    with track_upstream("supabase", "calendar_highlights.select"):
+        res = (
+            sb.table("calendar_highlights")
+            .select("highlights, fingerprint, computed_at")
+            .eq("user_id", user_id)
+            .eq("month", month)
+            .limit(1)
+            .execute()
+        )
+    rows = getattr(res, "data", None) or []
+    return rows[0] if rows else None
+
+
+def store_highlights(user_id: str, month: str, highlights: list[dict], fingerprint_value: str) -> None:
+    sb = _google().supabase
+    if not sb:
+        return
+    with track_upstream("supabase", "calendar_highlights.upsert"):
+        res = (
+            sb.table("calendar_highlights")
+            .upsert(
+                {
+                    "user_id": user_id,
+                    "month": month,
+                    "highlights": highlights,
+                    "fingerprint": fingerprint_value,
+                    "computed_at": datetime.now(timezone.utc).isoformat(),
+                },
+                on_conflict="user_id,month",
+            )
+            .execute()
+        )
+    error = getattr(res, "error", None)
+    if error:
+        raise RuntimeError(f"Supabase upsert error: {error}")
+
+
+def has_connection(user_id: str) -> bool:
+    cached = _connected.get(user_id)
+    if cached is not None:
+        return cached
+    gc = _google()
+    if not gc.supabase:
+        return False
+    with track_upstream("supabase", "integrations.select"):
+        res = (
+            gc.supabase.table("integrations")
+            .select("user_id")
+            .eq("user_id", user_id)
+            .eq("provider", gc.GOOGLE_PROVIDER)
+            .limit(1)
+            .execute()
+        )
+    connected = bool(getattr(res, "data", None))
+    _connected.set(user_id, connected)
+    return connected
+
+
+def forget_user(user_id: str) -> None:
+    """Best-effort removal of stored highlights (e.g. on disconnect)."""
+    _connected.set(user_id, False)
+    sb = _google().supabase
+    if not sb:
+        return
+    try:
+        with track_upstream("supabase", "calendar_highlights.delete"):
+            sb.table("calendar_highlights").delete().eq("user_id", user_id).execute()
+    except Exception as e:
+        logger.warning("Failed to delete calendar highlights: %s", e, extra={"user_id": user_id})
+
+
+# ---------- Jobs ----------
+async def refresh_user(user_id: str) -> bool:
+    """Recompute this month's highlights for a user; returns True if the row changed."""
+    gc = _google()
+    access_token, record = await gc.ensure_access_token(user_id)
+    settings = gc.get_calendar_settings(user_id, record)
+    month, start, end = month_window()
+    events = await gc.load_window_events(
+        user_id, access_token, settings, MONTH_EVENT_LIMIT, gc.as_iso_utc(start), gc.as_iso_utc(end)
+    )
+
+    current = fingerprint(settings, events)
+    stored = await asyncio.to_thread(load_highlights, user_id, month)
+    if stored and stored.get("fingerprint") == current:
+        return False
+
+    highlights = rank_highlights(events, settings)
+    await asyncio.to_thread(store_highlights, user_id, month, highlights, current)
+    return True
+
+
+def request_refresh(user_id: str) -> None:
+    """Schedule a refresh now (after connecting or changing calendar preferences)."""
+    _connected.set(user_id, True)
+    _schedule_refresh(user_id)
+
+
+def request_first_compute(user_id: str) -> bool:
+    """
+    For reads that found no stored row: schedule a refresh if the user has
+    Google Calendar connected and none is pending. True while one is pending,
+    False when there is nothing to compute.
+    """
+    if user_id in _pending_first_compute:
+        return True
+    if not has_connection(user_id):
+        return False
+    if _schedule_refresh(user_id, on_done=lambda: _pending_first_compute.discard(user_id)):
+        _pending_first_compute.add(user_id)
+        return True
+    return False
+
+
+def _schedule_refresh(user_id: str, on_done=None) -> bool:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return False  # no loop (sync context); the periodic job will pick it up
+
+    async def run() -> None:
+        try:
+            await refresh_user(user_id)
+        except Exception as e:
+            logger.warning("Calendar highlights refresh failed: %s", e, extra={"user_id": user_id})
+        finally:
+            if on_done:
+                on_done()
+
+    task = loop.create_task(run())
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+    return True
+
+
+def list_connected_user_ids() -> list[str]:
+    gc = _google()
+    if not gc.supabase:
+        return []
+    with track_upstream("supabase", "integrations.select"):
+        res = gc.supabase.table("integrations").select("user_id").eq("provider", gc.GOOGLE_PROVIDER).execute()
+    rows = getattr(res, "data", None) or []
+    return [str(row["user_id"]) for row in rows if row.get("user_id")]
+
+
+async def refresh_all_users() -> dict:
+    user_ids = await asyncio.to_thread(list_connected_user_ids)
+    semaphore = asyncio.Semaphore(HIGHLIGHTS_CONCURRENCY)
+    updated = 0
+    failed = 0
+
+    async def run(user_id: str) -> None:
+        nonlocal updated, failed
+        async with semaphore:
+            try:
+                updated += int(await refresh_user(user_id))
+            except Exception as e:
+                failed += 1
+                logger.warning("Calendar highlights refresh failed: %s", e, extra={"user_id": user_id})
+
+    await asyncio.gather(*(run(user_id) for user_id in user_ids))
+    return {"users": len(user_ids), "updated": updated, "failed": failed}
+
+
+def start_refresher() -> None:
+    if not _google().supabase:
+        return
+    background_jobs.start_periodic(
+        "calendar_highlights", HIGHLIGHTS_INTERVAL_SECONDS, refresh_all_users, initial_delay=60
+    )
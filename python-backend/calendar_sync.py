@@ -0,0 +1,261 @@
+"""
+Incremental Google Calendar sync with a local per-user event store.
+
+The first request for a (user, calendar) does a full, paginated list of
+events from GOOGLE_SYNC_LOOKBACK_DAYS ago onwards and keeps the returned
+`nextSyncToken`. Later requests send only that token and apply the
+changes (cancelled events are removed). A 410 Gone means the token
+expired, so the store is wiped and fully re-synced.
+
+Window queries (/api/google/events) are answered from memory with the same
+semantics Google uses: an event matches if it ends after timeMin and starts
+before timeMax. Stores live in this process only; an evicted or expired
+store just costs one full sync.
+
+Env (python-backend/.env):
+  GOOGLE_SYNC_LOOKBACK_DAYS=90
+  GOOGLE_SYNC_MIN_INTERVAL_SECONDS=60       # skip upstream if synced this recently
+  GOOGLE_SYNC_MAX_STORES=1000
+  GOOGLE_CALENDAR_API_BASE=https://www.googleapis.com/calendar/v3
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from urllib.parse import quote
+
+import httpx
+from fastapi import HTTPException
+
+from cache_utils import TTLCache
+from metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
+SYNC_LOOKBACK_DAYS = int(os.getenv("GOOGLE_SYNC_LOOKBACK_DAYS", "90"))
+SYNC_MIN_INTERVAL_SECONDS = float(os.getenv("GOOGLE_SYNC_MIN_INTERVAL_SECONDS", "60"))
+SYNC_MAX_STORES = int(os.getenv("GOOGLE_SYNC_MAX_STORES", "1000"))
+# Force a fresh full sync now and then so the lookback window keeps moving forward.
+STORE_TTL_SECONDS = 6 * 60 * 60
+GOOGLE_CALENDAR_API_BASE = os.getenv("GOOGLE_CALENDAR_API_BASE", "https://www.googleapis.com/calendar/v3").rstrip("/")
+EVENTS_URL = GOOGLE_CALENDAR_API_BASE + "/calendars/{calendar_id}/events"
+PAGE_SIZE = 250
+
+
+class SyncTokenExpired(Exception):
+    """Google answered 410 Gone: the sync token is no longer valid."""
+
+
+@dataclass
+class CalendarStore:
+    coverage_start: datetime
+    events: dict[str, dict] = field(default_factory=dict)
+    sync_token: Optional[str] = None
+    synced_at: float = 0.0
+    version: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # Sorted (start_ts, event_id) pairs plus the longest event span, rebuilt lazily.
+    _index: Optional[list[tuple[float, str]]] = None
+    _max_span: float = 0.0
+
+    def reset(self) -> None:
+        self.events.clear()
+        self.sync_token = None
+        self._index = None
+        self.version += 1
+
+    def covers(self, time_min: datetime) -> bool:
+        return time_min >= self.coverage_start
+
+
+_stores = TTLCache(maxsize=SYNC_MAX_STORES, ttl=STORE_TTL_SECONDS)
+
+
+# ---------- Date helpers ----------
+def parse_rfc3339(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        iso_val = value.replace("Z", "+00:00") if value.endswith("Z") else value
+        dt = datetime.fromisoformat(iso_val)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def event_timestamp(entry: Optional[dict]) -> Optional[float]:
+    """Epoch seconds for a Google start/end object (all-day dates count as UTC midnight)."""
+    if not entry:
+        return None
+    dt = parse_rfc3339(entry.get("dateTime") or entry.get("date"))
+    return dt.timestamp() if dt else None
+
+
+def as_iso_utc(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+# ---------- Store ----------
+def get_store(user_id: str, calendar_id: str = "primary") -> CalendarStore:
+    key = (user_id, calendar_id)
+    store = _stores.get(key)
+    if store is None:
+        coverage_start = datetime.now(timezone.utc) - timedelta(days=SYNC_LOOKBACK_DAYS)
+        store = CalendarStore(coverage_start=coverage_start)
+        _stores.set(key, store)
+    return store
+
+
+def drop_user(user_id: str) -> None:
+    """Forget every synced calendar for a user (e.g. on disconnect)."""
+    _stores.delete_where(lambda key: key[0] == user_id)
+
+
+def apply_changes(store: CalendarStore, items: list[dict]) -> int:
+    """Merge a page of events/changes into the store; returns how many entries changed."""
+    changed = 0
+    for item in items:
+        event_id = item.get("id")
+        if not event_id:
+            continue
+        if item.get("status") == "cancelled":
+            if store.events.pop(event_id, None) is not None:
+                changed += 1
+            continue
+        store.events[event_id] = item
+        changed += 1
+    if changed:
+        store._index = None
+        store.version += 1
+    return changed
+
+
+def _ensure_index(store: CalendarStore) -> list[tuple[float, str]]:
+    if store._index is None:
+        index: list[tuple[float, str]] = []
+        max_span = 0.0
+        for event_id, event in store.events.items():
+            start_ts = event_timestamp(event.get("start"))
+            if start_ts is None:
+                continue
+            end_ts = event_timestamp(event.get("end")) or start_ts
+            max_span = max(max_span, end_ts - start_ts)
+            index.append((start_ts, event_id))
+        index.sort()
+        store._index = index
+        store._max_span = max_span
+    return store._index
+
+
+def query_window(
+    store: CalendarStore,
+    time_min: datetime,
+    time_max: Optional[datetime],
+    max_results: int,
+) -> list[dict]:
+    """Events ending after time_min and starting before time_max, ordered by start."""
+    index = _ensure_index(store)
+    min_ts = time_min.timestamp()
+    max_ts = time_max.timestamp() if time_max else float("inf")
+    # Nothing that starts earlier than min_ts - longest span can still be running at min_ts.
+    position = bisect.bisect_left(index, (min_ts - store._max_span, ""))
+    results: list[dict] = []
+    for start_ts, event_id in index[position:]:
+        if start_ts >= max_ts or len(results) >= max_results:
+            break
+        event = store.events[event_id]
+        end_ts = event_timestamp(event.get("end")) or start_ts
+        if end_ts > min_ts:
+            results.append(event)
+    return results
+
+
+# ---------- Google calls ----------
+async def list_events_page(access_token: str, calendar_id: str, params: dict) -> dict:
+    url = EVENTS_URL.format(calendar_id=quote(calendar_id, safe="@."))
+    try:
+        with track_upstream("google", "events.sync") as call_span:
+            async with httpx.AsyncClient(timeout=20.0) as client:
+                resp = await client.get(
+                    url,
+                    headers={"Authorization": f"Bearer {access_token}"},
+                    params=params,
+                )
+            call_span.set(status_code=resp.status_code, bytes=len(resp.content), incremental="syncToken" in params)
+    except httpx.RequestError as exc:
+        raise HTTPException(status_code=502, detail=f"Network error to Google Calendar: {exc!s}")
+
+    if resp.status_code == 410:
+        raise SyncTokenExpired()
+    if resp.status_code != 200:
+        logger.warning("Google events sync error", extra={"status_code": resp.status_code, "body": resp.text[:500]})
+        raise HTTPException(status_code=resp.status_code, detail=resp.text)
+    return resp.json()
+
+
+async def _drain(store: CalendarStore, access_token: str, calendar_id: str, params: dict) -> None:
+    """Follow pageToken until Google hands back the next sync token."""
+    page_token: Optional[str] = None
+    while True:
+        page_params = {**params, "maxResults": str(PAGE_SIZE)}
+        if page_token:
+            page_params["pageToken"] = page_token
+        page = await list_events_page(access_token, calendar_id, page_params)
+        apply_changes(store, page.get("items", []) or [])
+        page_token = page.get("nextPageToken")
+        if not page_token:
+            store.sync_token = page.get("nextSyncToken")
+            return
+
+
+async def full_sync(store: CalendarStore, access_token: str, calendar_id: str) -> None:
+    store.reset()
+    store.coverage_start = datetime.now(timezone.utc) - timedelta(days=SYNC_LOOKBACK_DAYS)
+    await _drain(
+        store,
+        access_token,
+        calendar_id,
+        {"singleEvents": "true", "timeMin": as_iso_utc(store.coverage_start)},
+    )
+
+
+async def incremental_sync(store: CalendarStore, access_token: str, calendar_id: str) -> None:
+    # Google rejects timeMin/orderBy alongside syncToken; everything else must match the full sync.
+    await _drain(
+        store,
+        access_token,
+        calendar_id,
+        {"singleEvents": "true", "syncToken": store.sync_token},
+    )
+
+
+async def sync_calendar(
+    user_id: str,
+    access_token: str,
+    calendar_id: str = "primary",
+    force: bool = False,
+) -> CalendarStore:
+    """Bring the local store for (user, calendar) up to date and return it."""
+    store = get_store(user_id, calendar_id)
+    async with store.lock:
+        fresh = time.monotonic() - store.synced_at < SYNC_MIN_INTERVAL_SECONDS
+        if store.sync_token and fresh and not force:
+            return store
+        try:
+            if store.sync_token:
+                await incremental_sync(store, access_token, calendar_id)
+            else:
+                await full_sync(store, access_token, calendar_id)
+        except SyncTokenExpired:
+            await full_sync(store, access_token, calendar_id)
+        store.synced_at = time.monotonic()
+    return store
@@ -0,0 +1,159 @@
+"""
+Request coalescing for idempotent GET routes.
+
+Strict-mode double mounts, retries and several open tabs send the same GET
+(e.g. /api/spotify/top?user_id=X) several times at once. The first request
+for a key becomes the leader and runs normally while its response is
+recorded; identical requests arriving before it finishes await that
+response and replay it instead of doing their own token read and upstream
+call. Nothing is kept after the leader finishes: this merges concurrent
+duplicates, it is not a response cache.
+
+The key is the path, the query parameters in sorted order and the headers
+that can change the response (Authorization, If-None-Match, Accept-Encoding).
+If the leader fails, is cancelled or its body is larger than
+MAX_SHARED_BODY_BYTES, followers simply run the request themselves.
+
+Sits outside admission control, so followers don't take an admission slot.
+
+Env (python-backend/.env):
+  COALESCE_GETS=1                           # 0 disables coalescing
+  COALESCE_PATHS=/api/spotify/top,...       # path prefixes to coalesce (defaults below)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from urllib.parse import parse_qsl
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("COALESCE_GETS", "1") not in ("0", "false", "no")
+DEFAULT_PATHS = (
+    "/api/spotify/top",
+    "/api/spotify/recent",
+    "/api/spotify/history/stats",
+    "/api/strava/activities",
+    "/api/google/events",
+    "/api/wrap/this-month",
+    "/api/wrap/group/this-month",
+    "/api/timeline",
+    "/api/dashboard",
+)
+MAX_SHARED_BODY_BYTES = 4 * 1024 * 1024
+KEY_HEADERS = (b"authorization", b"if-none-match", b"accept-encoding")
+
+coalesced_requests = metrics.Counter(
+    "coalesced_requests_total",
+    "GET requests by coalescing role: leader (ran the handler) or follower (replayed the leader's response).",
+    ("path", "role"),
+)
+
+
+@dataclass
+class RecordedResponse:
+    start: dict
+    body: list[bytes] = field(default_factory=list)
+    route: Any = None
+
+
+# key -> future resolving to the leader's RecordedResponse (None when it can't be shared).
+_inflight: dict[str, asyncio.Future] = {}
+
+
+def configured_paths() -> tuple[str, ...]:
+    raw = os.getenv("COALESCE_PATHS")
+    if not raw:
+        return DEFAULT_PATHS
+    return tuple(path.strip() for path in raw.split(",") if path.strip())
+
+
+def request_key(scope) -> str:
+    query = sorted(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+    digest = hashlib.sha1(scope.get("path", "").encode())
+    for name, value in query:
+        digest.update(f"&{name}={value}".encode())
+    for key, value in scope.get("headers") or []:
+        if key in KEY_HEADERS:
+            digest.update(b"|" + key + b"=" + value)
+    return digest.hexdigest()
+
+
+async def replay(send, response: RecordedResponse) -> None:
+    await send(response.start)
+    chunks = response.body or [b""]
+    for index, chunk in enumerate(chunks):
+        await send({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+
+
+class CoalescingMiddleware:
+    def __init__(self, app, paths: Optional[tuple[str, ...]] = None):
+        self.app = app
+        self.paths = paths or configured_paths()
+
+    def match(self, path: str) -> Optional[str]:
+        for prefix in self.paths:
+            if path == prefix or path.startswith(prefix + "/"):
+                return prefix
+        return None
+
+    async def __call__(self, scope, receive, send):
+        label = None
+        if scope["type"] == "http" and scope.get("method") == "GET":
+            label = self.match(scope.get("path", ""))
+        if label is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = request_key(scope)
+        pending = _inflight.get(key)
+        if pending is not None:
+            # shield: a follower whose client goes away must not cancel the shared future.
+            response = await asyncio.shield(pending)
+            if response is not None:
+                coalesced_requests.inc(path=label, role="follower")
+                if response.route is not None:
+                    scope["route"] = response.route  # so metrics label the follower by its route
+                await replay(send, response)
+                return
+            await self.app(scope, receive, send)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        _inflight[key] = future
+        coalesced_requests.inc(path=label, role="leader")
+        recorded: Optional[RecordedResponse] = None
+        shareable = True
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal recorded, shareable, size
+            if shareable:
+                if message["type"] == "http.response.start":
+                    recorded = RecordedResponse(start=message)
+                elif message["type"] == "http.response.body" and recorded is not None:
+                    chunk = message.get("body", b"")
+                    size += len(chunk)
+                    if size > MAX_SHARED_BODY_BYTES:
+                        shareable = False
+                    else:
+                        recorded.body.append(chunk)
+            await send(message)
+
+        complete = False
+        try:
+            await self.app(scope, receive, send_wrapper)
+            complete = True
+        finally:
+            if _inflight.get(key) is future:
+                del _inflight[key]
+            if recorded is not None:
+                recorded.route = scope.get("route")
+            future.set_result(recorded if complete and shareable else None)
@@ -0,0 +1,80 @@
+"""
+Opt-in fast JSON responses.
+
+By default FastAPI runs every returned dict through jsonable_encoder (a full
+recursive copy) and, with a response_model, validates the data again before
+the stdlib json encoder writes it out. For the large read endpoints
+(Strava activities, calendar events, the monthly wrap, Spotify top/recent)
+that work is pure overhead: the payload is already plain JSON types or a
+model the handler just built.
+
+With FAST_JSON=1 and orjson installed:
+- FastJSONResponse is the app's default response class (orjson instead of
+  json.dumps).
+- respond() wraps a handler's return value in a FastJSONResponse, which
+  FastAPI sends as-is: no jsonable_encoder pass and no response_model
+  re-validation. Pydantic models are dumped with model_dump_json (Rust).
+
+Without orjson, or with FAST_JSON unset, respond() returns its argument
+unchanged and everything behaves exactly as before; response_model still
+drives the OpenAPI schema either way.
+
+Env (python-backend/.env):
+  FAST_JSON=0                               # 1 enables the orjson response path
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("FAST_JSON", "0") in ("1", "true", "yes") and orjson is not None
+
+if os.getenv("FAST_JSON", "0") in ("1", "true", "yes") and orjson is None:
+    logger.warning("FAST_JSON is set but orjson is not installed; using the standard JSON path")
+
+
+def _default(value: Any) -> Any:
+    """Types orjson does not handle natively."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode()
+        return dumps(content)
+
+
+def default_response_class() -> type[JSONResponse]:
+    return FastJSONResponse if ENABLED else JSONResponse
+
+
+def respond(content: Any, status_code: int = 200) -> Any:
+    """Send already-serializable content directly when the fast path is on."""
+    if not ENABLED or isinstance(content, Response):
+        return content
+    return FastJSONResponse(content, status_code=status_code)
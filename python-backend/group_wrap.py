@@ -0,0 +1,310 @@
+"""
+Monthly recap for a whole group, computed in batch.
+
+A background job walks every group with members. For each group it reads all
+members' life updates for the month in one query, reuses the per-member music
+aggregate the personal wrap already caches, and asks the LLM for one recap of
+the whole group: one call per group, never one per member.
+
+Every member can read the result, so it only carries group-level totals.
+Per-member listening and calendar details stay in each user's own wrap and
+never reach the prompt, the stored row or the response.
+
+The stored row carries a fingerprint of the member list plus every life
+update and group summary posted this month. Nothing is recomputed (and no
+LLM call is made) until a member posts, edits a life update, joins or leaves.
+
+Expected table (see supabase/migrations):
+
+CREATE TABLE IF NOT EXISTS group_wraps (
+  group_id uuid REFERENCES groups(id) ON DELETE CASCADE,
+  month text NOT NULL,                      -- 'YYYY-MM'
+  recap text NOT NULL,
+  stats jsonb NOT NULL DEFAULT '{}',        -- group totals only, no per-member data
+  photo_urls jsonb NOT NULL DEFAULT '[]',
+  fingerprint text,
+  computed_at timestamptz DEFAULT now(),
+  PRIMARY KEY (group_id, month)
+);
+
+Env (python-backend/.env):
+  GROUP_WRAP_INTERVAL_SECONDS=3600          # 0 disables the batch job
+  GROUP_WRAP_CONCURRENCY=2                  # groups computed at once
+  GROUP_WRAP_MEMBER_CONCURRENCY=4           # member aggregates loaded at once per group
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+import background_jobs
+from metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
+GROUP_WRAP_INTERVAL_SECONDS = int(os.getenv("GROUP_WRAP_INTERVAL_SECONDS", "3600"))
+GROUP_WRAP_CONCURRENCY = max(1, int(os.getenv("GROUP_WRAP_CONCURRENCY", "2")))
+GROUP_WRAP_MEMBER_CONCURRENCY = max(1, int(os.getenv("GROUP_WRAP_MEMBER_CONCURRENCY", "4")))
+UPDATES_PER_MEMBER = 3
+MAX_GROUP_PHOTOS = 12
+
+# Keep references so fire-and-forget refreshes aren't garbage collected mid-run.
+_refresh_tasks: set[asyncio.Task] = set()
+# One computation per group at a time; a second caller waits and then sees the stored row.
+_group_locks: dict[str, asyncio.Lock] = {}
+
+
+def _wrap():
+    # Imported lazily: the wrap router imports this module for its group route.
+    from routers import wrap
+    return wrap
+
+
+# ---------- Reads ----------
+def list_members(group_id: str) -> list[str]:
+    sb = _wrap().supabase
+    if not sb:
+        return []
+    with track_upstream("supabase", "group_members.select"):
+        res = sb.table("group_members").select("user_id").eq("group_id", group_id).execute()
+    rows = getattr(res, "data", None) or []
+    return sorted({str(row["user_id"]) for row in rows if row.get("user_id")})
+
+
+def load_group_name(group_id: str) -> Optional[str]:
+    sb = _wrap().supabase
+    if not sb:
+        return None
+    with track_upstream("supabase", "groups.select"):
+        res = sb.table("groups").select("name").eq("id", group_id).limit(1).execute()
+    rows = getattr(res, "data", None) or []
+    return rows[0].get("name") if rows else None
+
+
+def load_member_updates(member_ids: list[str], start: datetime, end: datetime) -> list[dict]:
+    """Every member's life updates for the month in a single query, newest first."""
+    sb = _wrap().supabase
+    if not sb or not member_ids:
+        return []
+    with track_upstream("supabase", "life_updates.select") as call_span:
+        res = (
+            sb.table("life_updates")
+            .select("id, user_id, title, ai_summary, user_summary, created_at, updated_at, photos")
+            .in_("user_id", member_ids)
+            .gte("created_at", start.isoformat())
+            .lte("created_at", end.isoformat())
+            .order("created_at", desc=True)
+            .execute()
+        )
+        rows = getattr(res, "data", None) or []
+        call_span.set(rows=len(rows), members=len(member_ids))
+    return rows
+
+
+def load_group_posts(group_id: str, start: datetime, end: datetime) -> list[dict]:
+    sb = _wrap().supabase
+    if not sb:
+        return []
+    with track_upstream("supabase", "summaries.select"):
+        res = (
+            sb.table("summaries")
+            .select("id, created_at")
+            .eq("group_id", group_id)
+            .gte("created_at", start.isoformat())
+            .lte("created_at", end.isoformat())
+            .execute()
+        )
+    return getattr(res, "data", None) or []
+
+
+def fingerprint(month: str, member_ids: list[str], updates: list[dict], posts: list[dict]) -> str:
+    """Changes when anyone posts, edits a life update, joins or leaves (summaries have no updated_at)."""
+    digest = hashlib.sha1(month.encode())
+    digest.update(",".join(member_ids).encode())
+    for row in sorted(updates + posts, key=lambda row: str(row.get("id"))):
+        digest.update(f"|{row.get('id')}@{row.get('updated_at') or row.get('created_at')}".encode())
+    return digest.hexdigest()
+
+
+# ---------- Storage ----------
+def load_group_wrap(group_id: str, month: str) -> Optional[dict]:
+    sb = _wrap().supabase
+    if not sb:
+        return None
+    with track_upstream("supabase", "group_wraps.select"):
+        res = (
+            sb.table("group_wraps")
+            .select("recap, stats, photo_urls, fingerprint, computed_at")
+            .eq("group_id", group_id)
+            .eq("month", month)
+            .limit(1)
+            .execute()
+        )
+    rows = getattr(res, "data", None) or []
+    return rows[0] if rows else None
+
+
+def store_group_wrap(group_id: str, month: str, row: dict) -> None:
+    sb = _wrap().supabase
+    if not sb:
+        return
+    with track_upstream("supabase", "group_wraps.upsert"):
+        res = sb.table("group_wraps").upsert({"group_id": group_id, "month": month, **row}, on_conflict="group_id,month").execute()
+    error = getattr(res, "error", None)
+    if error:
+        raise RuntimeError(f"Supabase upsert error: {error}")
+
+
+# ---------- Compute ----------
+def build_group_prompt(month_label: str, group_name: Optional[str], members: list[dict], minutes_listened: int) -> str:
+    sections = []
+    for index, member in enumerate(members, start=1):
+        if member["snippets"]:
+            lines = [f"Member {index}:"] + [f"  - {snippet}" for snippet in member["snippets"]]
+            sections.append("\n".join(lines))
+    music = f"\nTogether the group listened to {minutes_listened} minutes of music." if minutes_listened else ""
+
+    return f"""
+You are writing a shared month-in-review for a friend group{f' called "{group_name}"' if group_name else ''}.
+Write 4–6 warm sentences that weave members' moments together (shared themes first, then standouts).
+Refer to people as "someone", "one of you", etc. — never invent names. End with 3 simple hashtags.
+Month: {month_label}
+{chr(10).join(sections) or "No one has posted yet this month."}{music}
+"""
+
+
+async def compute_group_wrap(group_id: str, member_ids: list[str], updates: list[dict], fingerprint_value: str) -> dict:
+    wrap = _wrap()
+    start, end = wrap.current_month_range()
+    month_label = start.strftime("%B %Y")
+    group_name = await asyncio.to_thread(load_group_name, group_id)
+
+    by_member: dict[str, list[dict]] = {member_id: [] for member_id in member_ids}
+    for row in updates:
+        by_member.setdefault(str(row.get("user_id")), []).append(row)
+
+    semaphore = asyncio.Semaphore(GROUP_WRAP_MEMBER_CONCURRENCY)
+
+    async def member_summary(member_id: str) -> dict:
+        # Only the listening total is used; it goes into the group sum, never per member.
+        async with semaphore:
+            music, _ = await wrap.member_month_aggregate(member_id, start, end)
+        rows = by_member.get(member_id, [])
+        snippets = []
+        for row in rows[:UPDATES_PER_MEMBER]:
+            text = row.get("ai_summary") or row.get("user_summary") or ""
+            if text:
+                snippets.append(text[:220] + ("…" if len(text) > 220 else ""))
+        return {"life_updates": len(rows), "snippets": snippets, "minutes_listened": music.total_minutes_listened}
+
+    members = await asyncio.gather(*(member_summary(member_id) for member_id in member_ids))
+    photos = [url for row in updates for url in (row.get("photos") or []) if url][:MAX_GROUP_PHOTOS]
+    stats = {
+        "member_count": len(members),
+        "active_members": sum(1 for member in members if member["life_updates"]),
+        "life_updates": sum(member["life_updates"] for member in members),
+        "minutes_listened": sum(member["minutes_listened"] for member in members),
+    }
+
+    fallback = (
+        f"{month_label} in this group: {stats['life_updates']} updates shared "
+        f"by {stats['active_members']} of {stats['member_count']} members. #together #goodvibes #month"
+    )
+    prompt = build_group_prompt(month_label, group_name, members, stats["minutes_listened"])
+    recap = await asyncio.to_thread(
+        wrap.complete_wrap_text,
+        prompt,
+        fallback,
+        "You write concise, kind group month-in-review recaps. Avoid marketing tone. Keep details non-identifying.",
+    )
+    return {
+        "recap": recap,
+        "stats": stats,
+        "photo_urls": photos,
+        "fingerprint": fingerprint_value,
+        "computed_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+async def current_state(group_id: str) -> tuple[str, list[str], list[dict], str]:
+    """(month, members, this month's updates, fingerprint) with three small queries."""
+    start, end = _wrap().current_month_range()
+    month = start.strftime("%Y-%m")
+    member_ids = await asyncio.to_thread(list_members, group_id)
+    updates, posts = await asyncio.gather(
+        asyncio.to_thread(load_member_updates, member_ids, start, end),
+        asyncio.to_thread(load_group_posts, group_id, start, end),
+    )
+    return month, member_ids, updates, fingerprint(month, member_ids, updates, posts)
+
+
+async def refresh_group(group_id: str) -> Optional[dict]:
+    """Recompute this month's recap if anything changed; returns the current row."""
+    lock = _group_locks.setdefault(group_id, asyncio.Lock())
+    async with lock:
+        month, member_ids, updates, current = await current_state(group_id)
+        stored = await asyncio.to_thread(load_group_wrap, group_id, month)
+        if stored and stored.get("fingerprint") == current:
+            return stored
+        if not member_ids:
+            return stored
+        row = await compute_group_wrap(group_id, member_ids, updates, current)
+        await asyncio.to_thread(store_group_wrap, group_id, month, row)
+        return row
+
+
+def request_refresh(group_id: str) -> None:
+    """Schedule a recompute now (e.g. a read found the stored recap stale)."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # no loop (sync context); the periodic job will pick it up
+
+    async def run() -> None:
+        try:
+            await refresh_group(group_id)
+        except Exception as e:
+            logger.warning("Group wrap refresh failed: %s", e, extra={"group_id": group_id})
+
+    task = loop.create_task(run())
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+def list_group_ids() -> list[str]:
+    sb = _wrap().supabase
+    if not sb:
+        return []
+    with track_upstream("supabase", "group_members.select"):
+        res = sb.table("group_members").select("group_id").execute()
+    rows = getattr(res, "data", None) or []
+    return sorted({str(row["group_id"]) for row in rows if row.get("group_id")})
+
+
+async def refresh_all_groups() -> dict:
+    group_ids = await asyncio.to_thread(list_group_ids)
+    semaphore = asyncio.Semaphore(GROUP_WRAP_CONCURRENCY)
+    failed = 0
+
+    async def run(group_id: str) -> None:
+        nonlocal failed
+        async with semaphore:
+            try:
+                await refresh_group(group_id)
+            except Exception as e:
+                failed += 1
+                logger.warning("Group wrap refresh failed: %s", e, extra={"group_id": group_id})
+
+    await asyncio.gather(*(run(group_id) for group_id in group_ids))
+    return {"groups": len(group_ids), "failed": failed}
+
+
+def start_refresher() -> None:
+    if not _wrap().supabase:
+        return
+    background_jobs.start_periodic("group_wraps", GROUP_WRAP_INTERVAL_SECONDS, refresh_all_groups, initial_delay=120)
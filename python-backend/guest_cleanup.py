@@ -0,0 +1,234 @@
+"""
+Scheduled cleanup of expired guest accounts.
+
+Guest users carry `expires_at` in their user_metadata (see routers/guest.py).
+A background job pages through auth users, collects the expired guests and
+deletes them in batches: one query per table per batch for `life_updates`
+and `integrations`, one storage call for their photos, then the auth users
+themselves with bounded concurrency. Content-addressed photos (see
+photo_store.py) can be shared with other users' updates, so those are only
+removed once nothing outside the batch references them. Tables that reference auth.users with
+ON DELETE CASCADE (spotify_plays, calendar_highlights, group tables) are
+cleared by Postgres.
+
+This replaces the one-by-one `cleanup-guests` edge function for deployments
+running the Python backend.
+
+Env (python-backend/.env):
+  GUEST_CLEANUP_INTERVAL_SECONDS=3600      # 0 disables the job
+  GUEST_CLEANUP_BATCH_SIZE=50
+  GUEST_CLEANUP_CONCURRENCY=8
+  SUPABASE_BUCKET=...                      # bucket holding life update photos
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+
+import background_jobs
+from backend_utils import storage_path_from_url
+import metrics
+import photo_store
+from metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+CLEANUP_INTERVAL_SECONDS = int(os.getenv("GUEST_CLEANUP_INTERVAL_SECONDS", "3600"))
+CLEANUP_BATCH_SIZE = max(1, int(os.getenv("GUEST_CLEANUP_BATCH_SIZE", "50")))
+CLEANUP_CONCURRENCY = max(1, int(os.getenv("GUEST_CLEANUP_CONCURRENCY", "8")))
+SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET")
+LIST_PAGE_SIZE = 1000
+STORAGE_REMOVE_CHUNK = 1000
+
+_last_run: dict[str, Any] = {}
+_totals = {"runs": 0, "deleted": 0, "failed": 0, "photos_removed": 0}
+
+
+def _supabase():
+    # Imported lazily: the guest router exposes these stats.
+    from routers import guest
+    return guest.supabase
+
+
+def _field(obj: Any, name: str) -> Any:
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def parse_expires_at(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00") if value.endswith("Z") else value)
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def is_expired_guest(user: Any, now: datetime) -> bool:
+    meta = _field(user, "user_metadata") or {}
+    if not meta.get("guest"):
+        return False
+    expires_at = parse_expires_at(meta.get("expires_at"))
+    return expires_at is not None and expires_at < now
+
+
+# ---------- Supabase calls (blocking; run via asyncio.to_thread) ----------
+def list_expired_guest_ids(now: datetime) -> tuple[list[str], int]:
+    """Page through every auth user; returns (expired guest ids, users scanned)."""
+    sb = _supabase()
+    expired: list[str] = []
+    scanned = 0
+    page = 1
+    while True:
+        with track_upstream("supabase", "auth.list_users"):
+            users = sb.auth.admin.list_users(page=page, per_page=LIST_PAGE_SIZE)
+        users = users if isinstance(users, list) else (_field(users, "users") or [])
+        scanned += len(users)
+        expired.extend(str(_field(user, "id")) for user in users if is_expired_guest(user, now))
+        # Deleting is deferred until listing is done so page offsets don't shift under us.
+        if len(users) < LIST_PAGE_SIZE:
+            return expired, scanned
+        page += 1
+
+
+def delete_batch_rows(user_ids: list[str]) -> int:
+    """Remove photos, life updates and integrations for a batch; returns photos removed."""
+    sb = _supabase()
+    with track_upstream("supabase", "life_updates.select"):
+        res = sb.table("life_updates").select("photos").in_("user_id", user_ids).execute()
+    rows = getattr(res, "data", None) or []
+
+    paths: list[str] = []
+    shared: dict[str, str] = {}
+    if SUPABASE_BUCKET:
+        for row in rows:
+            for url in row.get("photos") or []:
+                path = storage_path_from_url(url, SUPABASE_BUCKET)
+                if not path:
+                    continue
+                if photo_store.is_content_addressed(path):
+                    shared[path] = url
+                else:
+                    paths.append(path)
+        paths += photo_store.unreferenced_objects(sb, shared, user_ids)
+    for start in range(0, len(paths), STORAGE_REMOVE_CHUNK):
+        with track_upstream("supabase", "storage.remove"):
+            sb.storage.from_(SUPABASE_BUCKET).remove(paths[start:start + STORAGE_REMOVE_CHUNK])
+
+    with track_upstream("supabase", "life_updates.delete"):
+        sb.table("life_updates").delete().in_("user_id", user_ids).execute()
+    try:
+        with track_upstream("supabase", "integrations.delete"):
+            sb.table("integrations").delete().in_("user_id", user_ids).execute()
+    except Exception as e:
+        # Not every deployment has the integrations table.
+        logger.info("Guest cleanup: integrations delete skipped: %s", e)
+    return len(paths)
+
+
+def delete_auth_user(user_id: str) -> None:
+    with track_upstream("supabase", "auth.delete_user"):
+        _supabase().auth.admin.delete_user(user_id)
+
+
+# ---------- Job ----------
+async def delete_batch(user_ids: list[str], semaphore: asyncio.Semaphore) -> tuple[int, int, int]:
+    """Returns (deleted, failed, photos_removed) for one batch."""
+    async with semaphore:
+        try:
+            photos = await asyncio.to_thread(delete_batch_rows, user_ids)
+        except Exception as e:
+            logger.warning("Guest cleanup batch failed: %s", e, extra={"batch_size": len(user_ids)})
+            return 0, len(user_ids), 0
+
+    async def delete_one(user_id: str) -> bool:
+        async with semaphore:
+            try:
+                await asyncio.to_thread(delete_auth_user, user_id)
+                return True
+            except Exception as e:
+                logger.warning("Guest cleanup failed to delete user: %s", e, extra={"user_id": user_id})
+                return False
+
+    results = await asyncio.gather(*(delete_one(user_id) for user_id in user_ids))
+    deleted = sum(results)
+    return deleted, len(user_ids) - deleted, photos
+
+
+async def cleanup_expired_guests() -> dict:
+    if not _supabase():
+        return {}
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    expired, scanned = await asyncio.to_thread(list_expired_guest_ids, now)
+    listed = time.perf_counter()
+
+    semaphore = asyncio.Semaphore(CLEANUP_CONCURRENCY)
+    batches = [expired[i:i + CLEANUP_BATCH_SIZE] for i in range(0, len(expired), CLEANUP_BATCH_SIZE)]
+    results = await asyncio.gather(*(delete_batch(batch, semaphore) for batch in batches))
+    deleted = sum(result[0] for result in results)
+    failed = sum(result[1] for result in results)
+    photos = sum(result[2] for result in results)
+    finished = time.perf_counter()
+
+    delete_seconds = finished - listed
+    summary = {
+        "started_at": now.isoformat(),
+        "scanned": scanned,
+        "expired": len(expired),
+        "deleted": deleted,
+        "failed": failed,
+        "photos_removed": photos,
+        "batches": len(batches),
+        "list_seconds": round(listed - started, 3),
+        "delete_seconds": round(delete_seconds, 3),
+        "deleted_per_second": round(deleted / delete_seconds, 2) if delete_seconds > 0 else 0.0,
+    }
+    _last_run.clear()
+    _last_run.update(summary)
+    _totals["runs"] += 1
+    _totals["deleted"] += deleted
+    _totals["failed"] += failed
+    _totals["photos_removed"] += photos
+    if expired:
+        logger.info("Guest cleanup finished", extra=summary)
+    return summary
+
+
+def cleanup_stats() -> dict:
+    return {"interval_seconds": CLEANUP_INTERVAL_SECONDS, "totals": dict(_totals), "last_run": dict(_last_run)}
+
+
+def _collect_metrics():
+    yield (
+        "guest_cleanup_total",
+        "counter",
+        "Guest cleanup runs, deleted and failed accounts, removed photos.",
+        [({"kind": name}, value) for name, value in _totals.items()],
+    )
+    yield (
+        "guest_cleanup_last_deleted_per_second",
+        "gauge",
+        "Deletion throughput of the most recent cleanup run.",
+        [({}, _last_run.get("deleted_per_second", 0.0))],
+    )
+
+
+metrics.register_collector(_collect_metrics)
+
+
+def start_cleanup() -> None:
+    if not _supabase():
+        return
+    background_jobs.start_periodic(
+        "guest_cleanup", CLEANUP_INTERVAL_SECONDS, cleanup_expired_guests, initial_delay=120
+    )
@@ -0,0 +1,135 @@
+"""
+Conditional-request cache for provider GET calls (Spotify, Strava, Google).
+
+Responses that carry an ETag and/or Last-Modified header are kept (already
+parsed) per (provider, cache scope, url, params). The scope is the user the
+response belongs to; it is not the access token, which rotates on every
+refresh and would orphan the entry. Calls without a scope are not cached.
+The next identical request sends
+If-None-Match / If-Modified-Since, and a 304 reuses the stored body, so
+unchanged data costs a tiny round-trip and no re-download or re-parse.
+
+Cached bodies are shared between callers: treat them as read-only.
+
+Env (python-backend/.env):
+  HTTP_CACHE_MAX_ENTRIES=4096
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, NamedTuple, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from cache_utils import TTLCache
+import metrics
+from metrics import track_upstream
+
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "4096"))
+# Validators keep an entry useful for a long time; the LRU bound keeps memory in check.
+HTTP_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+_entries = TTLCache(maxsize=HTTP_CACHE_MAX_ENTRIES, ttl=HTTP_CACHE_TTL_SECONDS)
+_stats: dict[str, dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+class ConditionalResult(NamedTuple):
+    status_code: int
+    body: Any  # parsed JSON for 200 (fresh or revalidated), None otherwise
+    text: str
+    from_cache: bool
+
+
+def _cache_key(provider: str, cache_scope: str, url: str, params: Optional[dict]) -> tuple:
+    normalized = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+    return (provider, cache_scope, url, normalized)
+
+
+def _record(provider: str, field: str) -> None:
+    with _stats_lock:
+        counters = _stats.setdefault(
+            provider, {"requests": 0, "conditional": 0, "not_modified": 0, "full": 0, "errors": 0}
+        )
+        counters[field] += 1
+
+
+async def conditional_get(
+    provider: str,
+    url: str,
+    headers: dict[str, str],
+    params: Optional[dict] = None,
+    timeout: float = 20.0,
+    operation: Optional[str] = None,
+    cache_scope: Optional[str] = None,
+) -> ConditionalResult:
+    """
+    GET with ETag/Last-Modified revalidation. A 304 is reported as a 200 with
+    the cached body. httpx.RequestError propagates so callers keep their own
+    provider-specific 502 handling. `operation` labels the latency metric
+    (defaults to the URL path; pass one when the path embeds ids).
+    `cache_scope` is whose data this is (the user id); None skips the cache.
+    """
+    key = _cache_key(provider, cache_scope, url, params) if cache_scope else None
+    cached = _entries.get(key) if key else None
+    request_headers = dict(headers)
+    if cached:
+        if cached.get("etag"):
+            request_headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            request_headers["If-Modified-Since"] = cached["last_modified"]
+
+    _record(provider, "requests")
+    if cached:
+        _record(provider, "conditional")
+
+    with track_upstream(provider, operation or urlparse(url).path) as call_span:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            resp = await client.get(url, params=params, headers=request_headers)
+        call_span.set(status_code=resp.status_code, bytes=len(resp.content), conditional=bool(cached))
+
+    if resp.status_code == 304 and cached:
+        _record(provider, "not_modified")
+        return ConditionalResult(200, cached["body"], "", True)
+
+    if resp.status_code != 200:
+        _record(provider, "errors")
+        return ConditionalResult(resp.status_code, None, resp.text, False)
+
+    _record(provider, "full")
+    body = resp.json()
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+    if key and (etag or last_modified):
+        _entries.set(key, {"etag": etag, "last_modified": last_modified, "body": body})
+    elif cached:
+        _entries.pop(key)
+    return ConditionalResult(200, body, "", False)
+
+
+def stats() -> dict:
+    """Per-provider counters plus the share of requests answered by a 304."""
+    with _stats_lock:
+        snapshot = {provider: dict(counters) for provider, counters in _stats.items()}
+    for counters in snapshot.values():
+        requests = counters["requests"]
+        counters["hit_rate"] = round(counters["not_modified"] / requests, 4) if requests else 0.0
+    return {"providers": snapshot, "entries": len(_entries)}
+
+
+def _collect_metrics():
+    with _stats_lock:
+        snapshot = {provider: dict(counters) for provider, counters in _stats.items()}
+    samples = [
+        ({"provider": provider, "outcome": outcome}, counters[outcome])
+        for provider, counters in snapshot.items()
+        for outcome in ("not_modified", "full", "errors")
+    ]
+    yield ("http_cache_requests_total", "counter", "Provider GETs by revalidation outcome.", samples)
+    yield ("http_cache_entries", "gauge", "Cached provider responses.", [({}, len(_entries))])
+
+
+metrics.register_collector(_collect_metrics)
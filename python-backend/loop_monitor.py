@@ -0,0 +1,172 @@
+"""
+Opt-in event-loop stall detector.
+
+A heartbeat coroutine wakes every LOOP_MONITOR_INTERVAL_MS and records how
+late it was (event_loop_lag_seconds). A watchdog thread checks the heartbeat;
+when the loop has not come back for LOOP_STALL_THRESHOLD_MS, something is
+running blocking code inside `async def`. The watchdog then grabs the loop
+thread's stack via sys._current_frames(), looks up the asyncio task that is
+running, and logs one warning with the route and request id that task is
+serving (recorded by LoopMonitorMiddleware) or the background job name.
+
+Meant for staging and load tests: the watchdog reads interpreter internals
+from another thread, which is cheap but not free.
+
+Env (python-backend/.env):
+  LOOP_MONITOR=0                            # 1 enables the heartbeat, watchdog and middleware
+  LOOP_MONITOR_INTERVAL_MS=50
+  LOOP_STALL_THRESHOLD_MS=200
+  LOOP_STALL_STACK_DEPTH=30
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from typing import Optional
+
+import metrics
+import tracing
+from tracing import route_template
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("LOOP_MONITOR", "0") in ("1", "true", "yes")
+INTERVAL_SECONDS = max(0.005, float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50")) / 1000)
+STALL_THRESHOLD_SECONDS = max(0.01, float(os.getenv("LOOP_STALL_THRESHOLD_MS", "200")) / 1000)
+STACK_DEPTH = int(os.getenv("LOOP_STALL_STACK_DEPTH", "30"))
+
+loop_lag = metrics.Histogram(
+    "event_loop_lag_seconds",
+    "How late the event-loop heartbeat woke up.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+loop_stalls = metrics.Counter(
+    "event_loop_stalls_total",
+    "Times the loop was blocked longer than the stall threshold, by the route being served.",
+    ("route",),
+)
+
+# Task -> (ASGI scope, request id) for tasks currently serving a request.
+_task_scopes: "weakref.WeakKeyDictionary[asyncio.Task, tuple[dict, Optional[str]]]" = weakref.WeakKeyDictionary()
+_last_beat = 0.0
+_heartbeat_task: Optional[asyncio.Task] = None
+_watchdog: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def _describe_task(loop: asyncio.AbstractEventLoop) -> tuple[str, Optional[str], Optional[str]]:
+    """(route, request id, task name) for whatever task the loop is running right now."""
+    try:
+        task = asyncio.current_task(loop)
+    except Exception:
+        task = None
+    if task is None:
+        # A callback or to_thread completion, not a task step.
+        return "<callback>", None, None
+    name = task.get_name()
+    entry = _task_scopes.get(task)
+    if entry is None:
+        return (name if name.startswith("background:") else "<other>"), None, name
+    scope, request_id = entry
+    # By the time an endpoint blocks, routing has stored the matched route in the scope.
+    return f"{scope.get('method')} {route_template(scope)}", request_id, name
+
+
+def _capture_stack(thread_id: int) -> str:
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return ""
+    return "".join(traceback.format_stack(frame, limit=STACK_DEPTH))
+
+
+def _watch(loop: asyncio.AbstractEventLoop, loop_thread_id: int) -> None:
+    reported_beat = None
+    while not _stop.wait(STALL_THRESHOLD_SECONDS / 4):
+        beat = _last_beat
+        blocked = time.monotonic() - beat
+        if blocked < STALL_THRESHOLD_SECONDS or beat == reported_beat:
+            continue
+        # One report per stall; the heartbeat's lag sample records how long it lasted.
+        reported_beat = beat
+        route, request_id, task_name = _describe_task(loop)
+        stack = _capture_stack(loop_thread_id)
+        loop_stalls.inc(route=route)
+        logger.warning(
+            "Event loop blocked for %.0f ms in %s",
+            blocked * 1000,
+            route,
+            extra={
+                "blocked_ms": round(blocked * 1000, 1),
+                "route": route,
+                "stalled_request_id": request_id,
+                "task": task_name,
+                "stack": stack,
+            },
+        )
+
+
+async def _heartbeat() -> None:
+    global _last_beat
+    while True:
+        expected = time.monotonic() + INTERVAL_SECONDS
+        await asyncio.sleep(INTERVAL_SECONDS)
+        now = time.monotonic()
+        _last_beat = now
+        loop_lag.observe(max(0.0, now - expected))
+
+
+def start() -> None:
+    """Start the heartbeat and watchdog on the running loop (no-op unless LOOP_MONITOR=1)."""
+    global _heartbeat_task, _watchdog, _last_beat
+    if not ENABLED or _heartbeat_task is not None:
+        return
+    loop = asyncio.get_running_loop()
+    _last_beat = time.monotonic()
+    _stop.clear()
+    _heartbeat_task = loop.create_task(_heartbeat(), name="loop-monitor:heartbeat")
+    _watchdog = threading.Thread(
+        target=_watch, args=(loop, threading.get_ident()), name="loop-monitor-watchdog", daemon=True
+    )
+    _watchdog.start()
+    logger.info(
+        "Event loop monitor started",
+        extra={"interval_ms": INTERVAL_SECONDS * 1000, "threshold_ms": STALL_THRESHOLD_SECONDS * 1000},
+    )
+
+
+async def stop() -> None:
+    global _heartbeat_task, _watchdog
+    _stop.set()
+    task, _heartbeat_task = _heartbeat_task, None
+    if task:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    if _watchdog:
+        _watchdog.join(timeout=1)
+        _watchdog = None
+
+
+class LoopMonitorMiddleware:
+    """Remembers which route each request task serves so stalls can be attributed."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        task = asyncio.current_task() if scope["type"] == "http" else None
+        if task is None:
+            await self.app(scope, receive, send)
+            return
+
+        _task_scopes[task] = (scope, tracing.current_request_id())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _task_scopes.pop(task, None)
@@ -1,5 +1,6 @@
 import base64
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+import logging
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Response
 from pydantic import BaseModel
 from openai import OpenAI
 from supabase import create_client, Client
@@ -7,14 +8,34 @@ import os
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List
-from backend_utils import clean_storage_url, _safe_name
+from backend_utils import clean_storage_url
+import admission
+import background_jobs
+import calendar_highlights
+import coalescing
+import group_wrap
+import guest_cleanup
+import fast_json
+import http_cache
+import loop_monitor
+import metrics
+import photo_store
+import storage_urls
+import tracing
+from metrics import track_upstream
 from routers import strava
 from routers import spotify
+from routers import spotify_history
 from routers import google_calendar
 from routers import wrap
 from routers import guest
+from routers import timeline
+from routers import prefetch
+from routers import dashboard
 
 load_dotenv()
+tracing.configure_logging()
+logger = logging.getLogger("main")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 # SUPABASE_KEY = os.getenv("VITE_SUPABASE_PUBLISHABLE_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -25,7 +46,13 @@ client = OpenAI(api_key=OPENAI_API_KEY)
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
-app = FastAPI()
+app = FastAPI(default_response_class=fast_json.default_response_class())
+# Innermost, so shed requests still get CORS headers and show up in metrics.
+if admission.ENABLED:
+    app.add_middleware(admission.AdmissionMiddleware)
+# Outside admission: duplicate GETs replay the leader's response without taking a slot.
+if coalescing.ENABLED:
+    app.add_middleware(coalescing.CoalescingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Or specify your frontend URL(s)
@@ -33,17 +60,52 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Latency includes CORS handling; tracing is outermost so the request id covers everything.
+if loop_monitor.ENABLED:
+    app.add_middleware(loop_monitor.LoopMonitorMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(tracing.TracingMiddleware)
 
 @app.get("/")
 def read_root():
     # Simple health/root check so hitting the base URL doesn't 404 on hosts like Render
     return {"status": "ok"}
 
+@app.get("/api/cache/stats")
+def cache_stats():
+    # Per-provider ETag revalidation counters (304s are "hits")
+    return {"http": http_cache.stats()}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    # Prometheus scrape target: request latency, upstream timers, cache/pool/cleanup counters
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 app.include_router(strava.router, prefix="/api/strava", tags=["strava"])
 app.include_router(spotify.router, prefix="/api/spotify", tags=["spotify"])
+app.include_router(spotify_history.router, prefix="/api/spotify", tags=["spotify"])
 app.include_router(google_calendar.router, prefix="/api/google", tags=["google"])
 app.include_router(wrap.router, prefix="/api/wrap", tags=["wrap"])
 app.include_router(guest.router, prefix="/api/guest", tags=["guest"])
+app.include_router(timeline.router, prefix="/api/timeline", tags=["timeline"])
+app.include_router(prefetch.router, prefix="/api/prefetch", tags=["prefetch"])
+app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
+
+
+@app.on_event("startup")
+async def start_background_jobs():
+    loop_monitor.start()
+    spotify_history.start_ingester()
+    calendar_highlights.start_refresher()
+    guest.start_pool()
+    guest_cleanup.start_cleanup()
+    group_wrap.start_refresher()
+
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    await background_jobs.stop_all()
+    await loop_monitor.stop()
 
 # print("HEREEEE", supabase.storage.list_buckets())
 
@@ -55,19 +117,14 @@ async def summarize_update(
 ):
     try:
         photo_urls = []
-        for f in photos:
-            file_bytes = await f.read()
-            filename = _safe_name(f.filename or "photo.jpg")
-            storage_path = f"updates/{update_id}/{filename}"
-            # Upload file to Supabase Storage (Like S3 - good for images)
-            upload_res = supabase.storage.from_(SUPABASE_BUCKET).upload(
-                    storage_path,
-                    file_bytes,
-                    file_options={"content-type": f.content_type or "image/jpeg"}
-            )
-            if getattr(upload_res, "error", None):
-                raise HTTPException(status_code=500, detail=f"Upload failed: {upload_res.error}")
-            
+        # Content-addressed: identical photos (retries, re-shares) are uploaded once.
+        hashed = [await photo_store.read_and_hash(f) for f in photos]
+        storage_paths, uploaded_bytes = photo_store.store_photos(supabase, SUPABASE_BUCKET, hashed)
+        logger.debug(
+            "Stored update photos",
+            extra={"update_id": update_id, "photos": len(hashed), "uploaded_bytes": uploaded_bytes},
+        )
+        for storage_path in storage_paths:
             # Get a public URL to store in DB (This necessitates making the bucket public)
             public_url_res = supabase.storage.from_(SUPABASE_BUCKET).get_public_url(storage_path)
             if isinstance(public_url_res, dict):
@@ -77,43 +134,46 @@ async def summarize_update(
             photo_urls.append(url)
 
         content_items = [{"type": "input_text", "text": f"Summarize this life update: {user_summary}"}]
-        for raw in photo_urls:
+        # photo_urls stay in public form for the DB; the model gets signed ones when the bucket is private.
+        for raw in storage_urls.resolve_urls(supabase, photo_urls):
             url = clean_storage_url(raw)
             content_items.append({"type": "input_image", "image_url": url})
         # Now call OpenAI with text + image URLs
-        response = client.responses.create(
-            model="gpt-5-mini",
-            input=[
-                {"role": "system", 
-                 "content": """
-                You create upbeat, authentic social updates from mixed text + images.
-                Fusion rules:
-                - Read text and images together; cross-reference details.
-                - If text and image conflict, prefer the text.
-                - If an image is ambiguous, describe it briefly without guessing.
-                - Merge overlapping details; avoid repeats.
-                - Keep privacy: no precise addresses or sensitive info.
-                Calendar safety:
-                - Calendar bullets may include work and personal plans. Only mention events that sound like personal highlights (birthdays, trips, social plans, holidays).
-                - Never mention company names, emails, meeting codes, or other sensitive work details.
-                - Keep locations vague (cities or \"trip\"/\"dinner\") instead of specific addresses.
-                Goal: produce a concise post + 3–5 hashtags.
-                Style: warm, encouraging, never cringe; 0–2 emojis; 3–5 simple hashtags.
-                Voice & vibe: warm, encouraging, playful but never cringe.
-                """
-                },
-                {"role": "user", "content": content_items}
-
-            ]
-        )
+        with track_upstream("openai", "responses.create") as call_span:
+            call_span.set(model="gpt-5-mini", images=len(content_items) - 1)
+            response = client.responses.create(
+                model="gpt-5-mini",
+                input=[
+                    {"role": "system", 
+                     "content": """
+                    You create upbeat, authentic social updates from mixed text + images.
+                    Fusion rules:
+                    - Read text and images together; cross-reference details.
+                    - If text and image conflict, prefer the text.
+                    - If an image is ambiguous, describe it briefly without guessing.
+                    - Merge overlapping details; avoid repeats.
+                    - Keep privacy: no precise addresses or sensitive info.
+                    Calendar safety:
+                    - Calendar bullets may include work and personal plans. Only mention events that sound like personal highlights (birthdays, trips, social plans, holidays).
+                    - Never mention company names, emails, meeting codes, or other sensitive work details.
+                    - Keep locations vague (cities or \"trip\"/\"dinner\") instead of specific addresses.
+                    Goal: produce a concise post + 3–5 hashtags.
+                    Style: warm, encouraging, never cringe; 0–2 emojis; 3–5 simple hashtags.
+                    Voice & vibe: warm, encouraging, playful but never cringe.
+                    """
+                    },
+                    {"role": "user", "content": content_items}
+
+                ]
+            )
 
         ai_summary = response.output_text.strip()
-        print("AI Summary:", ai_summary)
+        logger.debug("AI summary generated", extra={"update_id": update_id, "ai_summary": ai_summary})
         # Return to frontend for user review; frontend will persist after user confirmation.
         return {"success": True, "ai_summary": ai_summary, "photo_urls": photo_urls}
 
         # return {"success": True, "ai_summary": "Summary placeholder", "photo_urls": photo_urls}
 
     except Exception as e:
-        print(e)
+        logger.exception("summarize-update failed", extra={"update_id": update_id})
         raise HTTPException(status_code=500, detail=str(e))
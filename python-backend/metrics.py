@@ -0,0 +1,251 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+- MetricsMiddleware (pure ASGI) records per-route latency histograms, response
+  status counts and the number of in-flight requests. Routes are labelled by
+  their template (e.g. /api/google/events), never the raw path.
+- track_upstream() times client-side calls to Supabase, OpenAI, Strava,
+  Spotify and Google so the slowest upstream shows up in p95.
+- register_collector() lets modules that already keep their own counters
+  (http_cache, the guest pool, guest cleanup) appear on /metrics without
+  double bookkeeping.
+
+Everything lives in this process; with several workers each one exposes its
+own numbers.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional
+
+import tracing
+from tracing import route_template
+
+logger = logging.getLogger(__name__)
+
+# Seconds; wide enough to cover a cached GET and a slow LLM call.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (name, type, help, [(labels, value), ...])
+Family = tuple[str, str, str, list[tuple[dict[str, str], float]]]
+
+_metrics: list["_Metric"] = []
+_collectors: list[Callable[[], Iterable[Family]]] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: tuple[str, ...]) -> dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            row[index] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> list[tuple[dict[str, str], int, float]]:
+        """(labels, count, sum) per label set, e.g. for benchmark reports."""
+        with self._lock:
+            items = [(key, list(row)) for key, row in self._values.items()]
+        return [(self._labels(key), int(sum(row[:-1])), row[-1]) for key, row in items]
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = [(key, list(row)) for key, row in self._values.items()]
+        lines: list[str] = []
+        for key, row in items:
+            labels = self._labels(key)
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), row[:-1]):
+                cumulative += count
+                bucket_labels = {**labels, "le": _format_value(float(bound))}
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(row[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(cumulative)}")
+        return lines
+
+
+def register_collector(collector: Callable[[], Iterable[Family]]) -> None:
+    """Add a callback producing (name, type, help, samples) families at scrape time."""
+    _collectors.append(collector)
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            families = list(collector())
+        except Exception as e:
+            logger.warning("Metrics collector failed: %s", e)
+            continue
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+# ---------- Built-in metrics ----------
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Server-side request latency by route template.",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being handled.",
+)
+upstream_duration = Histogram(
+    "upstream_request_duration_seconds",
+    "Client-side latency of calls to Supabase, OpenAI and the integration providers.",
+    ("service", "operation", "outcome"),
+)
+
+
+@contextmanager
+def track_upstream(service: str, operation: str) -> Iterator[tracing.Span]:
+    """
+    Time an outbound call; usable around both blocking and awaited calls.
+    Also opens a trace span; callers can attach sizes via the yielded span.
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        with tracing.span(f"{service}.{operation}", service=service) as call_span:
+            yield call_span
+        outcome = "ok"
+    finally:
+        upstream_duration.observe(time.perf_counter() - started, service=service, operation=operation, outcome=outcome)
+
+
+class MetricsMiddleware:
+    def __init__(self, app, exclude_paths: Optional[set[str]] = None):
+        self.app = app
+        self.exclude_paths = exclude_paths or {"/metrics"}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                method=scope.get("method", ""),
+                route=route_template(scope),
+                status=str(status_code),
+            )
@@ -0,0 +1,220 @@
+"""
+Content-addressed storage for life update photos.
+
+Each photo is hashed (SHA-256) while it is read from the upload and stored at
+objects/<aa>/<sha256><ext>. The `photo_objects` table is the index of what
+the bucket already holds, so a retried request, a re-posted image or the same
+photo shared on several updates costs one indexed lookup instead of another
+upload. Paths never collide because the name is the content.
+
+Objects are shared, so deleting one must first make sure no remaining life
+update points at it (see unreferenced_objects, used by guest cleanup).
+`last_seen_at` is bumped every time a photo is reused, in the same statement
+that confirms the object exists, and cleanup only deletes index rows whose
+last_seen_at is still older than DELETE_GRACE at delete time. A reused photo
+is therefore either bumped before cleanup deletes it (and kept) or found
+missing and uploaded again. The grace window also covers uploads whose URLs
+the frontend hasn't saved to life_updates yet (summarize, then confirm).
+
+Env (python-backend/.env):
+  PHOTO_DELETE_GRACE_HOURS=24               # objects seen more recently are never deleted
+
+Expected table (see supabase/migrations):
+
+CREATE TABLE IF NOT EXISTS photo_objects (
+  sha256 text PRIMARY KEY,
+  path text NOT NULL,
+  bytes integer NOT NULL,
+  content_type text,
+  created_at timestamptz DEFAULT now(),
+  last_seen_at timestamptz DEFAULT now()
+);
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import mimetypes
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
+OBJECT_PREFIX = "objects/"
+READ_CHUNK_BYTES = 256 * 1024
+# Objects uploaded or reused within this window are never deleted by cleanup.
+# Long enough for a summarized update to be confirmed and saved.
+DELETE_GRACE = timedelta(hours=float(os.getenv("PHOTO_DELETE_GRACE_HOURS", "24")))
+
+
+@dataclass
+class HashedPhoto:
+    data: bytes
+    sha256: str
+    content_type: str
+    path: str
+
+
+def extension_for(content_type: str, filename: Optional[str]) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext and len(ext) <= 6 and ext[1:].isalnum():
+        return ext
+    return mimetypes.guess_extension(content_type or "") or ".jpg"
+
+
+def object_path(sha256: str, ext: str) -> str:
+    return f"{OBJECT_PREFIX}{sha256[:2]}/{sha256}{ext}"
+
+
+def is_content_addressed(path: str) -> bool:
+    return path.startswith(OBJECT_PREFIX)
+
+
+async def read_and_hash(upload) -> HashedPhoto:
+    """Read an UploadFile in chunks, hashing as it streams in."""
+    digest = hashlib.sha256()
+    chunks: list[bytes] = []
+    while True:
+        chunk = await upload.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        digest.update(chunk)
+        chunks.append(chunk)
+    sha256 = digest.hexdigest()
+    content_type = upload.content_type or "image/jpeg"
+    return HashedPhoto(
+        data=b"".join(chunks),
+        sha256=sha256,
+        content_type=content_type,
+        path=object_path(sha256, extension_for(content_type, upload.filename)),
+    )
+
+
+def touch_existing(sb: Any, hashes: list[str]) -> dict[str, str]:
+    """
+    {sha256: path} for hashes already in the bucket, bumping their last_seen_at
+    in the same update. Only rows this update touched are trusted: cleanup's
+    delete is conditional on an old last_seen_at, so it can no longer remove them.
+    """
+    if not sb or not hashes:
+        return {}
+    with track_upstream("supabase", "photo_objects.update") as call_span:
+        res = (
+            sb.table("photo_objects")
+            .update({"last_seen_at": datetime.now(timezone.utc).isoformat()})
+            .in_("sha256", list(dict.fromkeys(hashes)))
+            .execute()
+        )
+        rows = getattr(res, "data", None) or []
+        call_span.set(rows=len(rows))
+    return {row["sha256"]: row["path"] for row in rows}
+
+
+def record_objects(sb: Any, photos: list[HashedPhoto]) -> None:
+    """Index newly uploaded objects (one upsert)."""
+    if not sb or not photos:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    rows = {
+        photo.sha256: {
+            "sha256": photo.sha256,
+            "path": photo.path,
+            "bytes": len(photo.data),
+            "content_type": photo.content_type,
+            "last_seen_at": now,
+        }
+        for photo in photos
+    }
+    with track_upstream("supabase", "photo_objects.upsert"):
+        sb.table("photo_objects").upsert(list(rows.values()), on_conflict="sha256").execute()
+
+
+def store_photos(sb: Any, bucket: str, photos: list[HashedPhoto]) -> tuple[list[str], int]:
+    """
+    Storage paths for each photo (in order), uploading only content the
+    bucket doesn't have yet. Returns (paths, bytes uploaded).
+    """
+    paths = touch_existing(sb, [photo.sha256 for photo in photos])
+    uploaded: dict[str, HashedPhoto] = {}
+    for photo in photos:
+        if photo.sha256 in paths or photo.sha256 in uploaded:
+            continue
+        with track_upstream("supabase", "storage.upload") as call_span:
+            call_span.set(bytes=len(photo.data))
+            # upsert: a previous attempt may have uploaded the object but died before indexing it.
+            upload_res = sb.storage.from_(bucket).upload(
+                photo.path,
+                photo.data,
+                file_options={"content-type": photo.content_type, "upsert": "true"},
+            )
+        if getattr(upload_res, "error", None):
+            raise RuntimeError(f"Upload failed: {upload_res.error}")
+        uploaded[photo.sha256] = photo
+    record_objects(sb, list(uploaded.values()))
+    paths.update({sha256: photo.path for sha256, photo in uploaded.items()})
+    return [paths[photo.sha256] for photo in photos], sum(len(photo.data) for photo in uploaded.values())
+
+
+def unreferenced_objects(sb: Any, urls_by_path: dict[str, str], exclude_user_ids: list[str]) -> list[str]:
+    """
+    Content-addressed paths from `urls_by_path` that are safe to delete: not
+    seen within DELETE_GRACE and not referenced by any life update outside
+    `exclude_user_ids`. Their index rows are removed before returning; only
+    paths whose row this call actually deleted are returned.
+    """
+    if not urls_by_path:
+        return []
+    cutoff = (datetime.now(timezone.utc) - DELETE_GRACE).isoformat()
+    with track_upstream("supabase", "photo_objects.select"):
+        res = (
+            sb.table("photo_objects")
+            .select("sha256, path")
+            .in_("path", list(urls_by_path))
+            .lt("last_seen_at", cutoff)
+            .execute()
+        )
+    candidates = [row["path"] for row in getattr(res, "data", None) or []]
+    if not candidates:
+        return []
+
+    with track_upstream("supabase", "life_updates.select") as call_span:
+        res = (
+            sb.table("life_updates")
+            .select("photos")
+            .ov("photos", [urls_by_path[path] for path in candidates])
+            .not_.in_("user_id", exclude_user_ids)
+            .execute()
+        )
+        rows = getattr(res, "data", None) or []
+        call_span.set(rows=len(rows))
+    still_used = {url for row in rows for url in row.get("photos") or []}
+    removable = [path for path in candidates if urls_by_path[path] not in still_used]
+    if not removable:
+        return []
+
+    # Re-check the grace window in the delete itself: a photo reused since the
+    # select above has a fresh last_seen_at and keeps its row (and its object).
+    with track_upstream("supabase", "photo_objects.delete") as call_span:
+        res = (
+            sb.table("photo_objects")
+            .delete()
+            .in_("path", removable)
+            .lt("last_seen_at", cutoff)
+            .execute()
+        )
+        deleted = [row["path"] for row in getattr(res, "data", None) or []]
+        call_span.set(rows=len(deleted))
+    if not deleted:
+        return []
+
+    # A request that found the row gone re-uploads and re-indexes the object;
+    # skip any path indexed again since the delete so its new copy survives.
+    with track_upstream("supabase", "photo_objects.select"):
+        res = sb.table("photo_objects").select("path").in_("path", deleted).execute()
+    reindexed = {row["path"] for row in getattr(res, "data", None) or []}
+    return [path for path in deleted if path not in reindexed]
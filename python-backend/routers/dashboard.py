@@ -0,0 +1,137 @@
+# routers/dashboard.py
+"""
+One payload for the LifeUpdates page: Strava activities, Spotify top and
+Spotify recent.
+
+All of the user's integration rows are read in a single query and handed to
+the providers' token helpers, so tokens aren't re-loaded per section. The
+sections are fetched concurrently (Spotify top and recent share one token
+check) and each reports its own status and timing; one failing provider
+never fails the whole response.
+
+Section status: "ok" | "not_connected" | "error" (with `error` and `status_code`).
+
+Table: integrations (user_id, provider, access_token, refresh_token, expires_at, ...)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, HTTPException, Query
+
+import fast_json
+from metrics import track_upstream
+from routers import spotify, strava
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Optional Supabase client (works when service role envs are present)
+try:
+    from supabase import Client, create_client  # type: ignore
+except Exception:
+    create_client = None
+    Client = None  # type: ignore
+
+SUPABASE_URL = os.getenv("SUPABASE_URL") or os.getenv("VITE_SUPABASE_URL")
+SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+supabase: Optional[Client] = None
+if create_client and SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY:
+    try:
+        supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    except Exception as e:  # pragma: no cover - best-effort init
+        logger.warning("Supabase init failed for /api/dashboard routes: %s", e)
+        supabase = None
+
+router = APIRouter()
+
+
+def load_integrations(user_id: str) -> dict[str, dict]:
+    """{provider: integrations row} for every provider the user connected (one query)."""
+    with track_upstream("supabase", "integrations.select") as call_span:
+        res = supabase.table("integrations").select("*").eq("user_id", user_id).execute()
+        rows = getattr(res, "data", None) or []
+        call_span.set(rows=len(rows))
+    return {row["provider"]: row for row in rows if row.get("provider")}
+
+
+async def run_section(connected: bool, fetch: Callable[[], Awaitable[dict]]) -> dict:
+    if not connected:
+        return {"status": "not_connected", "ms": 0.0, "data": None}
+    started = time.perf_counter()
+    section: dict = {"status": "ok", "data": None}
+    try:
+        section["data"] = await fetch()
+    except HTTPException as e:
+        section.update(status="error", error=e.detail, status_code=e.status_code)
+    except Exception as e:
+        logger.warning("Dashboard section failed: %s", e)
+        section.update(status="error", error=str(e), status_code=500)
+    section["ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return section
+
+
+# ---------- Routes ----------
+@router.get("")
+async def dashboard(
+    user_id: str = Query(..., description="Supabase auth user id"),
+    strava_per_page: int = Query(5, ge=1, le=100),
+    top_limit: int = Query(5, ge=1, le=20),
+    time_range: str = Query("short_term"),
+    recent_limit: int = Query(6, ge=1, le=50),
+):
+    """Strava activities plus Spotify top/recent in one round trip, with per-section status and timing."""
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Supabase not configured on server")
+    started = time.perf_counter()
+    try:
+        rows = await asyncio.to_thread(load_integrations, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load integrations: {e}")
+
+    spotify_row = rows.get("spotify")
+    strava_row = rows.get("strava")
+    spotify_token_task: Optional[asyncio.Future] = None
+
+    def spotify_token() -> asyncio.Future:
+        # Shared by top and recent so an expired token is refreshed once.
+        nonlocal spotify_token_task
+        if spotify_token_task is None:
+            spotify_token_task = asyncio.ensure_future(spotify.ensure_access_token(user_id, spotify_row))
+        return spotify_token_task
+
+    async def fetch_strava() -> dict:
+        token = await strava.ensure_access_token(user_id, strava_row)
+        items = await strava.strava_get_activities(token, page=1, per_page=strava_per_page, user_id=user_id)
+        return {"items": items, "page": 1, "per_page": strava_per_page}
+
+    async def fetch_spotify_top() -> dict:
+        cached = spotify.get_cached_top(user_id, time_range, top_limit)
+        if cached is not None:
+            return cached
+        return await spotify.top_payload(user_id, top_limit, time_range, access_token=await spotify_token())
+
+    async def fetch_spotify_recent() -> dict:
+        return await spotify.recent_payload(user_id, recent_limit, access_token=await spotify_token())
+
+    strava_section, top_section, recent_section = await asyncio.gather(
+        run_section(strava_row is not None, fetch_strava),
+        run_section(spotify_row is not None, fetch_spotify_top),
+        run_section(spotify_row is not None, fetch_spotify_recent),
+    )
+    return fast_json.respond({
+        "sections": {
+            "strava": strava_section,
+            "spotify_top": top_section,
+            "spotify_recent": recent_section,
+        },
+        "ms": round((time.perf_counter() - started) * 1000, 1),
+    })
@@ -9,13 +9,24 @@ Expected DB (integrations table) matches Strava/Spotify entries:
   expires_at timestamptz
   scope text
   meta jsonb
+
+Env (python-backend/.env):
+  GOOGLE_CALENDAR_API_BASE=https://www.googleapis.com/calendar/v3   # override for local fakes (benchmarks/)
+  GOOGLE_OAUTH_TOKEN_URL=https://oauth2.googleapis.com/token
 """
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import heapq
+import logging
 import os
-from datetime import datetime, timedelta, timezone
-from typing import Any, Optional
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, NamedTuple, Optional
+from urllib.parse import quote
 import re
 
 import httpx
@@ -23,6 +34,15 @@ from dotenv import load_dotenv
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
+import calendar_highlights
+import calendar_sync
+import fast_json
+import http_cache
+from cache_utils import TTLCache
+from metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 try:
@@ -39,10 +59,22 @@ if create_client and SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY:
     try:
         supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
     except Exception as e:
-        print("Supabase client init failed (Google tokens will not be saved):", e)
+        logger.warning("Supabase client init failed (Google tokens will not be saved): %s", e)
         supabase = None
 
 GOOGLE_PROVIDER = "google_calendar"
+GOOGLE_CALENDAR_API = calendar_sync.GOOGLE_CALENDAR_API_BASE
+GOOGLE_OAUTH_TOKEN_URL = os.getenv("GOOGLE_OAUTH_TOKEN_URL", "https://oauth2.googleapis.com/token")
+EVENTS_PAGE_SIZE = 250
+# Default events window starts at now rounded down to this step (keeps ETag cache keys stable).
+DEFAULT_WINDOW_STEP_MINUTES = 15
+GOOGLE_CALENDAR_CONCURRENCY = int(os.getenv("GOOGLE_CALENDAR_CONCURRENCY", "4"))
+WORK_CALENDAR_HINTS = ["work", "office", "team", "company", "corp"]
+_calendar_list_cache = TTLCache(maxsize=2048, ttl=15 * 60)
+# user_id -> parsed CalendarSettings; written through on every save, dropped on disconnect.
+_settings_cache = TTLCache(maxsize=4096, ttl=30 * 60)
+# (user_id, settings_key, events fingerprint) -> descriptors. Shared: treat as read-only.
+_descriptor_cache = TTLCache(maxsize=4096, ttl=30 * 60)
 
 
 def get_google_env() -> tuple[str, str, Optional[str]]:
@@ -115,19 +147,56 @@ SENSITIVE_PATTERNS = [
 ]
 
 
-def sanitize_summary_text(summary: Optional[str]) -> str:
+NOISY_WORDS = ["sync", "1:1", "interview", "standup", "meeting", "touchpoint", "check-in"]
+
+# One precompiled scanner sanitizes each summary in a single pass over the
+# lowercased text: whole tokens containing a noisy word and sensitive spans are
+# removed. Matching lowercase text case-sensitively is much cheaper than
+# re.IGNORECASE over literal alternations. The work flag is a separate search
+# over the whole summary: a keyword can straddle the end of a removed span
+# ("https://x.com/all hands"), which the scanner would consume.
+_SUMMARY_SCANNER_SOURCE = (
+    r"(?<!\S)(?P<noise>\S*?(?:" + "|".join(re.escape(word) for word in NOISY_WORDS) + r")\S*)"
+    + "|(?P<sensitive>" + "|".join(pattern.replace("A-Z", "a-z") for pattern in SENSITIVE_PATTERNS) + ")"
+)
+_SUMMARY_SCANNER = re.compile(_SUMMARY_SCANNER_SOURCE)
+# For the rare summaries whose lowercase form changes length (e.g. "İ").
+_SUMMARY_SCANNER_IGNORECASE = re.compile(_SUMMARY_SCANNER_SOURCE, re.IGNORECASE)
+_WORK_KEYWORD_RE = re.compile("|".join(re.escape(keyword) for keyword in WORK_KEYWORDS))
+
+
+class SummaryScan(NamedTuple):
+    label: str
+    work: bool
+
+
+def scan_summary(summary: Optional[str]) -> SummaryScan:
+    """Sanitized label (one regex pass) + work-keyword flag for an event summary."""
     if not summary:
-        return "Calendar event"
-    cleaned = summary
-    for pattern in SENSITIVE_PATTERNS:
-        cleaned = re.sub(pattern, "", cleaned, flags=re.IGNORECASE).strip()
-    noisy_words = ["sync", "1:1", "interview", "standup", "meeting", "touchpoint", "check-in"]
-    tokens = [
-        token for token in cleaned.split()
-        if not any(noise in token.lower() for noise in noisy_words)
-    ]
-    cleaned_final = " ".join(tokens).strip()
-    return cleaned_final or "Calendar event"
+        return SummaryScan("Calendar event", False)
+    lowered = summary.lower()
+    # Same test as looks_like_work_event, on the original text (not the sanitized label).
+    work = _WORK_KEYWORD_RE.search(lowered) is not None
+    if len(lowered) == len(summary):
+        matches = _SUMMARY_SCANNER.finditer(lowered)
+    else:
+        matches = _SUMMARY_SCANNER_IGNORECASE.finditer(summary)
+
+    pieces: list[str] = []
+    position = 0
+    for match in matches:
+        pieces.append(summary[position:match.start()])
+        position = match.end()
+    if position:
+        pieces.append(summary[position:])
+        cleaned = " ".join("".join(pieces).split())
+    else:
+        cleaned = " ".join(summary.split())
+    return SummaryScan(cleaned or "Calendar event", work)
+
+
+def sanitize_summary_text(summary: Optional[str]) -> str:
+    return scan_summary(summary).label
 
 
 def sanitize_location_text(location: Optional[str], include: bool) -> Optional[str]:
@@ -153,29 +222,58 @@ def parse_calendar_date(entry: Optional[dict]) -> Optional[datetime]:
         return None
 
 
+@dataclass(slots=True)
+class ParsedEvent:
+    """Dates for one event, parsed once and shared by filtering and labeling."""
+    start: Optional[datetime]
+    end: Optional[datetime]
+    timed: bool  # start carries a dateTime (not an all-day date)
+    all_day: bool
+    multi_day: bool
+    duration_hours: Optional[float]
+
+
+def parse_event_dates(start_entry: Optional[dict], end_entry: Optional[dict]) -> ParsedEvent:
+    start_entry = start_entry or {}
+    end_entry = end_entry or {}
+    start = parse_calendar_date(start_entry)
+    end = parse_calendar_date(end_entry)
+    duration_seconds: Optional[float] = None
+    if start and end:
+        try:
+            duration_seconds = (end - start).total_seconds()
+        except TypeError:  # naive vs aware datetimes
+            duration_seconds = None
+    duration_hours = duration_seconds / 3600 if duration_seconds is not None else None
+    all_day = bool(start_entry.get("date") or end_entry.get("date")) or bool(
+        duration_hours and duration_hours >= 20
+    )
+    return ParsedEvent(
+        start=start,
+        end=end,
+        timed=bool(start_entry.get("dateTime")),
+        all_day=all_day,
+        multi_day=duration_seconds is not None and abs(duration_seconds) > 60 * 60 * 24,
+        duration_hours=duration_hours,
+    )
+
+
+def parse_event(event: dict) -> ParsedEvent:
+    return parse_event_dates(event.get("start"), event.get("end"))
+
+
 def event_duration_hours(event: dict) -> Optional[float]:
-    start = parse_calendar_date(event.get("start"))
-    end = parse_calendar_date(event.get("end"))
-    if not start or not end:
-        return None
-    diff = end - start
-    return diff.total_seconds() / 3600
+    return parse_event(event).duration_hours
 
 
 def is_all_day_event(event: dict) -> bool:
-    start = event.get("start") or {}
-    end = event.get("end") or {}
-    if start.get("date") or end.get("date"):
-        return True
-    duration = event_duration_hours(event)
-    return bool(duration and duration >= 20)
+    return parse_event(event).all_day
 
 
 def looks_like_work_event(summary: Optional[str]) -> bool:
     if not summary:
         return False
-    lowered = summary.lower()
-    return any(keyword in lowered for keyword in WORK_KEYWORDS)
+    return _WORK_KEYWORD_RE.search(summary.lower()) is not None
 
 
 def extract_calendar_settings(record: Optional[dict]) -> dict:
@@ -207,50 +305,87 @@ def extract_calendar_settings(record: Optional[dict]) -> dict:
     return settings
 
 
-def describe_calendar_window(
-    start: Optional[dict],
-    end: Optional[dict],
-) -> str:
-    start_date = parse_calendar_date(start)
-    if not start_date:
-        return "Coming up soon"
-    bucket = "Early" if start_date.day <= 10 else "Mid" if start_date.day <= 20 else "Late"
-    month = start_date.strftime("%B")
-    short_date = start_date.strftime("%b %-d") if hasattr(start_date, "strftime") else start_date.isoformat()
+def settings_key(settings: dict) -> tuple:
+    """Hashable identity of a settings combination (same toggles -> same key)."""
+    return tuple(sorted(settings.items()))
+
+
+def get_calendar_settings(user_id: str, record: Optional[dict] = None) -> dict:
+    """
+    Parsed settings for a user, cached. `record` (an integrations row the caller
+    already loaded) is only parsed on a miss; without it the row is read once.
+    """
+    cached = _settings_cache.get(user_id)
+    if cached is None:
+        if record is None:
+            record = get_user_tokens(user_id, raise_if_missing=False)
+        cached = extract_calendar_settings(record)
+        _settings_cache.set(user_id, cached)
+    return dict(cached)
+
+
+def forget_cached_settings(user_id: str) -> None:
+    _settings_cache.pop(user_id)
+    _descriptor_cache.delete_where(lambda key: key[0] == user_id)
+
+
+def _strftime_no_pad(value: datetime, padded: str, unpadded: str) -> str:
+    # "%-d"/"%-I" are glibc/BSD only; fall back to zero-padded output elsewhere.
     try:
-        short_date = start_date.strftime("%b %-d")
+        return value.strftime(unpadded)
     except ValueError:
-        short_date = start_date.strftime("%b %d")
+        return value.strftime(padded)
 
-    if start and start.get("dateTime"):
-        if hasattr(start_date, "strftime"):
-            try:
-                time_string = start_date.strftime("%-I:%M %p")
-            except ValueError:
-                time_string = start_date.strftime("%I:%M %p")
-        else:
-            time_string = None
-    else:
-        time_string = None
 
-    end_date = parse_calendar_date(end)
-    spans_multiple_days = bool(
-        end_date and abs((end_date - start_date).total_seconds()) > 60 * 60 * 24
-    )
-    if spans_multiple_days and end_date:
-        try:
-            end_short = end_date.strftime("%b %-d")
-        except ValueError:
-            end_short = end_date.strftime("%b %d")
+@lru_cache(maxsize=4096)
+def format_window_label(
+    start_day: date,
+    end_day: Optional[date],
+    hour: Optional[int],
+    minute: Optional[int],
+) -> str:
+    """Window label for an event start (and multi-day end), cached by date/time."""
+    start_dt = datetime(start_day.year, start_day.month, start_day.day)
+    bucket = "Early" if start_day.day <= 10 else "Mid" if start_day.day <= 20 else "Late"
+    month = start_dt.strftime("%B")
+    short_date = _strftime_no_pad(start_dt, "%b %d", "%b %-d")
+
+    if end_day is not None:
+        end_dt = datetime(end_day.year, end_day.month, end_day.day)
+        end_short = _strftime_no_pad(end_dt, "%b %d", "%b %-d")
         return f"{bucket} {month} ({short_date} – {end_short})"
-    if time_string:
+    if hour is not None and minute is not None:
+        time_string = _strftime_no_pad(start_dt.replace(hour=hour, minute=minute), "%I:%M %p", "%-I:%M %p")
         return f"{bucket} {month} • {time_string}"
     return f"{bucket} {month} ({short_date})"
 
 
-def should_include_event(event: dict, settings: dict) -> bool:
-    summary = event.get("summary") or ""
-    work_event = looks_like_work_event(summary)
+def describe_parsed_window(parsed: ParsedEvent) -> str:
+    start_date = parsed.start
+    if not start_date:
+        return "Coming up soon"
+    if parsed.multi_day and parsed.end:
+        return format_window_label(start_date.date(), parsed.end.date(), None, None)
+    if parsed.timed:
+        return format_window_label(start_date.date(), None, start_date.hour, start_date.minute)
+    return format_window_label(start_date.date(), None, None, None)
+
+
+def describe_calendar_window(
+    start: Optional[dict],
+    end: Optional[dict],
+) -> str:
+    return describe_parsed_window(parse_event_dates(start, end))
+
+
+def should_include_event(
+    event: dict,
+    settings: dict,
+    work_event: Optional[bool] = None,
+    parsed: Optional[ParsedEvent] = None,
+) -> bool:
+    if work_event is None:
+        work_event = looks_like_work_event(event.get("summary"))
     allow_work = settings.get("work_calendars", False)
     allow_personal = settings.get("only_personal_calendars", True)
 
@@ -262,7 +397,7 @@ def should_include_event(event: dict, settings: dict) -> bool:
     if not work_event and not allow_personal:
         return False
 
-    all_day = is_all_day_event(event)
+    all_day = parsed.all_day if parsed is not None else is_all_day_event(event)
     if all_day and not settings.get("include_all_day_events", True):
         return False
     if (not all_day) and work_event and not settings.get("include_regular_meetings", False):
@@ -271,9 +406,17 @@ def should_include_event(event: dict, settings: dict) -> bool:
     return True
 
 
-def build_event_descriptor(event: dict, settings: dict) -> dict:
-    label = sanitize_summary_text(event.get("summary"))
-    window = describe_calendar_window(event.get("start"), event.get("end"))
+def build_event_descriptor(
+    event: dict,
+    settings: dict,
+    label: Optional[str] = None,
+    parsed: Optional[ParsedEvent] = None,
+) -> dict:
+    if label is None:
+        label = sanitize_summary_text(event.get("summary"))
+    if parsed is None:
+        parsed = parse_event(event)
+    window = describe_parsed_window(parsed)
     location = sanitize_location_text(event.get("location"), settings.get("include_locations", False))
     bullet = f"{window}: '{label}'"
     if location:
@@ -287,6 +430,40 @@ def build_event_descriptor(event: dict, settings: dict) -> dict:
     }
 
 
+def describe_events(events: list[dict], settings: dict) -> list[dict]:
+    """Filter + sanitize a batch of events, scanning each summary and parsing its dates once."""
+    descriptors: list[dict] = []
+    for event in events:
+        scan = scan_summary(event.get("summary"))
+        parsed = parse_event(event)
+        if should_include_event(event, settings, work_event=scan.work, parsed=parsed):
+            descriptors.append(build_event_descriptor(event, settings, label=scan.label, parsed=parsed))
+    return descriptors
+
+
+def events_fingerprint(events: list[dict]) -> str:
+    """Changes whenever the set, order or version (etag/updated) of the events changes."""
+    digest = hashlib.sha1()
+    for event in events:
+        digest.update(f"{event.get('id')}:{event.get('etag') or event.get('updated')}|".encode())
+    return digest.hexdigest()
+
+
+def describe_events_cached(user_id: str, events: list[dict], settings: dict) -> list[dict]:
+    """
+    describe_events memoized per (user, settings combination, window contents).
+    The window is identified by the events it returned, so a reload (whose
+    default bounds move with the clock) or switching back to an earlier
+    preference combo reuses the earlier descriptors.
+    """
+    key = (user_id, settings_key(settings), events_fingerprint(events))
+    descriptors = _descriptor_cache.get(key)
+    if descriptors is None:
+        descriptors = describe_events(events, settings)
+        _descriptor_cache.set(key, descriptors)
+    return descriptors
+
+
 def require_supabase():
     if not supabase:
         raise HTTPException(status_code=500, detail="Supabase not configured on server")
@@ -295,17 +472,18 @@ def require_supabase():
 
 async def google_post(data: dict) -> dict:
     try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            resp = await client.post(
-                "https://oauth2.googleapis.com/token",
-                data=data,
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-            )
+        with track_upstream("google", "token"):
+            async with httpx.AsyncClient(timeout=20.0) as client:
+                resp = await client.post(
+                    GOOGLE_OAUTH_TOKEN_URL,
+                    data=data,
+                    headers={"Content-Type": "application/x-www-form-urlencoded"},
+                )
     except httpx.RequestError as exc:
         raise HTTPException(status_code=502, detail=f"Network error to Google: {exc!s}")
 
     if resp.status_code != 200:
-        print("Google token error:", resp.status_code, resp.text)
+        logger.warning("Google token error", extra={"status_code": resp.status_code, "body": resp.text[:500]})
         raise HTTPException(status_code=resp.status_code, detail=resp.text)
     return resp.json()
 
@@ -347,14 +525,15 @@ def token_expired(record: dict) -> bool:
 def get_user_tokens(user_id: str, raise_if_missing: bool = True) -> dict:
     sb = require_supabase()
     try:
-        res = (
-            sb.table("integrations")
-            .select("*")
-            .eq("user_id", user_id)
-            .eq("provider", GOOGLE_PROVIDER)
-            .limit(1)
-            .execute()
-        )
+        with track_upstream("supabase", "integrations.select"):
+            res = (
+                sb.table("integrations")
+                .select("*")
+                .eq("user_id", user_id)
+                .eq("provider", GOOGLE_PROVIDER)
+                .limit(1)
+                .execute()
+            )
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Supabase query failed: {exc}")
 
@@ -411,11 +590,12 @@ def upsert_tokens(user_id: str, token_payload: dict) -> bool:
     }
 
     try:
-        res = (
-            sb.table("integrations")
-            .upsert(payload, on_conflict="user_id,provider")
-            .execute()
-        )
+        with track_upstream("supabase", "integrations.upsert"):
+            res = (
+                sb.table("integrations")
+                .upsert(payload, on_conflict="user_id,provider")
+                .execute()
+            )
         error = getattr(res, "error", None)
         if error:
             raise HTTPException(status_code=500, detail=f"Supabase upsert error: {error}")
@@ -423,19 +603,21 @@ def upsert_tokens(user_id: str, token_payload: dict) -> bool:
         raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Failed to save Google tokens: {exc}")
+    _settings_cache.set(user_id, calendar_settings)
     return True
 
 
 def delete_user_tokens(user_id: str) -> bool:
     sb = require_supabase()
     try:
-        res = (
-            sb.table("integrations")
-            .delete()
-            .eq("user_id", user_id)
-            .eq("provider", GOOGLE_PROVIDER)
-            .execute()
-        )
+        with track_upstream("supabase", "integrations.delete"):
+            res = (
+                sb.table("integrations")
+                .delete()
+                .eq("user_id", user_id)
+                .eq("provider", GOOGLE_PROVIDER)
+                .execute()
+            )
         error = getattr(res, "error", None)
         if error:
             raise HTTPException(status_code=500, detail=f"Supabase delete error: {error}")
@@ -443,6 +625,7 @@ def delete_user_tokens(user_id: str) -> bool:
         raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Failed to delete Google tokens: {exc}")
+    forget_cached_settings(user_id)
     return True
 
 
@@ -469,11 +652,12 @@ def persist_calendar_settings(user_id: str, new_settings: dict) -> dict:
     }
 
     try:
-        res = (
-            sb.table("integrations")
-            .upsert(payload, on_conflict="user_id,provider")
-            .execute()
-        )
+        with track_upstream("supabase", "integrations.upsert"):
+            res = (
+                sb.table("integrations")
+                .upsert(payload, on_conflict="user_id,provider")
+                .execute()
+            )
         error = getattr(res, "error", None)
         if error:
             raise HTTPException(status_code=500, detail=f"Supabase upsert error: {error}")
@@ -481,7 +665,8 @@ def persist_calendar_settings(user_id: str, new_settings: dict) -> dict:
         raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Failed to save calendar preferences: {exc}")
-    return merged_settings
+    _settings_cache.set(user_id, merged_settings)
+    return dict(merged_settings)
 
 
 async def ensure_access_token(user_id: str) -> tuple[str, dict]:
@@ -515,9 +700,31 @@ async def ensure_access_token(user_id: str) -> tuple[str, dict]:
 
 
 def default_time_bounds() -> tuple[str, str]:
-    now = datetime.now(timezone.utc).replace(microsecond=0)
-    later = now + timedelta(days=7)
-    return as_iso_utc(now), as_iso_utc(later)
+    # Rounded down so repeat requests within a step share one ETag cache entry.
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    start = now - timedelta(minutes=now.minute % DEFAULT_WINDOW_STEP_MINUTES)
+    later = start + timedelta(days=7)
+    return as_iso_utc(start), as_iso_utc(later)
+
+
+async def google_api_get(url: str, access_token: str, params: dict, operation: str, user_id: Optional[str] = None) -> dict:
+    try:
+        result = await http_cache.conditional_get(
+            "google",
+            url,
+            headers={"Authorization": f"Bearer {access_token}"},
+            params=params,
+            operation=operation,
+            cache_scope=user_id,
+        )
+    except httpx.RequestError as exc:
+        raise HTTPException(status_code=502, detail=f"Network error to Google Calendar: {exc!s}")
+
+    if result.status_code != 200:
+        logger.warning("Google Calendar API error", extra={"status_code": result.status_code, "operation": operation, "body": result.text[:500]})
+        raise HTTPException(status_code=result.status_code, detail=result.text)
+
+    return result.body
 
 
 async def fetch_calendar_events(
@@ -525,31 +732,170 @@ async def fetch_calendar_events(
     max_results: int,
     time_min: str,
     time_max: Optional[str],
+    calendar_id: str = "primary",
+    user_id: Optional[str] = None,
 ) -> dict:
+    """List one calendar's events in a window, following pageToken until max_results."""
     params = {
         "singleEvents": "true",
         "orderBy": "startTime",
         "timeMin": time_min,
-        "maxResults": str(max_results),
     }
     if time_max:
         params["timeMax"] = time_max
 
+    url = f"{GOOGLE_CALENDAR_API}/calendars/{quote(calendar_id, safe='@.')}/events"
+    items: list[dict] = []
+    first_page: dict = {}
+    page_token: Optional[str] = None
+    while len(items) < max_results:
+        page_params = {**params, "maxResults": str(min(EVENTS_PAGE_SIZE, max_results - len(items)))}
+        if page_token:
+            page_params["pageToken"] = page_token
+        page = await google_api_get(url, access_token, page_params, "events.list", user_id)
+        first_page = first_page or page
+        items.extend(page.get("items", []) or [])
+        page_token = page.get("nextPageToken")
+        if not page_token:
+            break
+
+    result = {key: value for key, value in first_page.items() if key != "nextPageToken"}
+    result["items"] = items[:max_results]
+    return result
+
+
+def classify_calendar(entry: dict) -> str:
+    """Label a calendarList entry 'work' or 'personal' from its name/description."""
+    if entry.get("primary"):
+        return "personal"
+    text = f"{entry.get('summaryOverride') or entry.get('summary') or ''} {entry.get('description') or ''}"
+    lowered = text.lower()
+    if any(hint in lowered for hint in WORK_CALENDAR_HINTS) or looks_like_work_event(text):
+        return "work"
+    return "personal"
+
+
+async def list_calendars(user_id: str, access_token: str) -> list[dict]:
+    """The user's calendarList (paginated), cached briefly per user."""
+    cached = _calendar_list_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    calendars: list[dict] = []
+    page_token: Optional[str] = None
+    while True:
+        params = {"maxResults": "250", "minAccessRole": "reader"}
+        if page_token:
+            params["pageToken"] = page_token
+        page = await google_api_get(f"{GOOGLE_CALENDAR_API}/users/me/calendarList", access_token, params, "calendarList.list", user_id)
+        calendars.extend(page.get("items", []) or [])
+        page_token = page.get("nextPageToken")
+        if not page_token:
+            break
+
+    _calendar_list_cache.set(user_id, calendars)
+    return calendars
+
+
+async def selected_calendar_ids(user_id: str, access_token: str, settings: dict) -> list[str]:
+    """Calendars to read for these settings; falls back to primary if discovery fails."""
     try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            resp = await client.get(
-                "https://www.googleapis.com/calendar/v3/calendars/primary/events",
-                headers={"Authorization": f"Bearer {access_token}"},
-                params=params,
-            )
-    except httpx.RequestError as exc:
-        raise HTTPException(status_code=502, detail=f"Network error to Google Calendar: {exc!s}")
+        calendars = await list_calendars(user_id, access_token)
+    except HTTPException as exc:
+        logger.warning("Google calendar list failed, using primary only: %s", exc.detail)
+        return ["primary"]
 
-    if resp.status_code != 200:
-        print("Google events error:", resp.status_code, resp.text)
-        raise HTTPException(status_code=resp.status_code, detail=resp.text)
+    allow_work = settings.get("work_calendars", False)
+    allow_personal = settings.get("only_personal_calendars", True) or not allow_work
+    selected: list[str] = []
+    for entry in calendars:
+        calendar_id = entry.get("id")
+        if not calendar_id or entry.get("deleted"):
+            continue
+        # Respect calendars the user has hidden in the Google Calendar UI.
+        if entry.get("selected") is False and not entry.get("primary"):
+            continue
+        kind = classify_calendar(entry)
+        if (kind == "work" and allow_work) or (kind == "personal" and allow_personal):
+            selected.append("primary" if entry.get("primary") else calendar_id)
+    return selected or ["primary"]
+
+
+async def gather_bounded(coros: list, limit: int = GOOGLE_CALENDAR_CONCURRENCY) -> list:
+    """asyncio.gather with at most `limit` coroutines in flight; exceptions are returned."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros), return_exceptions=True)
+
+
+def merge_calendar_events(per_calendar: list[list[dict]], max_results: int) -> list[dict]:
+    """k-way merge of start-ordered event lists (heap-based), deduping shared events."""
+    merged: list[dict] = []
+    seen: set[tuple] = set()
+
+    def start_key(event: dict) -> float:
+        return calendar_sync.event_timestamp(event.get("start")) or float("inf")
+
+    for event in heapq.merge(*per_calendar, key=start_key):
+        # The same meeting shows up on every attendee calendar with one iCalUID.
+        identity = (event.get("iCalUID") or event.get("id"), start_key(event))
+        if identity in seen:
+            continue
+        seen.add(identity)
+        merged.append(event)
+        if len(merged) >= max_results:
+            break
+    return merged
+
+
+def successful_results(results: list) -> list:
+    """Drop per-calendar failures, unless every calendar failed."""
+    ok = [result for result in results if not isinstance(result, BaseException)]
+    if not ok and results:
+        raise results[0]
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.warning("Skipping calendar after fetch error: %s", result)
+    return ok
+
+
+async def load_window_events(
+    user_id: str,
+    access_token: str,
+    settings: dict,
+    max_results: int,
+    time_min: str,
+    time_max: Optional[str],
+) -> list[dict]:
+    """
+    Answer an events window across every selected calendar.
+    Each calendar is served from its incrementally synced local store; the
+    direct (paginated) list call is the fallback when a window is older than
+    the store's lookback or the bounds can't be parsed.
+    """
+    calendar_ids = await selected_calendar_ids(user_id, access_token, settings)
+    window_min = calendar_sync.parse_rfc3339(time_min)
+    window_max = calendar_sync.parse_rfc3339(time_max) if time_max else None
+    if window_min and (window_max or not time_max):
+        stores = successful_results(await gather_bounded([
+            calendar_sync.sync_calendar(user_id, access_token, calendar_id)
+            for calendar_id in calendar_ids
+        ]))
+        if all(store.covers(window_min) for store in stores):
+            return merge_calendar_events(
+                [calendar_sync.query_window(store, window_min, window_max, max_results) for store in stores],
+                max_results,
+            )
 
-    return resp.json()
+    pages = successful_results(await gather_bounded([
+        fetch_calendar_events(access_token, max_results, time_min, time_max, calendar_id=calendar_id, user_id=user_id)
+        for calendar_id in calendar_ids
+    ]))
+    return merge_calendar_events([page.get("items", []) or [] for page in pages], max_results)
 
 
 @router.post("/token", response_model=GoogleTokenResponse)
@@ -565,6 +911,9 @@ async def exchange_google_token(payload: GoogleTokenRequest):
         }
     )
     saved = upsert_tokens(payload.user_id, token_resp)
+    calendar_sync.drop_user(payload.user_id)
+    _calendar_list_cache.pop(payload.user_id)
+    calendar_highlights.request_refresh(payload.user_id)
     token_resp["saved"] = saved
     return token_resp
 
@@ -579,37 +928,37 @@ async def google_status(user_id: str = Query(..., description="Supabase auth use
 @router.post("/disconnect")
 async def google_disconnect(payload: DisconnectRequest):
     deleted = delete_user_tokens(payload.user_id)
+    calendar_sync.drop_user(payload.user_id)
+    _calendar_list_cache.pop(payload.user_id)
+    calendar_highlights.forget_user(payload.user_id)
     return {"disconnected": deleted}
 
 
 @router.get("/preferences")
 async def google_preferences(user_id: str = Query(..., description="Supabase auth user id")):
-    record = get_user_tokens(user_id, raise_if_missing=False)
-    settings = extract_calendar_settings(record)
-    return {"settings": settings}
+    return {"settings": get_calendar_settings(user_id)}
 
 
 @router.post("/preferences")
 async def update_google_preferences(payload: CalendarSettingsPayload):
     saved = persist_calendar_settings(payload.user_id, payload.settings.model_dump())
+    calendar_highlights.request_refresh(payload.user_id)
     return {"settings": saved}
 
 
 @router.get("/events")
 async def google_events(
     user_id: str = Query(..., description="Supabase auth user id"),
-    max_results: int = Query(10, ge=1, le=50),
+    max_results: int = Query(10, ge=1, le=250),
     time_min: Optional[str] = Query(None),
     time_max: Optional[str] = Query(None),
 ):
     access_token, record = await ensure_access_token(user_id)
-    settings = extract_calendar_settings(record)
+    settings = get_calendar_settings(user_id, record)
     default_min, default_max = default_time_bounds()
     effective_min = time_min or default_min
     effective_max = time_max or default_max
-    events = await fetch_calendar_events(access_token, max_results, effective_min, effective_max)
-    items = events.get("items", []) or []
-    filtered = [event for event in items if should_include_event(event, settings)]
-    sanitized = [build_event_descriptor(event, settings) for event in filtered]
+    items = await load_window_events(user_id, access_token, settings, max_results, effective_min, effective_max)
+    sanitized = describe_events_cached(user_id, items, settings)
     bullets = [entry["bullet"] for entry in sanitized]
-    return {"events": sanitized, "bullets": bullets, "settings": settings}
+    return fast_json.respond({"events": sanitized, "bullets": bullets, "settings": settings})
@@ -6,12 +6,32 @@ Creates a disposable Supabase auth user using the service role key so the
 frontend can immediately sign in and get a valid session for RLS-protected
 endpoints. The client will use the returned credentials with
 `supabase.auth.signInWithPassword`.
+
+Creating an auth user is an admin API round-trip, so a background job keeps
+a pool of ready accounts topped up to a low-water mark and POST /session just
+claims one, without any admin call. Pooled accounts are created with their
+final expiry: the time they may wait in the pool plus the full guest
+lifetime. A claimed account therefore always has at least GUEST_SESSION_DAYS
+left, and accounts stranded by a restart (or left in the pool too long) are
+deleted by guest cleanup like any other expired guest. An empty pool falls
+back to creating inline.
+
+Env (python-backend/.env):
+  GUEST_POOL_LOW_WATER=10                  # 0 disables the pool
+  GUEST_POOL_REFILL_CONCURRENCY=3
+  GUEST_POOL_REFILL_INTERVAL_SECONDS=15
+  GUEST_POOL_TTL_HOURS=24                  # how long an unclaimed account stays claimable
 """
 
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
 import secrets
+import time
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from uuid import uuid4
@@ -20,6 +40,13 @@ from dotenv import load_dotenv
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
+import background_jobs
+import guest_cleanup
+import metrics
+from metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 # Optional Supabase client (only available when service role envs are set)
@@ -37,9 +64,15 @@ if create_client and SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY:
     try:
         supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
     except Exception as e:  # pragma: no cover - best effort init
-        print("Supabase client init failed for guest sessions:", e)
+        logger.warning("Supabase client init failed for guest sessions: %s", e)
         supabase = None
 
+GUEST_SESSION_DAYS = 7
+POOL_LOW_WATER = max(0, int(os.getenv("GUEST_POOL_LOW_WATER", "10")))
+POOL_REFILL_CONCURRENCY = max(1, int(os.getenv("GUEST_POOL_REFILL_CONCURRENCY", "3")))
+POOL_REFILL_INTERVAL_SECONDS = float(os.getenv("GUEST_POOL_REFILL_INTERVAL_SECONDS", "15"))
+POOL_TTL_HOURS = float(os.getenv("GUEST_POOL_TTL_HOURS", "24"))
+
 router = APIRouter()
 
 
@@ -51,34 +84,62 @@ class GuestSessionResponse(BaseModel):
     expires_at: Optional[str] = None
 
 
+@dataclass
+class PooledGuest:
+    user_id: str
+    email: str
+    password: str
+    created_at: datetime
+    expires_at: datetime
+
+
+_pool: deque[PooledGuest] = deque()
+_refill_lock = asyncio.Lock()
+_background_tasks: set[asyncio.Task] = set()
+_pool_stats = {
+    "claimed": 0,
+    "fallback_created": 0,
+    "pool_created": 0,
+    "create_failures": 0,
+    "discarded_stale": 0,
+    "refills": 0,
+}
+# Monotonic time the pool was first seen below the low-water mark (None when full).
+_below_low_water_since: Optional[float] = None
+_last_refill_lag: Optional[float] = None
+_max_refill_lag: float = 0.0
+
+
 def generate_guest_credentials() -> tuple[str, str]:
     email = f"guest-{uuid4().hex}@guest.local"
     password = secrets.token_urlsafe(18)
     return email, password
 
 
-@router.post("/session", response_model=GuestSessionResponse)
-def create_guest_session() -> GuestSessionResponse:
+def guest_metadata(created_at: datetime, expires_at: datetime) -> dict:
+    return {
+        "guest": True,
+        "created_at": created_at.isoformat(),
+        "expires_at": expires_at.isoformat(),
+    }
+
+
+def create_guest_user(created_at: datetime, expires_at: datetime) -> tuple[str, str, str]:
+    """Blocking admin call; returns (user_id, email, password)."""
     if not supabase:
         raise HTTPException(status_code=500, detail="Supabase not configured for guest sessions")
 
     email, password = generate_guest_credentials()
-    created_at = datetime.now(timezone.utc)
-    expires_at = created_at + timedelta(days=7)
-
     payload = {
         "email": email,
         "password": password,
         "email_confirm": True,
-        "user_metadata": {
-            "guest": True,
-            "created_at": created_at.isoformat(),
-            "expires_at": expires_at.isoformat(),
-        },
+        "user_metadata": guest_metadata(created_at, expires_at),
     }
 
     try:
-        res = supabase.auth.admin.create_user(payload)
+        with track_upstream("supabase", "auth.create_user"):
+            res = supabase.auth.admin.create_user(payload)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create guest user: {e}")
 
@@ -86,11 +147,157 @@ def create_guest_session() -> GuestSessionResponse:
     user_id = getattr(user_obj, "id", None) if not isinstance(user_obj, dict) else user_obj.get("id")
     if not user_id:
         raise HTTPException(status_code=500, detail="Guest user created but id missing in response")
+    return str(user_id), email, password
+
+
+def _spawn(coro) -> None:
+    # Keep references so fire-and-forget tasks aren't garbage collected mid-run.
+    task = asyncio.get_running_loop().create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _note_pool_level() -> None:
+    global _below_low_water_since, _last_refill_lag, _max_refill_lag
+    now = time.monotonic()
+    if len(_pool) < POOL_LOW_WATER:
+        if _below_low_water_since is None:
+            _below_low_water_since = now
+    elif _below_low_water_since is not None:
+        _last_refill_lag = now - _below_low_water_since
+        _max_refill_lag = max(_max_refill_lag, _last_refill_lag)
+        _below_low_water_since = None
+
+
+# ---------- Pool ----------
+def claim_pooled_guest() -> Optional[PooledGuest]:
+    """Pop the oldest usable account. deque.popleft is atomic, so two requests never share one."""
+    # A claimed account must still have the full guest lifetime ahead of it.
+    cutoff = datetime.now(timezone.utc) + timedelta(days=GUEST_SESSION_DAYS)
+    while True:
+        try:
+            guest = _pool.popleft()
+        except IndexError:
+            return None
+        if guest.expires_at >= cutoff:
+            return guest
+        # Left to expire; guest cleanup deletes it like any other expired guest.
+        _pool_stats["discarded_stale"] += 1
+
+
+async def _create_pooled_guest() -> None:
+    created_at = datetime.now(timezone.utc)
+    expires_at = created_at + timedelta(hours=POOL_TTL_HOURS, days=GUEST_SESSION_DAYS)
+    try:
+        user_id, email, password = await asyncio.to_thread(create_guest_user, created_at, expires_at)
+    except Exception as e:
+        _pool_stats["create_failures"] += 1
+        logger.warning("Guest pool refill failed: %s", getattr(e, "detail", e))
+        return
+    _pool.append(PooledGuest(user_id, email, password, created_at, expires_at))
+    _pool_stats["pool_created"] += 1
+
+
+async def refill_pool() -> int:
+    """Top the pool back up to the low-water mark; returns how many accounts were added."""
+    if not supabase or POOL_LOW_WATER <= 0:
+        return 0
+    if _refill_lock.locked():
+        return 0  # a refill is already running and will see the latest level
+    async with _refill_lock:
+        _note_pool_level()
+        before = _pool_stats["pool_created"]
+        while len(_pool) < POOL_LOW_WATER:
+            batch = min(POOL_LOW_WATER - len(_pool), POOL_REFILL_CONCURRENCY)
+            failures = _pool_stats["create_failures"]
+            await asyncio.gather(*(_create_pooled_guest() for _ in range(batch)))
+            if _pool_stats["create_failures"] - failures == batch:
+                break  # auth service unhappy; retry on the next tick
+        _pool_stats["refills"] += 1
+        _note_pool_level()
+        return _pool_stats["pool_created"] - before
+
+
+def request_refill() -> None:
+    if supabase and POOL_LOW_WATER > 0 and len(_pool) < POOL_LOW_WATER and not _refill_lock.locked():
+        _spawn(refill_pool())
+
+
+def pool_stats() -> dict:
+    oldest = _pool[0].created_at if _pool else None
+    lag_now = time.monotonic() - _below_low_water_since if _below_low_water_since is not None else 0.0
+    return {
+        "enabled": bool(supabase) and POOL_LOW_WATER > 0,
+        "size": len(_pool),
+        "low_water": POOL_LOW_WATER,
+        "oldest_age_seconds": round((datetime.now(timezone.utc) - oldest).total_seconds(), 1) if oldest else 0.0,
+        "refilling": _refill_lock.locked(),
+        "current_refill_lag_seconds": round(lag_now, 3),
+        "last_refill_lag_seconds": round(_last_refill_lag, 3) if _last_refill_lag is not None else None,
+        "max_refill_lag_seconds": round(_max_refill_lag, 3),
+        **_pool_stats,
+    }
+
+
+def _collect_metrics():
+    stats = pool_stats()
+    yield ("guest_pool_size", "gauge", "Ready guest accounts in the pool.", [({}, stats["size"])])
+    yield ("guest_pool_low_water", "gauge", "Refill target for the guest pool.", [({}, stats["low_water"])])
+    yield (
+        "guest_pool_refill_lag_seconds",
+        "gauge",
+        "How long the pool has been below its low-water mark (0 when full).",
+        [({}, stats["current_refill_lag_seconds"])],
+    )
+    yield (
+        "guest_pool_events_total",
+        "counter",
+        "Guest pool claims, fallbacks, creations and failures.",
+        [({"event": name}, value) for name, value in _pool_stats.items()],
+    )
+
+
+metrics.register_collector(_collect_metrics)
+
+
+def start_pool() -> None:
+    if not supabase or POOL_LOW_WATER <= 0:
+        return
+    background_jobs.start_periodic("guest_pool", POOL_REFILL_INTERVAL_SECONDS, refill_pool)
+
+
+# ---------- Routes ----------
+@router.post("/session", response_model=GuestSessionResponse)
+async def create_guest_session() -> GuestSessionResponse:
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Supabase not configured for guest sessions")
+
+    guest = claim_pooled_guest()
+    if guest:
+        _note_pool_level()
+        _pool_stats["claimed"] += 1
+        user_id, email, password, expires_at = guest.user_id, guest.email, guest.password, guest.expires_at
+    else:
+        created_at = datetime.now(timezone.utc)
+        expires_at = created_at + timedelta(days=GUEST_SESSION_DAYS)
+        user_id, email, password = await asyncio.to_thread(create_guest_user, created_at, expires_at)
+        _pool_stats["fallback_created"] += 1
+    request_refill()
 
     return GuestSessionResponse(
-        user_id=str(user_id),
+        user_id=user_id,
         email=email,
         password=password,
         guest=True,
         expires_at=expires_at.isoformat(),
     )
+
+
+@router.get("/pool/stats")
+def guest_pool_stats():
+    return pool_stats()
+
+
+@router.get("/cleanup/stats")
+def guest_cleanup_stats():
+    return guest_cleanup.cleanup_stats()
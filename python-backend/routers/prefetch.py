@@ -0,0 +1,177 @@
+# routers/prefetch.py
+"""
+Login-time warm-up for a user's integrations.
+
+The frontend fires POST /api/prefetch right after sign-in. The endpoint:
+- reads which providers the user has connected (one integrations query),
+- validates every connected provider's access token concurrently, refreshing
+  and storing expired ones, and reports the outcome per provider,
+- then, in the background, fills the caches the first page views read:
+  Spotify top/recent, Strava activities (the LifeUpdates page's exact
+  requests), Google Calendar events and the current month's music/calendar
+  aggregate used by the wrap.
+
+Warm-ups run through the same handlers the page calls, so they populate the
+same in-process caches and provider ETag entries. A user is prefetched at
+most once per PREFETCH_COOLDOWN_SECONDS; repeat calls only report status.
+
+Table: integrations (user_id, provider, ...)
+
+Env (python-backend/.env):
+  PREFETCH_TOKEN_TIMEOUT_SECONDS=8
+  PREFETCH_COOLDOWN_SECONDS=60
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Optional
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from cache_utils import TTLCache
+from metrics import track_upstream
+from routers import google_calendar, spotify, strava, wrap
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Optional Supabase client (works when service role envs are present)
+try:
+    from supabase import Client, create_client  # type: ignore
+except Exception:
+    create_client = None
+    Client = None  # type: ignore
+
+SUPABASE_URL = os.getenv("SUPABASE_URL") or os.getenv("VITE_SUPABASE_URL")
+SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+supabase: Optional[Client] = None
+if create_client and SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY:
+    try:
+        supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    except Exception as e:  # pragma: no cover - best-effort init
+        logger.warning("Supabase init failed for /api/prefetch routes: %s", e)
+        supabase = None
+
+PREFETCH_TOKEN_TIMEOUT_SECONDS = float(os.getenv("PREFETCH_TOKEN_TIMEOUT_SECONDS", "8"))
+PREFETCH_COOLDOWN_SECONDS = int(os.getenv("PREFETCH_COOLDOWN_SECONDS", "60"))
+
+router = APIRouter()
+
+# Users whose caches were warmed recently; repeat logins/tabs don't redo the work.
+_recently_warmed = TTLCache(maxsize=10_000, ttl=PREFETCH_COOLDOWN_SECONDS)
+# Keep references so fire-and-forget warm-ups aren't garbage collected mid-run.
+_warm_tasks: set[asyncio.Task] = set()
+
+
+class PrefetchRequest(BaseModel):
+    user_id: str
+
+
+# ---------- Tokens ----------
+async def _spotify_token(user_id: str) -> None:
+    await spotify.ensure_access_token(user_id)
+
+
+async def _strava_token(user_id: str) -> None:
+    await strava.ensure_access_token(user_id)
+
+
+async def _google_token(user_id: str) -> None:
+    await google_calendar.ensure_access_token(user_id)
+
+
+TOKEN_CHECKS: dict[str, Callable[[str], Awaitable[None]]] = {
+    "spotify": _spotify_token,
+    "strava": _strava_token,
+    google_calendar.GOOGLE_PROVIDER: _google_token,
+}
+
+
+def connected_providers(user_id: str) -> list[str]:
+    with track_upstream("supabase", "integrations.select"):
+        res = supabase.table("integrations").select("provider").eq("user_id", user_id).execute()
+    rows = getattr(res, "data", None) or []
+    return sorted({row["provider"] for row in rows if row.get("provider") in TOKEN_CHECKS})
+
+
+async def check_token(provider: str, user_id: str) -> dict:
+    try:
+        await asyncio.wait_for(TOKEN_CHECKS[provider](user_id), PREFETCH_TOKEN_TIMEOUT_SECONDS)
+        return {"connected": True, "token": "ok"}
+    except asyncio.TimeoutError:
+        return {"connected": True, "token": "timeout"}
+    except HTTPException as e:
+        return {"connected": True, "token": "error", "detail": e.detail}
+    except Exception as e:
+        logger.warning("Prefetch token check failed: %s", e, extra={"user_id": user_id, "provider": provider})
+        return {"connected": True, "token": "error", "detail": str(e)}
+
+
+# ---------- Warm-ups ----------
+def warmups_for(providers: list[str]) -> dict[str, Callable[[str], Awaitable[object]]]:
+    """Cache fills keyed by name; parameters match what the pages request."""
+    jobs: dict[str, Callable[[str], Awaitable[object]]] = {}
+    if "spotify" in providers:
+        # /top serves any limit up to the cached one, so warm the largest.
+        jobs["spotify_top"] = lambda user_id: spotify.top(user_id=user_id, limit=20, time_range="short_term")
+        jobs["spotify_recent"] = lambda user_id: spotify.recent(user_id=user_id, limit=6)
+    if "strava" in providers:
+        jobs["strava_activities"] = lambda user_id: strava.activities(user_id=user_id, page=1, per_page=5)
+    if google_calendar.GOOGLE_PROVIDER in providers:
+        jobs["google_events"] = lambda user_id: google_calendar.google_events(
+            user_id=user_id, max_results=10, time_min=None, time_max=None
+        )
+    # The wrap's LLM blurb isn't cached; its music/calendar aggregate is.
+    jobs["wrap_aggregate"] = lambda user_id: wrap.member_month_aggregate(user_id, *wrap.current_month_range())
+    return jobs
+
+
+async def warm_caches(user_id: str, jobs: dict[str, Callable[[str], Awaitable[object]]]) -> None:
+    async def run(name: str, job: Callable[[str], Awaitable[object]]) -> None:
+        try:
+            await job(user_id)
+        except HTTPException as e:
+            logger.info("Prefetch %s skipped: %s", name, e.detail, extra={"user_id": user_id})
+        except Exception as e:
+            logger.warning("Prefetch %s failed: %s", name, e, extra={"user_id": user_id})
+
+    await asyncio.gather(*(run(name, job) for name, job in jobs.items()))
+
+
+def schedule_warmup(user_id: str, jobs: dict[str, Callable[[str], Awaitable[object]]]) -> None:
+    task = asyncio.get_running_loop().create_task(warm_caches(user_id, jobs))
+    _warm_tasks.add(task)
+    task.add_done_callback(_warm_tasks.discard)
+
+
+# ---------- Routes ----------
+@router.post("")
+async def prefetch(body: PrefetchRequest):
+    """Validate/refresh every connected integration's token and warm caches in the background."""
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Supabase not configured on server")
+    user_id = body.user_id
+    try:
+        providers = await asyncio.to_thread(connected_providers, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load integrations: {e}")
+
+    results = await asyncio.gather(*(check_token(provider, user_id) for provider in providers))
+    integrations = {provider: {"connected": False} for provider in TOKEN_CHECKS}
+    integrations.update(dict(zip(providers, results)))
+
+    warming: list[str] = []
+    if _recently_warmed.get(user_id) is None:
+        ready = [provider for provider in providers if integrations[provider]["token"] == "ok"]
+        jobs = warmups_for(ready)
+        _recently_warmed.set(user_id, True)
+        schedule_warmup(user_id, jobs)
+        warming = list(jobs)
+    return {"integrations": integrations, "warming": warming}
@@ -23,11 +23,15 @@ Env (python-backend/.env):
   SPOTIFY_CLIENT_ID=...
   SPOTIFY_CLIENT_SECRET=...
   SPOTIFY_REDIRECT_URI=http://localhost:8080/settings
+  SPOTIFY_API_BASE=https://api.spotify.com          # override to point at a local fake (benchmarks/)
+  SPOTIFY_ACCOUNTS_BASE=https://accounts.spotify.com
 """
 
 from __future__ import annotations
 
+import asyncio
 import base64
+import logging
 import os
 import time
 from datetime import datetime
@@ -38,6 +42,13 @@ from dotenv import load_dotenv
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
+import fast_json
+import http_cache
+from cache_utils import TTLCache
+from metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 # ---- Optional: Supabase (only used if creds exist) ----
@@ -55,9 +66,12 @@ if create_client and SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY:
   try:
     supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
   except Exception as e:
-    print("Supabase client init failed (Spotify tokens will not be saved):", e)
+    logger.warning("Supabase client init failed (Spotify tokens will not be saved): %s", e)
     supabase = None
 
+SPOTIFY_API_BASE = os.getenv("SPOTIFY_API_BASE", "https://api.spotify.com").rstrip("/")
+SPOTIFY_ACCOUNTS_BASE = os.getenv("SPOTIFY_ACCOUNTS_BASE", "https://accounts.spotify.com").rstrip("/")
+
 
 def get_spotify_env() -> tuple[str, str, Optional[str]]:
   client_id = os.getenv("SPOTIFY_CLIENT_ID") or os.getenv("VITE_SPOTIFY_CLIENT_ID")
@@ -70,6 +84,24 @@ def get_spotify_env() -> tuple[str, str, Optional[str]]:
 
 router = APIRouter()
 
+# Top tracks/artists move slowly (Spotify recomputes them roughly daily), so the
+# normalized /top payload is cached per (user_id, time_range) with a TTL that
+# grows with the window. The entry remembers the limit it was fetched with and
+# serves any smaller limit by slicing.
+TOP_CACHE_TTL_SECONDS = {
+  "short_term": 6 * 60 * 60,
+  "medium_term": 12 * 60 * 60,
+  "long_term": 24 * 60 * 60,
+}
+_top_cache = TTLCache(maxsize=2048, ttl=TOP_CACHE_TTL_SECONDS["short_term"])
+
+# Normalized track/artist metadata shared by /top, /recent and history stats.
+# Artist genres need a separate lookup, which is batched (50 ids per call).
+METADATA_TTL_SECONDS = 24 * 60 * 60
+METADATA_BATCH_SIZE = 50
+_track_cache = TTLCache(maxsize=10000, ttl=METADATA_TTL_SECONDS)
+_artist_cache = TTLCache(maxsize=5000, ttl=METADATA_TTL_SECONDS)
+
 
 # ---------- Models ----------
 class SpotifyTokenRequest(BaseModel):
@@ -104,21 +136,22 @@ def build_basic_auth_header(client_id: str, client_secret: str) -> dict[str, str
 async def spotify_post_token(data: dict, auth_header: dict[str, str]) -> dict:
   """POST to Spotify token endpoint with form-encoded data; return JSON or raise HTTPException."""
   try:
-    async with httpx.AsyncClient(timeout=20.0) as client:
-      resp = await client.post(
-        "https://accounts.spotify.com/api/token",
-        data=data,
-        headers={
-          **auth_header,
-          "Accept": "application/json",
-          "Content-Type": "application/x-www-form-urlencoded",
-        },
-      )
+    with track_upstream("spotify", "token"):
+      async with httpx.AsyncClient(timeout=20.0) as client:
+        resp = await client.post(
+          f"{SPOTIFY_ACCOUNTS_BASE}/api/token",
+          data=data,
+          headers={
+            **auth_header,
+            "Accept": "application/json",
+            "Content-Type": "application/x-www-form-urlencoded",
+          },
+        )
   except httpx.RequestError as e:
     raise HTTPException(status_code=502, detail=f"Network error to Spotify: {e!s}")
 
   if resp.status_code != 200:
-    print("Spotify token error:", resp.status_code, resp.text)
+    logger.warning("Spotify token error", extra={"status_code": resp.status_code, "body": resp.text[:500]})
     raise HTTPException(status_code=resp.status_code, detail=resp.text)
 
   return resp.json()
@@ -177,15 +210,16 @@ def get_user_tokens(user_id: str, raise_if_missing: bool = True) -> dict:
   if not supabase:
     raise HTTPException(status_code=500, detail="Supabase not configured on server")
   try:
-    res = (
-      supabase
-      .table("integrations")
-      .select("*")
-      .eq("user_id", user_id)
-      .eq("provider", "spotify")
-      .limit(1)
-      .execute()
-    )
+    with track_upstream("supabase", "integrations.select"):
+      res = (
+        supabase
+        .table("integrations")
+        .select("*")
+        .eq("user_id", user_id)
+        .eq("provider", "spotify")
+        .limit(1)
+        .execute()
+      )
     error = getattr(res, "error", None)
     if error:
       raise HTTPException(status_code=500, detail=f"Supabase error: {error}")
@@ -229,10 +263,11 @@ def upsert_tokens(user_id: str, data: dict, fallback_refresh: Optional[str] = No
       "scope": data.get("scope"),
       "meta": data,
     }
-    res = supabase.table("integrations").upsert(
-      payload,
-      on_conflict="user_id,provider",
-    ).execute()
+    with track_upstream("supabase", "integrations.upsert"):
+      res = supabase.table("integrations").upsert(
+        payload,
+        on_conflict="user_id,provider",
+      ).execute()
     error = getattr(res, "error", None)
     if error:
       raise HTTPException(status_code=500, detail=f"Supabase upsert error: {error}")
@@ -241,7 +276,7 @@ def upsert_tokens(user_id: str, data: dict, fallback_refresh: Optional[str] = No
     raise
   except Exception as e:
     msg = getattr(e, "detail", None) or getattr(e, "message", None) or str(e)
-    print("Failed to save Spotify tokens:", msg)
+    logger.error("Failed to save Spotify tokens: %s", msg)
     raise HTTPException(status_code=500, detail=f"Failed to save Spotify tokens: {msg}")
 
 
@@ -251,14 +286,15 @@ def delete_user_tokens(user_id: str) -> bool:
     raise HTTPException(status_code=500, detail="Supabase not configured on server")
 
   try:
-    res = (
-      supabase
-      .table("integrations")
-      .delete()
-      .eq("user_id", user_id)
-      .eq("provider", "spotify")
-      .execute()
-    )
+    with track_upstream("supabase", "integrations.delete"):
+      res = (
+        supabase
+        .table("integrations")
+        .delete()
+        .eq("user_id", user_id)
+        .eq("provider", "spotify")
+        .execute()
+      )
     data: Any = getattr(res, "data", None)
     if isinstance(data, list):
       return len(data) > 0
@@ -272,6 +308,30 @@ def delete_user_tokens(user_id: str) -> bool:
     raise HTTPException(status_code=500, detail=f"Failed to remove Spotify connection: {msg}")
 
 
+def get_cached_top(user_id: str, time_range: str, limit: int) -> Optional[dict]:
+  """Return cached /top payload if an entry fetched with >= limit items is still fresh."""
+  entry = _top_cache.get((user_id, time_range))
+  if not entry or entry["limit"] < limit:
+    return None
+  artists = entry["artists"][:limit]
+  return {"tracks": entry["tracks"][:limit], "artists": artists, "top_genres": aggregate_genres(artists)}
+
+
+def store_top(user_id: str, time_range: str, limit: int, tracks: list, artists: list) -> None:
+  """Cache a freshly fetched /top payload without downgrading a larger cached entry."""
+  key = (user_id, time_range)
+  existing = _top_cache.get(key)
+  if existing and existing["limit"] > limit:
+    return
+  ttl = TOP_CACHE_TTL_SECONDS.get(time_range, TOP_CACHE_TTL_SECONDS["short_term"])
+  _top_cache.set(key, {"limit": limit, "tracks": tracks, "artists": artists}, ttl=ttl)
+
+
+def invalidate_user_cache(user_id: str) -> None:
+  """Forget cached Spotify data for a user (new connection or disconnect)."""
+  _top_cache.delete_where(lambda key: key[0] == user_id)
+
+
 # ---------- Routes ----------
 @router.post("/token", response_model=SpotifyTokenResponse)
 async def exchange_token(req: SpotifyTokenRequest):
@@ -294,6 +354,7 @@ async def exchange_token(req: SpotifyTokenRequest):
 
   data = await spotify_post_token(payload, auth_header)
   saved = upsert_tokens(req.user_id, data)
+  invalidate_user_cache(req.user_id)
   return {**data, "saved": saved}
 
 
@@ -336,19 +397,20 @@ async def status(user_id: str = Query(...)):
     return {"connected": False}
 
   try:
-    res = (
-      supabase
-      .table("integrations")
-      .select("user_id,provider")
-      .eq("user_id", user_id)
-      .eq("provider", "spotify")
-      .limit(1)
-      .execute()
-    )
+    with track_upstream("supabase", "integrations.select"):
+      res = (
+        supabase
+        .table("integrations")
+        .select("user_id,provider")
+        .eq("user_id", user_id)
+        .eq("provider", "spotify")
+        .limit(1)
+        .execute()
+      )
     connected = bool(res.data)
     return {"connected": connected}
   except Exception as e:
-    print("Spotify status check error:", e)
+    logger.warning("Spotify status check error: %s", e)
     return {"connected": False}
 
 
@@ -356,13 +418,15 @@ async def status(user_id: str = Query(...)):
 async def disconnect(body: DisconnectRequest):
   """Delete the stored Spotify integration for the user."""
   disconnected = delete_user_tokens(body.user_id)
+  invalidate_user_cache(body.user_id)
   return {"disconnected": disconnected}
 
 
 # ---------- Data fetch helpers ----------
-async def ensure_access_token(user_id: str) -> str:
-  """Return a valid access token, refreshing if needed."""
-  row = get_user_tokens(user_id)
+async def ensure_access_token(user_id: str, row: Optional[dict] = None) -> str:
+  """Return a valid access token, refreshing if needed. Pass `row` when the integrations row is already loaded."""
+  if row is None:
+    row = get_user_tokens(user_id)
   access_token = row.get("access_token")
   refresh_token_value = row.get("refresh_token")
   expires_at = row.get("expires_at")
@@ -393,21 +457,181 @@ async def ensure_access_token(user_id: str) -> str:
   return access_token
 
 
-async def spotify_get(url: str, token: str, params: Optional[dict] = None) -> dict:
+async def spotify_get(url: str, token: str, params: Optional[dict] = None, user_id: Optional[str] = None) -> dict:
+  """
+  GET a Spotify API resource, revalidating cached bodies with ETags (treat result as read-only).
+  Only calls made for a user_id are kept in the ETag cache.
+  """
   try:
-    async with httpx.AsyncClient(timeout=20.0) as client:
-      resp = await client.get(
-        url,
-        params=params,
-        headers={"Authorization": f"Bearer {token}", "Accept": "application/json"},
-      )
+    result = await http_cache.conditional_get(
+      "spotify",
+      url,
+      headers={"Authorization": f"Bearer {token}", "Accept": "application/json"},
+      params=params,
+      cache_scope=user_id,
+    )
   except httpx.RequestError as e:
     raise HTTPException(status_code=502, detail=f"Network error to Spotify: {e!s}")
 
-  if resp.status_code != 200:
-    print("Spotify API error:", resp.status_code, resp.text)
-    raise HTTPException(status_code=resp.status_code, detail=resp.text)
-  return resp.json()
+  if result.status_code != 200:
+    logger.warning("Spotify API error", extra={"status_code": result.status_code, "url": url, "body": result.text[:500]})
+    raise HTTPException(status_code=result.status_code, detail=result.text)
+  return result.body
+
+
+# ---------- Metadata cache ----------
+def _first_image(images: Any) -> Optional[str]:
+  return ((images or [{}])[0] or {}).get("url")
+
+
+def normalize_track(t: dict) -> dict:
+  """Frontend shape for a track, memoized by Spotify id."""
+  track_id = t.get("id")
+  if track_id:
+    cached = _track_cache.get(track_id)
+    if cached is not None:
+      return cached["track"]
+  artists = [a for a in t.get("artists", []) if a]
+  album = t.get("album") or {}
+  normalized = {
+    "id": track_id,
+    "name": t.get("name"),
+    "artists": ", ".join([a.get("name", "") for a in artists]),
+    "album": album.get("name"),
+    "image": _first_image(album.get("images")),
+    "preview_url": t.get("preview_url"),
+    "url": (t.get("external_urls") or {}).get("spotify"),
+  }
+  if track_id:
+    artist_ids = [a["id"] for a in artists if a.get("id")]
+    _track_cache.set(track_id, {"track": normalized, "artist_ids": artist_ids})
+  return normalized
+
+
+def normalize_artist(a: dict) -> dict:
+  """Frontend shape for an artist, memoized by Spotify id."""
+  artist_id = a.get("id")
+  if artist_id:
+    cached = _artist_cache.get(artist_id)
+    if cached is not None:
+      return cached
+  normalized = {
+    "id": artist_id,
+    "name": a.get("name"),
+    "genres": a.get("genres", []),
+    "image": _first_image(a.get("images")),
+    "url": (a.get("external_urls") or {}).get("spotify"),
+  }
+  # Simplified artist objects (nested in tracks) carry no genres; only cache full ones.
+  if artist_id and "genres" in a:
+    _artist_cache.set(artist_id, normalized)
+  return normalized
+
+
+def _chunks(ids: list[str], size: int = METADATA_BATCH_SIZE) -> list[list[str]]:
+  return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+async def resolve_tracks(token: str, track_ids: list[str]) -> dict[str, dict]:
+  """Return {track_id: {"track", "artist_ids"}}, batch-fetching cache misses (50 ids per call)."""
+  resolved: dict[str, dict] = {}
+  missing: list[str] = []
+  for track_id in dict.fromkeys(i for i in track_ids if i):
+    cached = _track_cache.get(track_id)
+    if cached is not None:
+      resolved[track_id] = cached
+    else:
+      missing.append(track_id)
+
+  if missing:
+    pages = await asyncio.gather(*(
+      spotify_get(f"{SPOTIFY_API_BASE}/v1/tracks", token, params={"ids": ",".join(chunk)})
+      for chunk in _chunks(missing)
+    ))
+    for page in pages:
+      for t in page.get("tracks") or []:
+        if t and t.get("id"):
+          normalize_track(t)
+          cached = _track_cache.get(t["id"])
+          if cached is not None:
+            resolved[t["id"]] = cached
+  return resolved
+
+
+async def resolve_artists(token: str, artist_ids: list[str]) -> dict[str, dict]:
+  """Return {artist_id: artist}, batch-fetching cache misses via the several-artists endpoint."""
+  resolved: dict[str, dict] = {}
+  missing: list[str] = []
+  for artist_id in dict.fromkeys(i for i in artist_ids if i):
+    cached = _artist_cache.get(artist_id)
+    if cached is not None:
+      resolved[artist_id] = cached
+    else:
+      missing.append(artist_id)
+
+  if missing:
+    pages = await asyncio.gather(*(
+      spotify_get(f"{SPOTIFY_API_BASE}/v1/artists", token, params={"ids": ",".join(chunk)})
+      for chunk in _chunks(missing)
+    ))
+    for page in pages:
+      for a in page.get("artists") or []:
+        if a and a.get("id"):
+          resolved[a["id"]] = normalize_artist(a)
+  return resolved
+
+
+def aggregate_genres(artists: list[dict], weights: Optional[list[float]] = None, limit: int = 5) -> list[str]:
+  """Rank genres across artists (optionally weighted, e.g. by play count)."""
+  scores: dict[str, float] = {}
+  for index, artist in enumerate(artists):
+    weight = weights[index] if weights else 1.0
+    for genre in artist.get("genres") or []:
+      scores[genre] = scores.get(genre, 0.0) + weight
+  ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+  return [genre for genre, _ in ranked[:limit]]
+
+
+async def top_payload(user_id: str, limit: int, time_range: str, access_token: Optional[str] = None) -> dict:
+  """Top tracks/artists payload, from cache when possible (the token is only needed on a miss)."""
+  cached = get_cached_top(user_id, time_range, limit)
+  if cached is not None:
+    return cached
+
+  token = access_token or await ensure_access_token(user_id)
+  params = {"time_range": time_range, "limit": limit}
+  tracks_data, artists_data = await asyncio.gather(
+    spotify_get(f"{SPOTIFY_API_BASE}/v1/me/top/tracks", token, params=params, user_id=user_id),
+    spotify_get(f"{SPOTIFY_API_BASE}/v1/me/top/artists", token, params=params, user_id=user_id),
+  )
+
+  # Normalize a few fields for the frontend (memoized per track/artist id)
+  tracks = [normalize_track(t) for t in tracks_data.get("items", []) if t]
+  artists = [normalize_artist(a) for a in artists_data.get("items", []) if a]
+
+  store_top(user_id, time_range, limit, tracks, artists)
+  return {"tracks": tracks, "artists": artists, "top_genres": aggregate_genres(artists)}
+
+
+async def recent_payload(user_id: str, limit: int, access_token: Optional[str] = None) -> dict:
+  token = access_token or await ensure_access_token(user_id)
+  data = await spotify_get(
+    f"{SPOTIFY_API_BASE}/v1/me/player/recently-played",
+    token,
+    params={"limit": limit},
+    user_id=user_id,
+  )
+  items = []
+  for item in data.get("items", []):
+    track = item.get("track") or {}
+    items.append(
+      {
+        "id": track.get("id") or item.get("played_at"),
+        "played_at": item.get("played_at"),
+        "track": normalize_track(track),
+      }
+    )
+  return {"items": items}
 
 
 @router.get("/top")
@@ -418,44 +642,9 @@ async def top(
 ):
   """
   Get top tracks and artists (default short_term ≈ 4 weeks).
+  Served from cache when a fresh entry with at least `limit` items exists.
   """
-  token = await ensure_access_token(user_id)
-  tracks_data = await spotify_get(
-    "https://api.spotify.com/v1/me/top/tracks",
-    token,
-    params={"time_range": time_range, "limit": limit},
-  )
-  artists_data = await spotify_get(
-    "https://api.spotify.com/v1/me/top/artists",
-    token,
-    params={"time_range": time_range, "limit": limit},
-  )
-
-  # Normalize a few fields for the frontend
-  tracks = [
-    {
-      "id": t.get("id"),
-      "name": t.get("name"),
-      "artists": ", ".join([a.get("name", "") for a in t.get("artists", []) if a]),
-      "album": (t.get("album") or {}).get("name"),
-      "image": ((t.get("album") or {}).get("images") or [{}])[0].get("url"),
-      "preview_url": t.get("preview_url"),
-      "url": (t.get("external_urls") or {}).get("spotify"),
-    }
-    for t in tracks_data.get("items", [])
-  ]
-  artists = [
-    {
-      "id": a.get("id"),
-      "name": a.get("name"),
-      "genres": a.get("genres", []),
-      "image": (a.get("images") or [{}])[0].get("url"),
-      "url": (a.get("external_urls") or {}).get("spotify"),
-    }
-    for a in artists_data.get("items", [])
-  ]
-
-  return {"tracks": tracks, "artists": artists}
+  return fast_json.respond(await top_payload(user_id, limit, time_range))
 
 
 @router.get("/recent")
@@ -466,27 +655,4 @@ async def recent(
   """
   Get recently played tracks.
   """
-  token = await ensure_access_token(user_id)
-  data = await spotify_get(
-    "https://api.spotify.com/v1/me/player/recently-played",
-    token,
-    params={"limit": limit},
-  )
-  items = []
-  for item in data.get("items", []):
-    track = item.get("track") or {}
-    items.append(
-      {
-        "id": track.get("id") or item.get("played_at"),
-        "played_at": item.get("played_at"),
-        "track": {
-          "id": track.get("id"),
-          "name": track.get("name"),
-          "artists": ", ".join([a.get("name", "") for a in track.get("artists", []) if a]),
-          "album": (track.get("album") or {}).get("name"),
-          "image": ((track.get("album") or {}).get("images") or [{}])[0].get("url"),
-          "url": (track.get("external_urls") or {}).get("spotify"),
-        },
-      }
-    )
-  return {"items": items}
+  return fast_json.respond(await recent_payload(user_id, limit))
@@ -0,0 +1,279 @@
+# routers/spotify_history.py
+"""
+Spotify listening-history ingestion + stats.
+
+Spotify only remembers the last 50 plays, so a background job polls
+/me/player/recently-played for every connected user with the `after` cursor
+and keeps a compact copy of each play in Supabase:
+
+CREATE TABLE IF NOT EXISTS spotify_plays (
+  user_id uuid REFERENCES auth.users(id) ON DELETE CASCADE,
+  played_at timestamptz NOT NULL,
+  track_id text NOT NULL,
+  duration_ms integer NOT NULL DEFAULT 0,
+  PRIMARY KEY (user_id, played_at)
+);
+
+Monthly stats come from the `spotify_listening_stats` SQL function (see
+supabase/migrations), i.e. one query instead of repeated API calls.
+
+Env (python-backend/.env):
+  SPOTIFY_INGEST_INTERVAL_SECONDS=1800      # 0 disables the poller
+  SPOTIFY_INGEST_CONCURRENCY=4
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+import background_jobs
+import fast_json
+from metrics import track_upstream
+from routers import spotify
+
+logger = logging.getLogger(__name__)
+
+RECENTLY_PLAYED_URL = f"{spotify.SPOTIFY_API_BASE}/v1/me/player/recently-played"
+INGEST_INTERVAL_SECONDS = int(os.getenv("SPOTIFY_INGEST_INTERVAL_SECONDS", "1800"))
+INGEST_CONCURRENCY = max(1, int(os.getenv("SPOTIFY_INGEST_CONCURRENCY", "4")))
+
+router = APIRouter()
+
+# user_id -> newest ingested played_at (epoch ms); seeded from the table on first poll.
+_cursors: dict[str, int] = {}
+
+
+# ---------- Helpers ----------
+def parse_played_at(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        iso_val = value.replace("Z", "+00:00") if value.endswith("Z") else value
+        dt = datetime.fromisoformat(iso_val)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def to_epoch_ms(dt: datetime) -> int:
+    return int(dt.timestamp() * 1000)
+
+
+def month_bounds(month: Optional[str] = None) -> tuple[datetime, datetime]:
+    """Return UTC start/end for a 'YYYY-MM' month (defaults to the current month)."""
+    if month:
+        try:
+            start = datetime.strptime(month, "%Y-%m").replace(tzinfo=timezone.utc)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="month must be formatted as YYYY-MM")
+    else:
+        start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start, next_month - timedelta(microseconds=1)
+
+
+def list_connected_user_ids() -> list[str]:
+    sb = spotify.supabase
+    if not sb:
+        return []
+    with track_upstream("supabase", "integrations.select"):
+        res = sb.table("integrations").select("user_id").eq("provider", "spotify").execute()
+    rows = getattr(res, "data", None) or []
+    return [str(row["user_id"]) for row in rows if row.get("user_id")]
+
+
+def latest_played_cursor(user_id: str) -> Optional[int]:
+    """Newest stored play for a user as an epoch-ms cursor, if any."""
+    sb = spotify.supabase
+    if not sb:
+        return None
+    with track_upstream("supabase", "spotify_plays.select"):
+        res = (
+            sb.table("spotify_plays")
+            .select("played_at")
+            .eq("user_id", user_id)
+            .order("played_at", desc=True)
+            .limit(1)
+            .execute()
+        )
+    rows = getattr(res, "data", None) or []
+    played_at = parse_played_at(rows[0].get("played_at")) if rows else None
+    return to_epoch_ms(played_at) if played_at else None
+
+
+def extract_plays(user_id: str, items: list[dict]) -> list[dict]:
+    """Reduce recently-played items to compact rows, deduplicated by played_at."""
+    rows: dict[str, dict] = {}
+    for item in items:
+        track = item.get("track") or {}
+        played_at = parse_played_at(item.get("played_at"))
+        if not played_at or not track.get("id"):
+            continue
+        key = played_at.isoformat()
+        rows[key] = {
+            "user_id": user_id,
+            "played_at": key,
+            "track_id": track["id"],
+            "duration_ms": int(track.get("duration_ms") or 0),
+        }
+    return list(rows.values())
+
+
+def store_plays(rows: list[dict]) -> None:
+    sb = spotify.supabase
+    if not sb or not rows:
+        return
+    with track_upstream("supabase", "spotify_plays.upsert"):
+        res = (
+            sb.table("spotify_plays")
+            .upsert(rows, on_conflict="user_id,played_at", ignore_duplicates=True)
+            .execute()
+        )
+    error = getattr(res, "error", None)
+    if error:
+        raise HTTPException(status_code=500, detail=f"Supabase upsert error: {error}")
+
+
+async def ingest_user(user_id: str) -> int:
+    """Pull plays newer than the user's cursor and store them; returns rows written."""
+    cursor = _cursors.get(user_id)
+    if cursor is None:
+        cursor = await asyncio.to_thread(latest_played_cursor, user_id)
+
+    token = await spotify.ensure_access_token(user_id)
+    params: dict[str, Any] = {"limit": 50}
+    if cursor:
+        params["after"] = cursor
+    data = await spotify.spotify_get(RECENTLY_PLAYED_URL, token, params=params, user_id=user_id)
+
+    rows = extract_plays(user_id, data.get("items", []) or [])
+    # `after` is exclusive upstream, but guard against clock-equal replays anyway.
+    if cursor:
+        rows = [row for row in rows if to_epoch_ms(parse_played_at(row["played_at"])) > cursor]
+    await asyncio.to_thread(store_plays, rows)
+
+    if rows:
+        cursor = max(to_epoch_ms(parse_played_at(row["played_at"])) for row in rows)
+    if cursor:
+        _cursors[user_id] = cursor
+    return len(rows)
+
+
+async def ingest_all_users() -> dict:
+    """One polling pass over every connected user with bounded concurrency."""
+    user_ids = await asyncio.to_thread(list_connected_user_ids)
+    semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
+    stored = 0
+    failed = 0
+
+    async def run(user_id: str) -> None:
+        nonlocal stored, failed
+        async with semaphore:
+            try:
+                stored += await ingest_user(user_id)
+            except Exception as e:
+                failed += 1
+                logger.warning("Spotify history ingest failed: %s", e, extra={"user_id": user_id})
+
+    await asyncio.gather(*(run(user_id) for user_id in user_ids))
+    return {"users": len(user_ids), "plays_stored": stored, "failed": failed}
+
+
+def start_ingester() -> None:
+    if not spotify.supabase:
+        return
+    background_jobs.start_periodic(
+        "spotify_history", INGEST_INTERVAL_SECONDS, ingest_all_users, initial_delay=30
+    )
+
+
+def listening_stats(user_id: str, start: datetime, end: datetime, top: int = 5) -> dict:
+    """Minutes listened + top tracks for a window, computed in Postgres."""
+    sb = spotify.supabase
+    if not sb:
+        raise HTTPException(status_code=500, detail="Supabase not configured on server")
+    try:
+        with track_upstream("supabase", "rpc.spotify_listening_stats"):
+            res = sb.rpc(
+                "spotify_listening_stats",
+                {
+                    "p_user_id": user_id,
+                    "p_start": start.isoformat(),
+                    "p_end": end.isoformat(),
+                    "p_top": top,
+                },
+            ).execute()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load listening stats: {e}")
+
+    data = getattr(res, "data", None) or {}
+    if isinstance(data, list):
+        data = data[0] if data else {}
+    top_tracks = [
+        {
+            "track_id": row.get("track_id"),
+            "plays": int(row.get("plays") or 0),
+            "minutes": round(int(row.get("total_ms") or 0) / 60000, 1),
+        }
+        for row in data.get("top_tracks") or []
+    ]
+    return {
+        "play_count": int(data.get("play_count") or 0),
+        "total_minutes_listened": int(data.get("total_ms") or 0) // 60000,
+        "top_tracks": top_tracks,
+    }
+
+
+async def describe_top_tracks(user_id: str, top_tracks: list[dict]) -> tuple[list[dict], list[str]]:
+    """
+    Attach names to history top tracks and rank genres weighted by plays.
+    Track and artist metadata come from the shared Spotify cache; misses are
+    fetched in batches of 50 ids rather than one call per artist.
+    """
+    if not top_tracks:
+        return [], []
+    token = await spotify.ensure_access_token(user_id)
+    tracks = await spotify.resolve_tracks(token, [row["track_id"] for row in top_tracks])
+    artists = await spotify.resolve_artists(
+        token, [artist_id for meta in tracks.values() for artist_id in meta["artist_ids"]]
+    )
+
+    described: list[dict] = []
+    genre_artists: list[dict] = []
+    weights: list[float] = []
+    for row in top_tracks:
+        meta = tracks.get(row["track_id"]) or {}
+        track = meta.get("track") or {}
+        described.append({**row, "name": track.get("name"), "artists": track.get("artists")})
+        for artist_id in meta.get("artist_ids", []):
+            if artist_id in artists:
+                genre_artists.append(artists[artist_id])
+                weights.append(row["plays"])
+    return described, spotify.aggregate_genres(genre_artists, weights)
+
+
+# ---------- Routes ----------
+@router.get("/history/stats")
+async def history_stats(
+    user_id: str = Query(...),
+    month: Optional[str] = Query(None, description="YYYY-MM, defaults to the current month"),
+    top: int = Query(5, ge=1, le=50),
+):
+    """Listening minutes and top tracks for a month, from the ingested play history."""
+    start, end = month_bounds(month)
+    stats = listening_stats(user_id, start, end, top=top)
+    top_genres: list[str] = []
+    try:
+        stats["top_tracks"], top_genres = await describe_top_tracks(user_id, stats["top_tracks"])
+    except HTTPException as e:
+        # Stats are still useful without names (e.g. Spotify disconnected since ingest).
+        logger.warning("Spotify metadata lookup failed for history stats: %s", e.detail)
+    return fast_json.respond({"month": start.strftime("%Y-%m"), **stats, "top_genres": top_genres})
@@ -19,16 +19,23 @@ CREATE TABLE IF NOT EXISTS integrations (
   PRIMARY KEY (user_id, provider)
 );
 
+Fresh activity pages are also copied into `strava_activities` (see
+supabase/migrations) so /api/timeline can page through them without
+calling Strava.
+
 Env (python-backend/.env):
   SUPABASE_URL=...
   SUPABASE_SERVICE_ROLE_KEY=...             # server-only
   STRAVA_CLIENT_ID=176569
   STRAVA_CLIENT_SECRET=...
   STRAVA_REDIRECT_URI=http://localhost:8080/settings
+  STRAVA_BASE_URL=https://www.strava.com             # override to point at a local fake (benchmarks/)
 """
 
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
 import time
 from datetime import datetime
@@ -39,6 +46,12 @@ from dotenv import load_dotenv
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
+import fast_json
+import http_cache
+from metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
 # ---- Load envs early and safely ----
 load_dotenv()
 
@@ -57,9 +70,14 @@ if create_client and SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY:
     try:
         supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
     except Exception as e:
-        print("Supabase client init failed (tokens will not be saved):", e)
+        logger.warning("Supabase client init failed (tokens will not be saved): %s", e)
         supabase = None
 
+STRAVA_BASE_URL = os.getenv("STRAVA_BASE_URL", "https://www.strava.com").rstrip("/")
+
+# Keep references so fire-and-forget writes aren't garbage collected mid-run.
+_background_tasks: set[asyncio.Task] = set()
+
 # ---- Strava config is read at call-time to avoid import-order issues ----
 def get_strava_env() -> tuple[str, str, Optional[str]]:
     client_id = os.getenv("STRAVA_CLIENT_ID") or os.getenv("VITE_STRAVA_CLIENT_ID")
@@ -102,18 +120,19 @@ class DisconnectRequest(BaseModel):
 async def strava_post_token(data: dict) -> dict:
     """POST to Strava token endpoint with form-encoded data; return JSON or raise HTTPException."""
     try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            resp = await client.post(
-                "https://www.strava.com/oauth/token",
-                data=data,
-                headers={"Accept": "application/json"},
-            )
+        with track_upstream("strava", "token"):
+            async with httpx.AsyncClient(timeout=20.0) as client:
+                resp = await client.post(
+                    f"{STRAVA_BASE_URL}/oauth/token",
+                    data=data,
+                    headers={"Accept": "application/json"},
+                )
     except httpx.RequestError as e:
         raise HTTPException(status_code=502, detail=f"Network error to Strava: {e!s}")
 
     if resp.status_code != 200:
         # Surface Strava's error body to help debug (invalid_grant, invalid_client, etc.)
-        print("Strava token error:", resp.status_code, resp.text)
+        logger.warning("Strava token error", extra={"status_code": resp.status_code, "body": resp.text[:500]})
         raise HTTPException(status_code=resp.status_code, detail=resp.text)
 
     return resp.json()
@@ -149,17 +168,18 @@ def upsert_tokens(user_id: str, data: dict) -> bool:
             "scope": data.get("scope"),
             "meta": data,
         }
-        res = supabase.table("integrations").upsert(
-            payload,
-            on_conflict="user_id,provider",
-        ).execute()
+        with track_upstream("supabase", "integrations.upsert"):
+            res = supabase.table("integrations").upsert(
+                payload,
+                on_conflict="user_id,provider",
+            ).execute()
         error = getattr(res, "error", None)
         if error:
             raise HTTPException(status_code=500, detail=f"Supabase upsert error: {error}")
         return True
     except Exception as e:
         msg = getattr(e, "detail", None) or getattr(e, "message", None) or str(e)
-        print("Failed to save tokens:", msg)
+        logger.error("Failed to save Strava tokens: %s", msg)
         raise HTTPException(status_code=500, detail=f"Failed to save Strava tokens: {msg}")
 
 
@@ -168,15 +188,16 @@ def get_user_tokens(user_id: str) -> dict:
     if not supabase:
         raise HTTPException(status_code=500, detail="Supabase not configured on server")
     try:
-        res = (
-            supabase
-            .table("integrations")
-            .select("*")
-            .eq("user_id", user_id)
-            .eq("provider", "strava")
-            .limit(1)
-            .execute()
-        )
+        with track_upstream("supabase", "integrations.select"):
+            res = (
+                supabase
+                .table("integrations")
+                .select("*")
+                .eq("user_id", user_id)
+                .eq("provider", "strava")
+                .limit(1)
+                .execute()
+            )
         error = getattr(res, "error", None)
         if error:
             raise HTTPException(status_code=500, detail=f"Supabase error: {error}")
@@ -200,14 +221,15 @@ def delete_user_tokens(user_id: str) -> bool:
         raise HTTPException(status_code=500, detail="Supabase not configured on server")
 
     try:
-        res = (
-            supabase
-            .table("integrations")
-            .delete()
-            .eq("user_id", user_id)
-            .eq("provider", "strava")
-            .execute()
-        )
+        with track_upstream("supabase", "integrations.delete"):
+            res = (
+                supabase
+                .table("integrations")
+                .delete()
+                .eq("user_id", user_id)
+                .eq("provider", "strava")
+                .execute()
+            )
         # Some clients return list, others dict; coerce to bool safely
         data: Any = getattr(res, "data", None)
         if isinstance(data, list):
@@ -254,23 +276,93 @@ def token_expired(expires_at: Any) -> bool:
     return int(time.time()) >= (ts - 5)
 
 
-async def strava_get_activities(access_token: str, page: int = 1, per_page: int = 30) -> list[dict]:
-    """Fetch athlete activities with the given access token."""
+def activity_row(user_id: str, activity: dict) -> Optional[dict]:
+    if not activity.get("id") or not activity.get("start_date"):
+        return None
+    return {
+        "user_id": user_id,
+        "activity_id": int(activity["id"]),
+        "start_date": activity["start_date"],
+        "name": activity.get("name"),
+        "sport_type": activity.get("sport_type") or activity.get("type"),
+        "distance_m": float(activity.get("distance") or 0),
+        "moving_time_s": int(activity.get("moving_time") or 0),
+    }
+
+
+def store_activities(user_id: str, activities: list[dict]) -> None:
+    """Best-effort upsert of a fetched page into strava_activities."""
+    if not supabase:
+        return
+    rows = [row for row in (activity_row(user_id, activity) for activity in activities) if row]
+    if not rows:
+        return
     try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            resp = await client.get(
-                "https://www.strava.com/api/v3/athlete/activities",
-                params={"page": page, "per_page": per_page},
-                headers={"Authorization": f"Bearer {access_token}"},
-            )
+        with track_upstream("supabase", "strava_activities.upsert") as call_span:
+            call_span.set(rows=len(rows))
+            supabase.table("strava_activities").upsert(rows, on_conflict="user_id,activity_id").execute()
+    except Exception as e:
+        logger.warning("Failed to store Strava activities: %s", e, extra={"user_id": user_id})
+
+
+async def ensure_access_token(user_id: str, row: Optional[dict] = None) -> str:
+    """Return a valid access token, refreshing if needed. Pass `row` when the integrations row is already loaded."""
+    if row is None:
+        row = get_user_tokens(user_id)
+    access_token = row.get("access_token")
+    refresh_token_value = row.get("refresh_token")
+
+    if token_expired(row.get("expires_at")):
+        client_id, client_secret, _ = get_strava_env()
+        if not refresh_token_value:
+            raise HTTPException(status_code=400, detail="Token expired and no refresh token available")
+
+        data = await strava_post_token(
+            {
+                "client_id": client_id,
+                "client_secret": client_secret,
+                "grant_type": "refresh_token",
+                "refresh_token": refresh_token_value,
+            }
+        )
+        upsert_tokens(user_id, data)
+        access_token = data.get("access_token")
+
+    if not access_token:
+        raise HTTPException(status_code=400, detail="No access token available")
+    return access_token
+
+
+async def strava_get_activities(
+    access_token: str,
+    page: int = 1,
+    per_page: int = 30,
+    user_id: Optional[str] = None,
+) -> list[dict]:
+    """
+    Fetch athlete activities with the given access token (ETag-revalidated, read-only result).
+    With a user_id, a page that actually changed is also copied to strava_activities in the background.
+    """
+    try:
+        result = await http_cache.conditional_get(
+            "strava",
+            f"{STRAVA_BASE_URL}/api/v3/athlete/activities",
+            headers={"Authorization": f"Bearer {access_token}"},
+            params={"page": page, "per_page": per_page},
+            cache_scope=user_id,
+        )
     except httpx.RequestError as e:
         raise HTTPException(status_code=502, detail=f"Network error to Strava: {e!s}")
 
-    if resp.status_code != 200:
-        print("Strava activities error:", resp.status_code, resp.text)
-        raise HTTPException(status_code=resp.status_code, detail=resp.text)
+    if result.status_code != 200:
+        logger.warning("Strava activities error", extra={"status_code": result.status_code, "body": result.text[:500]})
+        raise HTTPException(status_code=result.status_code, detail=result.text)
 
-    return resp.json()
+    if user_id and not result.from_cache and result.body:
+        task = asyncio.get_running_loop().create_task(asyncio.to_thread(store_activities, user_id, list(result.body)))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    return result.body
 
 
 # ---------- Routes ----------
@@ -336,35 +428,9 @@ async def activities(
     Get recent athlete activities for a connected user.
     Automatically refreshes token if expired.
     """
-    # Load tokens
-    row = get_user_tokens(user_id)
-    access_token = row.get("access_token")
-    refresh_token_value = row.get("refresh_token")
-    expires_at = row.get("expires_at")
-
-    # If expired, refresh first
-    if token_expired(expires_at):
-        client_id, client_secret, _ = get_strava_env()
-        if not refresh_token_value:
-            raise HTTPException(status_code=400, detail="Token expired and no refresh token available")
-
-        data = await strava_post_token(
-            {
-                "client_id": client_id,
-                "client_secret": client_secret,
-                "grant_type": "refresh_token",
-                "refresh_token": refresh_token_value,
-            }
-        )
-        upsert_tokens(user_id, data)
-        access_token = data.get("access_token")
-
-    if not access_token:
-        raise HTTPException(status_code=400, detail="No access token available")
-
-    # Fetch activities
-    acts = await strava_get_activities(access_token, page=page, per_page=per_page)
-    return {"items": acts, "page": page, "per_page": per_page}
+    access_token = await ensure_access_token(user_id)
+    acts = await strava_get_activities(access_token, page=page, per_page=per_page, user_id=user_id)
+    return fast_json.respond({"items": acts, "page": page, "per_page": per_page})
 
 
 @router.get("/status")
@@ -376,11 +442,12 @@ async def status(user_id: str = Query(...)):
         return {"connected": False}
 
     try:
-        res = supabase.table("integrations").select("user_id,provider").eq("user_id", user_id).eq("provider", "strava").limit(1).execute()
+        with track_upstream("supabase", "integrations.select"):
+            res = supabase.table("integrations").select("user_id,provider").eq("user_id", user_id).eq("provider", "strava").limit(1).execute()
         connected = bool(res.data)
         return {"connected": connected}
     except Exception as e:
-        print("status check error:", e)
+        logger.warning("Strava status check error: %s", e)
         return {"connected": False}
 
 
@@ -0,0 +1,337 @@
+# routers/timeline.py
+"""
+One chronological feed of everything a user has: life updates, stored Strava
+activities, ingested Spotify plays and calendar highlights.
+
+Every item has a sort key (occurred_at, source, id), newest first. A page is
+built by asking each source for at most `limit` rows strictly older than the
+cursor key (an indexed range query, never OFFSET) and k-way merging the
+already-sorted lists with heapq.merge. Only the first `limit` merged items
+are returned; the key of the last one, base64-encoded, is the next cursor.
+Each page therefore costs one bounded query per source however far back the
+user has scrolled.
+
+Tables: life_updates, strava_activities, spotify_plays, calendar_highlights
+(see supabase/migrations for the timeline indexes).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+import heapq
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, HTTPException, Query
+
+import fast_json
+import storage_urls
+from metrics import track_upstream
+from routers import spotify
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Optional Supabase client (works when service role envs are present)
+try:
+    from supabase import Client, create_client  # type: ignore
+except Exception:
+    create_client = None
+    Client = None  # type: ignore
+
+SUPABASE_URL = os.getenv("SUPABASE_URL") or os.getenv("VITE_SUPABASE_URL")
+SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+supabase: Optional[Client] = None
+if create_client and SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY:
+    try:
+        supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    except Exception as e:  # pragma: no cover - best-effort init
+        logger.warning("Supabase init failed for /api/timeline routes: %s", e)
+        supabase = None
+
+MAX_PAGE_SIZE = 100
+# calendar_highlights stores up to this many highlights per (user, month) row.
+HIGHLIGHTS_PER_MONTH = 6
+
+router = APIRouter()
+
+# (occurred_at, source, id); compared as strings, newest first.
+SortKey = tuple[str, str, str]
+
+
+# ---------- Keys and cursors ----------
+def normalize_ts(value) -> Optional[str]:
+    """Canonical UTC ISO string so keys from different tables compare correctly."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def encode_cursor(key: SortKey) -> str:
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        occurred_at, source, item_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid timeline cursor")
+    occurred_at = normalize_ts(occurred_at)
+    if not occurred_at or source not in SOURCES:
+        raise HTTPException(status_code=400, detail="Invalid timeline cursor")
+    return occurred_at, source, str(item_id)
+
+
+def sort_key(item: dict) -> SortKey:
+    return item["occurred_at"], item["source"], item["key_id"]
+
+
+# ---------- Sources ----------
+@dataclass(frozen=True)
+class Source:
+    name: str
+    table: str
+    columns: str
+    ts_column: str
+    id_column: Optional[str]  # None when the timestamp alone is unique per user
+    to_item: Callable[[dict], Optional[dict]]
+    numeric_id: bool = False
+
+    def key_id(self, row: dict) -> str:
+        if not self.id_column:
+            return ""
+        value = row.get(self.id_column)
+        # Pad numeric ids so string order matches Postgres' numeric order.
+        return f"{int(value):020d}" if self.numeric_id else str(value)
+
+    def sql_id(self, key_id: str):
+        return int(key_id) if self.numeric_id else key_id
+
+
+def _life_update_item(row: dict) -> dict:
+    text = row.get("ai_summary") or row.get("user_summary") or ""
+    return {
+        "title": row.get("title") or "Life update",
+        "summary": text,
+        "photos": row.get("photos") or [],
+        "data": {"life_update_id": str(row.get("id"))},
+    }
+
+
+def _strava_item(row: dict) -> dict:
+    distance_km = round(float(row.get("distance_m") or 0) / 1000, 2)
+    return {
+        "title": row.get("name") or "Activity",
+        "summary": f"{distance_km} km {row.get('sport_type') or ''}".strip(),
+        "photos": [],
+        "data": {
+            "activity_id": row.get("activity_id"),
+            "sport_type": row.get("sport_type"),
+            "distance_km": distance_km,
+            "moving_time_minutes": round(int(row.get("moving_time_s") or 0) / 60),
+        },
+    }
+
+
+def _spotify_item(row: dict) -> dict:
+    return {
+        "title": None,  # filled in from the shared Spotify track cache
+        "summary": None,
+        "photos": [],
+        "data": {"track_id": row.get("track_id"), "duration_ms": row.get("duration_ms")},
+    }
+
+
+SOURCES: dict[str, Source] = {
+    source.name: source
+    for source in (
+        Source(
+            "life_update", "life_updates", "id, title, ai_summary, user_summary, created_at, photos",
+            "created_at", "id", _life_update_item,
+        ),
+        Source(
+            "strava", "strava_activities", "activity_id, start_date, name, sport_type, distance_m, moving_time_s",
+            "start_date", "activity_id", _strava_item, numeric_id=True,
+        ),
+        Source("spotify", "spotify_plays", "played_at, track_id, duration_ms", "played_at", None, _spotify_item),
+        # Calendar rows hold a month of highlights each; see fetch_calendar.
+        Source("calendar", "calendar_highlights", "month, highlights", "month", None, lambda row: row),
+    )
+}
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace('"', '\\"') + '"'
+
+
+def fetch_rows(source: Source, user_id: str, before: Optional[SortKey], limit: int) -> list[dict]:
+    """Up to `limit` items of one source that sort strictly after `before`, newest first."""
+    query = supabase.table(source.table).select(source.columns).eq("user_id", user_id)
+    if before:
+        ts, key_source, key_id = before
+        # Keyset condition on (ts, source, id) < cursor, reduced to this source's columns.
+        if source.name > key_source or (source.name == key_source and not source.id_column):
+            query = query.lt(source.ts_column, ts)
+        elif source.name < key_source:
+            query = query.lte(source.ts_column, ts)
+        else:
+            query = query.or_(
+                f"{source.ts_column}.lt.{_quote(ts)},"
+                f"and({source.ts_column}.eq.{_quote(ts)},{source.id_column}.lt.{source.sql_id(key_id)})"
+            )
+    query = query.order(source.ts_column, desc=True)
+    if source.id_column:
+        query = query.order(source.id_column, desc=True)
+
+    with track_upstream("supabase", f"{source.table}.select") as call_span:
+        res = query.limit(limit).execute()
+        rows = getattr(res, "data", None) or []
+        call_span.set(rows=len(rows))
+
+    items: list[dict] = []
+    for row in rows:
+        occurred_at = normalize_ts(row.get(source.ts_column))
+        if not occurred_at:
+            continue
+        key_id = source.key_id(row)
+        items.append({
+            "id": f"{source.name}:{key_id or occurred_at}",
+            "source": source.name,
+            "occurred_at": occurred_at,
+            "key_id": key_id,
+            **source.to_item(row),
+        })
+    return items
+
+
+def fetch_calendar(user_id: str, before: Optional[SortKey], limit: int) -> list[dict]:
+    """
+    Highlights are stored per month; expand the newest months and filter by key.
+    Months can hold fewer than HIGHLIGHTS_PER_MONTH highlights, so older month
+    rows are read (keyset on month) until `limit` items pass or none are left.
+    """
+    month_rows = max(1, -(-limit // HIGHLIGHTS_PER_MONTH)) + 1
+    upper = before[0][:7] if before else None
+    inclusive = True
+    items: list[dict] = []
+    while True:
+        query = (
+            supabase.table("calendar_highlights")
+            .select("month, highlights")
+            .eq("user_id", user_id)
+        )
+        if upper:
+            query = query.lte("month", upper) if inclusive else query.lt("month", upper)
+        with track_upstream("supabase", "calendar_highlights.select") as call_span:
+            res = query.order("month", desc=True).limit(month_rows).execute()
+            rows = getattr(res, "data", None) or []
+            call_span.set(rows=len(rows))
+
+        for row in rows:
+            month = row.get("month") or ""
+            for index, highlight in enumerate(row.get("highlights") or []):
+                # Rows written before highlights carried a start date sort at the start of their month.
+                occurred_at = normalize_ts(highlight.get("start")) or normalize_ts(f"{month}-01")
+                if not occurred_at:
+                    continue
+                key_id = f"{month}:{index:02d}"
+                item = {
+                    "id": f"calendar:{key_id}",
+                    "source": "calendar",
+                    "occurred_at": occurred_at,
+                    "key_id": key_id,
+                    "title": highlight.get("title"),
+                    "summary": highlight.get("date_label"),
+                    "photos": [],
+                    "data": {},
+                }
+                if before is None or sort_key(item) < before:
+                    items.append(item)
+        if len(items) >= limit or len(rows) < month_rows or not rows[-1].get("month"):
+            break
+        upper, inclusive = rows[-1]["month"], False
+    items.sort(key=sort_key, reverse=True)
+    return items[:limit]
+
+
+def fetch_source(name: str, user_id: str, before: Optional[SortKey], limit: int) -> list[dict]:
+    if name == "calendar":
+        return fetch_calendar(user_id, before, limit)
+    return fetch_rows(SOURCES[name], user_id, before, limit)
+
+
+async def describe_plays(user_id: str, items: list[dict]) -> None:
+    """Best-effort track names for the Spotify items on this page (cached lookups)."""
+    plays = [item for item in items if item["source"] == "spotify"]
+    if not plays:
+        return
+    try:
+        token = await spotify.ensure_access_token(user_id)
+        tracks = await spotify.resolve_tracks(token, [item["data"]["track_id"] for item in plays])
+    except HTTPException as e:
+        logger.warning("Spotify metadata lookup failed for timeline: %s", e.detail)
+        return
+    for item in plays:
+        track = (tracks.get(item["data"]["track_id"]) or {}).get("track") or {}
+        item["title"] = track.get("name")
+        item["summary"] = track.get("artists") or None
+        item["photos"] = [track["image"]] if track.get("image") else []
+
+
+# ---------- Routes ----------
+@router.get("")
+async def timeline(
+    user_id: str = Query(..., description="Supabase auth user id"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    sources: Optional[str] = Query(None, description="Comma-separated subset of life_update,strava,spotify,calendar"),
+):
+    """Newest-first page of the user's merged timeline."""
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Supabase not configured on server")
+    selected = [name.strip() for name in sources.split(",")] if sources else list(SOURCES)
+    unknown = [name for name in selected if name not in SOURCES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown timeline sources: {', '.join(unknown)}")
+    before = decode_cursor(cursor) if cursor else None
+
+    try:
+        per_source = await asyncio.gather(
+            *(asyncio.to_thread(fetch_source, name, user_id, before, limit) for name in selected)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load timeline: {e}")
+
+    # Each list is already sorted newest first, so a k-way merge yields the page in order.
+    merged = heapq.merge(*per_source, key=sort_key, reverse=True)
+    page = [item for _, item in zip(range(limit), merged)]
+    # More exists if the merge dropped items or a source filled its whole quota.
+    has_more = sum(len(items) for items in per_source) > limit or any(len(items) == limit for items in per_source)
+    next_cursor = encode_cursor(sort_key(page[-1])) if page and has_more else None
+
+    await describe_plays(user_id, page)
+    photo_lists = await asyncio.to_thread(storage_urls.resolve_many, supabase, [item["photos"] for item in page])
+    for item, photos in zip(page, photo_lists):
+        item["photos"] = photos
+    for item in page:
+        item.pop("key_id", None)
+    return fast_json.respond({"items": page, "next_cursor": next_cursor})
@@ -9,6 +9,8 @@ stubs external stats, and optionally calls OpenAI to draft a warm summary.
 
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
 from datetime import datetime, timedelta, timezone
 from typing import List, Optional
@@ -17,6 +19,16 @@ from dotenv import load_dotenv
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, Field
 
+import calendar_highlights
+import fast_json
+import group_wrap
+import storage_urls
+from cache_utils import TTLCache
+from metrics import track_upstream
+from routers import spotify_history
+
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 # Optional Supabase client (works when service role envs are present)
@@ -34,7 +46,7 @@ if create_client and SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY:
     try:
         supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
     except Exception as e:  # pragma: no cover - best-effort init
-        print("Supabase init failed for /api/wrap routes:", e)
+        logger.warning("Supabase init failed for /api/wrap routes: %s", e)
         supabase = None
 
 # Optional OpenAI client (kept isolated so the endpoint works even without a key)
@@ -49,6 +61,11 @@ openai_client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY and OpenAI else
 
 router = APIRouter()
 
+# Music and calendar aggregates per (user, month); shared by the user wrap and group wraps.
+# Plays are ingested every 30 min and highlights hourly, so a short TTL loses nothing.
+MEMBER_AGGREGATE_TTL_SECONDS = 10 * 60
+_member_aggregates = TTLCache(maxsize=4096, ttl=MEMBER_AGGREGATE_TTL_SECONDS)
+
 
 # ---------- Models ----------
 class CalendarHighlight(BaseModel):
@@ -91,6 +108,24 @@ class WrapResponse(BaseModel):
     hero_photo_url: Optional[str] = None
 
 
+class GroupWrapStats(BaseModel):
+    # Group totals only: every member can read the group wrap.
+    member_count: int = 0
+    active_members: int = 0
+    life_updates: int = 0
+    minutes_listened: int = 0
+
+
+class GroupWrapResponse(BaseModel):
+    group_id: str
+    month_label: str
+    recap: str
+    stats: GroupWrapStats = Field(default_factory=GroupWrapStats)
+    photo_urls: List[str] = Field(default_factory=list)
+    computed_at: Optional[str] = None
+    stale: bool = False  # a newer recap is being computed in the background
+
+
 # ---------- Helpers ----------
 def current_month_range() -> tuple[datetime, datetime]:
     """Return start/end datetimes (UTC) for the current month."""
@@ -112,26 +147,29 @@ def fetch_recent_life_updates(user_id: str, start: datetime, end: datetime) -> L
         return []
 
     try:
-        res = (
-            supabase.table("life_updates")
-            .select("id, title, ai_summary, user_summary, created_at, photos")
-            .eq("user_id", user_id)
-            .gte("created_at", start.isoformat())
-            .lte("created_at", end.isoformat())
-            .order("created_at", desc=True)
-            .limit(3)
-            .execute()
-        )
+        with track_upstream("supabase", "life_updates.select") as call_span:
+            res = (
+                supabase.table("life_updates")
+                .select("id, title, ai_summary, user_summary, created_at, photos")
+                .eq("user_id", user_id)
+                .gte("created_at", start.isoformat())
+                .lte("created_at", end.isoformat())
+                .order("created_at", desc=True)
+                .limit(3)
+                .execute()
+            )
+            call_span.set(rows=len(getattr(res, "data", None) or []))
         error = getattr(res, "error", None)
         if error:
             raise HTTPException(status_code=500, detail=f"Supabase error: {error}")
 
         items = getattr(res, "data", None) or []
+        # One signing call for every photo on the page (no-op with a public bucket).
+        photo_lists = storage_urls.resolve_many(supabase, [item.get("photos") or [] for item in items])
         snippets: List[LifeUpdateSnippet] = []
-        for item in items:
+        for item, photo_list in zip(items, photo_lists):
             text = item.get("ai_summary") or item.get("user_summary") or ""
             snippet = (text[:220] + ("…" if len(text) > 220 else "")) if text else None
-            photo_list = item.get("photos") or []
             snippets.append(
                 LifeUpdateSnippet(
                     id=str(item.get("id")),
@@ -145,10 +183,71 @@ def fetch_recent_life_updates(user_id: str, start: datetime, end: datetime) -> L
     except HTTPException:
         raise
     except Exception as e:
-        print("Failed to fetch life updates for wrap:", e)
+        logger.warning("Failed to fetch life updates for wrap: %s", e)
         return []
 
 
+async def fetch_music_summary(user_id: str, start: datetime, end: datetime) -> MusicSummary:
+    """Listening totals, top track and genres from the ingested Spotify history."""
+    try:
+        stats = spotify_history.listening_stats(user_id, start, end, top=20)
+    except Exception as e:
+        logger.warning("Failed to fetch listening stats for wrap: %s", e)
+        return MusicSummary()
+
+    summary = MusicSummary(total_minutes_listened=stats["total_minutes_listened"])
+    try:
+        tracks, genres = await spotify_history.describe_top_tracks(user_id, stats["top_tracks"])
+    except Exception as e:
+        logger.warning("Failed to resolve Spotify metadata for wrap: %s", e)
+        return summary
+    if tracks and tracks[0].get("name"):
+        top = tracks[0]
+        summary.top_track = f"{top['name']} — {top['artists']}" if top.get("artists") else top["name"]
+    summary.top_genres = genres
+    return summary
+
+
+def fetch_calendar_summary(user_id: str, month_key: str) -> tuple[CalendarSummary, bool]:
+    """
+    Read the precomputed highlight list; (summary, pending). Without a stored
+    row a computation is scheduled, but only for users with Google Calendar
+    connected; pending is True while the result may still change soon.
+    """
+    try:
+        row = calendar_highlights.load_highlights(user_id, month_key)
+    except Exception as e:
+        logger.warning("Failed to fetch calendar highlights for wrap: %s", e)
+        return CalendarSummary(), True
+    if row is None:
+        try:
+            pending = calendar_highlights.request_first_compute(user_id)
+        except Exception as e:
+            logger.warning("Failed to check Google Calendar connection for wrap: %s", e)
+            pending = True
+        return CalendarSummary(), pending
+    return CalendarSummary(
+        highlights=[CalendarHighlight(**item) for item in row.get("highlights") or []]
+    ), False
+
+
+async def member_month_aggregate(
+    user_id: str, start: datetime, end: datetime
+) -> tuple[MusicSummary, CalendarSummary]:
+    """Music + calendar summaries for one user's month, cached briefly."""
+    month_key = start.strftime("%Y-%m")
+    key = (user_id, month_key)
+    cached = _member_aggregates.get(key)
+    if cached is not None:
+        return cached
+    music_summary = await fetch_music_summary(user_id, start, end)
+    calendar_summary, pending = fetch_calendar_summary(user_id, month_key)
+    aggregate = (music_summary, calendar_summary)
+    # Highlights still being computed: recheck soon. Users without Google keep the full TTL.
+    _member_aggregates.set(key, aggregate, ttl=60 if pending else None)
+    return aggregate
+
+
 def build_prompt(
     month_label: str,
     updates: List[LifeUpdateSnippet],
@@ -182,25 +281,31 @@ def generate_ai_wrap_summary(
         f"This month ({month_label}) collected moments worth sharing. "
         f"Based on your recent updates, here are the highlights. #goodvibes #momentum #keepgoing"
     )
+    return complete_wrap_text(
+        prompt, fallback, "You write concise, kind month-in-review blurbs. Avoid marketing tone."
+    )
 
+
+def complete_wrap_text(prompt: str, fallback: str, system_prompt: str) -> str:
+    """One LLM call for a wrap blurb; returns `fallback` without OpenAI or on failure."""
     if not openai_client:
         return fallback
 
     try:
-        response = openai_client.responses.create(
-            model="gpt-5-mini",
-            input=[
-                {
-                    "role": "system",
-                    "content": "You write concise, kind month-in-review blurbs. Avoid marketing tone.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-        )
+        with track_upstream("openai", "responses.create") as call_span:
+            call_span.set(model="gpt-5-mini", prompt_chars=len(prompt))
+            response = openai_client.responses.create(
+                model="gpt-5-mini",
+                input=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt},
+                ],
+            )
         output_text = getattr(response, "output_text", None) or fallback
+        call_span.set(output_chars=len(output_text))
         return output_text.strip()
     except Exception as e:  # pragma: no cover - network dependent
-        print("OpenAI summarization failed, using fallback:", e)
+        logger.warning("OpenAI summarization failed, using fallback: %s", e)
         return fallback
 
 
@@ -213,7 +318,7 @@ async def get_this_month_wrap(
     """
     Combined payload used by the This Month Wrapped page.
     - user_id arrives via query param: /api/wrap/this-month?user_id=...
-    - Life updates pull from Supabase; other integrations are mocked for now.
+    - Life updates, listening totals and calendar highlights pull from Supabase; Strava is still empty.
     - Swap the mock helpers with real API calls without changing the frontend contract.
     """
     if not user_id:
@@ -223,15 +328,14 @@ async def get_this_month_wrap(
     month_label = start.strftime("%B %Y")
 
     life_updates = fetch_recent_life_updates(user_id, start, end)
-    # Strava/Music/Calendar remain empty until real integration data is wired in; do not fabricate values.
+    # Strava remains empty until real integration data is wired in; do not fabricate values.
     strava_summary = StravaSummary()
-    music_summary = MusicSummary()
-    calendar_summary = CalendarSummary()
+    music_summary, calendar_summary = await member_month_aggregate(user_id, start, end)
     ai_summary = generate_ai_wrap_summary(month_label, life_updates, user_prompt)
     all_photos: List[str] = [url for update in life_updates for url in (update.photo_urls or []) if url]
     hero_photo = all_photos[0] if all_photos else None
 
-    return WrapResponse(
+    wrap = WrapResponse(
         month_label=month_label,
         ai_summary=ai_summary,
         strava=strava_summary,
@@ -241,3 +345,47 @@ async def get_this_month_wrap(
         photo_urls=all_photos,
         hero_photo_url=hero_photo,
     )
+    # Built from validated models already; skip the response_model round trip when FAST_JSON is on.
+    return fast_json.respond(wrap)
+
+
+@router.get("/group/this-month", response_model=GroupWrapResponse)
+async def get_group_wrap(
+    group_id: str = Query(..., description="Group id"),
+    user_id: str = Query(..., description="Supabase auth user id; must be a member of the group"),
+):
+    """
+    Shared recap for a group's month. Served from the stored batch result;
+    if a member posted since, the stored recap is returned marked stale while
+    a recompute runs in the background. Only a group's first read computes inline.
+    """
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Supabase not configured on server")
+
+    month, member_ids, _, current = await group_wrap.current_state(group_id)
+    if user_id not in member_ids:
+        raise HTTPException(status_code=404, detail="Group not found")
+
+    row = await asyncio.to_thread(group_wrap.load_group_wrap, group_id, month)
+    stale = False
+    if row is None:
+        row = await group_wrap.refresh_group(group_id)
+    elif row.get("fingerprint") != current:
+        stale = True
+        group_wrap.request_refresh(group_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+
+    start, _ = current_month_range()
+    photo_urls = await asyncio.to_thread(storage_urls.resolve_urls, supabase, row.get("photo_urls") or [])
+    return fast_json.respond(
+        GroupWrapResponse(
+            group_id=group_id,
+            month_label=start.strftime("%B %Y"),
+            recap=row.get("recap") or "",
+            stats=GroupWrapStats(**(row.get("stats") or {})),
+            photo_urls=photo_urls,
+            computed_at=row.get("computed_at"),
+            stale=stale,
+        )
+    )
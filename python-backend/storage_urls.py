@@ -0,0 +1,105 @@
+"""
+Photo URLs for responses, ready for a private storage bucket.
+
+Life updates keep the stable public-form URL of each photo
+(.../storage/v1/object/public/<bucket>/<path>). With PHOTO_URL_MODE=public
+those URLs are returned as they are. With PHOTO_URL_MODE=signed every
+response maps them to signed URLs:
+
+- all paths of a response are signed in one create_signed_urls call,
+- signed URLs are cached per path until SIGNED_URL_REFRESH_MARGIN_SECONDS
+  before they expire, so repeated reads cost no storage round trip at all.
+
+URLs that don't point into the bucket (external images) pass through.
+
+Env (python-backend/.env):
+  PHOTO_URL_MODE=public                     # "signed" for a private bucket
+  SIGNED_URL_TTL_SECONDS=3600
+  SIGNED_URL_REFRESH_MARGIN_SECONDS=300
+  SUPABASE_BUCKET=...
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Iterable
+
+from backend_utils import storage_path_from_url
+from cache_utils import TTLCache
+from metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
+PHOTO_URL_MODE = os.getenv("PHOTO_URL_MODE", "public").lower()
+SIGNED_URL_TTL_SECONDS = int(os.getenv("SIGNED_URL_TTL_SECONDS", "3600"))
+SIGNED_URL_REFRESH_MARGIN_SECONDS = int(os.getenv("SIGNED_URL_REFRESH_MARGIN_SECONDS", "300"))
+SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET")
+SUPABASE_URL = (os.getenv("SUPABASE_URL") or os.getenv("VITE_SUPABASE_URL") or "").rstrip("/")
+SIGN_BATCH_SIZE = 500
+
+# path -> signed URL, dropped SIGNED_URL_REFRESH_MARGIN_SECONDS before the URL expires.
+_signed = TTLCache(
+    maxsize=20_000,
+    ttl=max(1, SIGNED_URL_TTL_SECONDS - SIGNED_URL_REFRESH_MARGIN_SECONDS),
+)
+
+
+def signing_enabled() -> bool:
+    return PHOTO_URL_MODE == "signed" and bool(SUPABASE_BUCKET)
+
+
+def _absolute(signed_url: str) -> str:
+    # Older storage clients return the path relative to /storage/v1.
+    if signed_url.startswith("/") and SUPABASE_URL:
+        return f"{SUPABASE_URL}/storage/v1{signed_url}"
+    return signed_url
+
+
+def sign_paths(sb: Any, paths: Iterable[str]) -> dict[str, str]:
+    """{path: signed URL}, signing cache misses in batched calls."""
+    found: dict[str, str] = {}
+    missing: list[str] = []
+    for path in dict.fromkeys(paths):
+        cached = _signed.get(path)
+        if cached:
+            found[path] = cached
+        else:
+            missing.append(path)
+    if not missing or not sb:
+        return found
+
+    bucket = sb.storage.from_(SUPABASE_BUCKET)
+    for start in range(0, len(missing), SIGN_BATCH_SIZE):
+        chunk = missing[start:start + SIGN_BATCH_SIZE]
+        try:
+            with track_upstream("supabase", "storage.create_signed_urls") as call_span:
+                call_span.set(paths=len(chunk))
+                items = bucket.create_signed_urls(chunk, SIGNED_URL_TTL_SECONDS)
+        except Exception as e:
+            logger.warning("Signing photo URLs failed: %s", e, extra={"paths": len(chunk)})
+            continue
+        for item in items or []:
+            signed_url = item.get("signedURL") or item.get("signedUrl")
+            if item.get("error") or not signed_url or not item.get("path"):
+                continue
+            found[item["path"]] = _absolute(signed_url)
+            _signed.set(item["path"], found[item["path"]])
+    return found
+
+
+def resolve_urls(sb: Any, urls: list[str]) -> list[str]:
+    """Browser-usable URLs for stored photo URLs, in order (signed when enabled)."""
+    if not urls or not signing_enabled():
+        return list(urls)
+    paths = [storage_path_from_url(url, SUPABASE_BUCKET) for url in urls]
+    signed = sign_paths(sb, [path for path in paths if path])
+    # Unsigned paths (errors) keep their original URL rather than disappearing.
+    return [signed.get(path, url) if path else url for url, path in zip(urls, paths)]
+
+
+def resolve_many(sb: Any, url_lists: list[list[str]]) -> list[list[str]]:
+    """resolve_urls for several photo lists with a single signing round trip."""
+    flat = [url for urls in url_lists for url in urls]
+    resolved = iter(resolve_urls(sb, flat))
+    return [[next(resolved) for _ in urls] for urls in url_lists]
@@ -0,0 +1,37 @@
+"""
+Backend unit tests. Run from python-backend/:
+  python -m pytest tests
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def call_asgi(app, path: str, query: bytes = b"", method: str = "GET", headers=None) -> dict:
+    """Drive an ASGI app with one request; returns status, headers (dict) and body."""
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query,
+        "headers": headers or [],
+        "client": ("127.0.0.1", 1234),
+    }
+    response: dict = {"status": None, "headers": {}, "body": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {key.decode(): value.decode() for key, value in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response
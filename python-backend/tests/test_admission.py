@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import ipaddress
+import json
+import time
+
+import pytest
+
+import admission
+from admission import AdmissionMiddleware, Rule
+from conftest import call_asgi
+
+
+SECRET = "test-jwt-secret"
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters(monkeypatch):
+    monkeypatch.setattr(admission, "_limiters", {})
+    monkeypatch.setattr(admission, "JWT_SECRET", SECRET)
+    monkeypatch.setattr(admission, "TRUSTED_PROXIES", [])
+
+
+def make_token(sub: str, exp: float = None, secret: str = SECRET, alg: str = "HS256") -> str:
+    def encode(part) -> str:
+        return base64.urlsafe_b64encode(json.dumps(part).encode()).decode().rstrip("=")
+
+    signing_input = f"{encode({'alg': alg, 'typ': 'JWT'})}.{encode({'sub': sub, 'exp': exp or time.time() + 60})}"
+    signature = hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{base64.urlsafe_b64encode(signature).decode().rstrip('=')}"
+
+
+def bearer(sub: str, **kwargs) -> list:
+    return [(b"authorization", f"Bearer {make_token(sub, **kwargs)}".encode())]
+
+
+def scope_for(headers=None, client=("203.0.113.9", 4000), query=b"") -> dict:
+    return {"headers": headers or [], "client": client, "query_string": query}
+
+
+def ok_app(release: asyncio.Event = None):
+    async def app(scope, receive, send):
+        if release is not None:
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+def test_rate_limit_returns_429_with_retry_after():
+    middleware = AdmissionMiddleware(ok_app(), rules=[Rule("/api/spotify/", rate_per_minute=6, burst=2)])
+
+    async def run():
+        return [await call_asgi(middleware, "/api/spotify/top", headers=bearer("u1")) for _ in range(3)] + [
+            await call_asgi(middleware, "/api/spotify/top", headers=bearer("u2")),
+        ]
+
+    first, second, limited, other_user = asyncio.run(run())
+    assert [first["status"], second["status"], other_user["status"]] == [200, 200, 200]
+    assert limited["status"] == 429
+    assert 1 <= int(limited["headers"]["retry-after"]) <= 10
+    assert json.loads(limited["body"])["reason"] == "rate_limited"
+
+
+def test_user_id_param_does_not_pick_a_fresh_bucket():
+    middleware = AdmissionMiddleware(ok_app(), rules=[Rule("/summarize-update", rate_per_minute=6, burst=2)])
+
+    async def run():
+        return [
+            await call_asgi(middleware, "/summarize-update", f"user_id=u{index}".encode(), method="POST")
+            for index in range(3)
+        ]
+
+    assert [response["status"] for response in asyncio.run(run())] == [200, 200, 429]
+
+
+def test_user_key_uses_verified_token_subject():
+    assert admission.user_key(scope_for(bearer("alice"))) == "user:alice"
+    assert admission.user_key(scope_for([(b"authorization", b"bearer " + make_token("alice").encode())])) == "user:alice"
+
+
+@pytest.mark.parametrize("headers", [
+    bearer("alice", secret="wrong-secret"),
+    bearer("alice", exp=time.time() - 1),
+    bearer("alice", alg="none"),
+    [(b"authorization", b"Bearer not.a.jwt")],
+    [(b"authorization", b"Basic YWxpY2U6cHc=")],
+])
+def test_user_key_ignores_unverified_tokens(headers):
+    assert admission.user_key(scope_for(headers)) == "ip:203.0.113.9"
+
+
+def test_user_key_needs_a_secret_to_trust_tokens(monkeypatch):
+    monkeypatch.setattr(admission, "JWT_SECRET", "")
+    assert admission.user_key(scope_for(bearer("alice"))) == "ip:203.0.113.9"
+
+
+def test_forwarded_for_is_ignored_from_untrusted_peers():
+    headers = [(b"x-forwarded-for", b"198.51.100.1")]
+    assert admission.user_key(scope_for(headers)) == "ip:203.0.113.9"
+
+
+def test_forwarded_for_uses_nearest_untrusted_hop(monkeypatch):
+    monkeypatch.setattr(admission, "TRUSTED_PROXIES", [ipaddress.ip_network("10.0.0.0/8")])
+    # The client can prepend anything; only the hop appended by our proxy counts.
+    headers = [(b"x-forwarded-for", b"1.1.1.1, 198.51.100.7, 10.0.0.3")]
+    assert admission.user_key(scope_for(headers, client=("10.0.0.2", 80))) == "ip:198.51.100.7"
+    assert admission.user_key(scope_for([], client=("10.0.0.2", 80))) == "ip:10.0.0.2"
+
+
+def test_exempt_and_unmatched_paths_pass_through():
+    middleware = AdmissionMiddleware(ok_app(), rules=[Rule("/api/spotify/", rate_per_minute=6, burst=1)])
+
+    async def run():
+        paths = ["/api/spotify/top", "/api/spotify/status", "/api/spotify/status", "/metrics", "/metrics"]
+        return [await call_asgi(middleware, path, b"user_id=u1") for path in paths]
+
+    assert [response["status"] for response in asyncio.run(run())] == [200] * 5
+
+
+def test_full_queue_and_queue_timeout_return_503():
+    release = asyncio.Event()
+    rule = Rule("/summarize-update", concurrency=1, max_queue=1, queue_timeout=0.05)
+    middleware = AdmissionMiddleware(ok_app(release), rules=[rule])
+
+    async def run():
+        running = asyncio.ensure_future(call_asgi(middleware, "/summarize-update", method="POST"))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(call_asgi(middleware, "/summarize-update", method="POST"))
+        await asyncio.sleep(0)
+        shed = await call_asgi(middleware, "/summarize-update", method="POST")
+        timed_out = await queued
+        release.set()
+        return await running, shed, timed_out
+
+    running, shed, timed_out = asyncio.run(run())
+    assert running["status"] == 200
+    assert shed["status"] == 503 and json.loads(shed["body"])["reason"] == "queue_full"
+    assert timed_out["status"] == 503 and json.loads(timed_out["body"])["reason"] == "queue_timeout"
+    assert int(shed["headers"]["retry-after"]) >= 1
+    assert int(timed_out["headers"]["retry-after"]) >= 1
+    limiter = admission._limiters["/summarize-update"]
+    assert (limiter.active, limiter.waiting) == (0, 0)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import pytest
+
+import cache_utils
+from cache_utils import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_utils.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_get_set_and_stats(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("missing", "default") == "default"
+    assert cache.stats() == {"size": 1, "maxsize": 4, "hits": 1, "misses": 2, "hit_rate": 0.3333}
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=30)
+    clock[0] += 10
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert len(cache) == 1
+
+
+def test_falsy_values_are_cached(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("flag", False)
+    assert cache.get("flag", "default") is False
+
+
+def test_lru_eviction_keeps_recently_read_entries(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_pop_delete_where_and_clear(clock):
+    cache = TTLCache(maxsize=8, ttl=10)
+    for key in [("u1", "top"), ("u1", "recent"), ("u2", "top")]:
+        cache.set(key, key)
+    assert cache.pop(("u2", "top")) == ("u2", "top")
+    assert cache.pop(("u2", "top"), "gone") == "gone"
+    assert cache.delete_where(lambda key: key[0] == "u1") == 2
+    assert len(cache) == 0
+    cache.set("x", 1)
+    cache.clear()
+    assert cache.get("x") is None
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import pytest
+
+from benchmarks import bench_calendar_classifier as bench
+from routers import google_calendar as gc
+
+
+def legacy_scan(summary):
+    return bench.legacy_sanitize_summary_text(summary), bench.legacy_looks_like_work_event(summary)
+
+
+def test_scan_summary_matches_legacy_on_synthetic_corpus():
+    summaries = [event["summary"] for event in bench.synthetic_events(5000)]
+    mismatches = [summary for summary in summaries if gc.scan_summary(summary) != legacy_scan(summary)]
+    assert mismatches == []
+
+
+@pytest.mark.parametrize("summary", bench.EDGE_SUMMARIES + [
+    None,
+    "",
+    "Standup",
+    "1:1 with Sam",
+    "Dinner with BOB@Corp.com",
+    "HTTPS://Example.com/Path Review",
+    "Call 555-123-4567 re: launch",
+])
+def test_scan_summary_matches_legacy_on_edge_cases(summary):
+    assert gc.scan_summary(summary) == legacy_scan(summary)
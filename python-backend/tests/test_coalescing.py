@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+import coalescing
+from coalescing import CoalescingMiddleware
+from conftest import call_asgi
+
+
+@pytest.fixture(autouse=True)
+def no_inflight(monkeypatch):
+    monkeypatch.setattr(coalescing, "_inflight", {})
+
+
+def counting_app(release: asyncio.Event, fail_first: bool = False):
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await release.wait()
+        if fail_first and len(calls) == 1:
+            raise RuntimeError("upstream blew up")
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": f"call {len(calls)}".encode()})
+
+    return app, calls
+
+
+async def start_duplicates(middleware, count: int, query: bytes = b"user_id=u1&limit=5"):
+    tasks = [asyncio.ensure_future(call_asgi(middleware, "/api/spotify/top", query)) for _ in range(count)]
+    await asyncio.sleep(0)
+    return tasks
+
+
+def test_followers_replay_the_leader_response():
+    async def run():
+        release = asyncio.Event()
+        app, calls = counting_app(release)
+        middleware = CoalescingMiddleware(app, paths=("/api/spotify/top",))
+        tasks = await start_duplicates(middleware, 4)
+        # Same parameters in a different order share the key.
+        tasks += await start_duplicates(middleware, 1, b"limit=5&user_id=u1")
+        release.set()
+        return await asyncio.gather(*tasks), calls
+
+    responses, calls = asyncio.run(run())
+    assert len(calls) == 1
+    assert {(response["status"], response["body"]) for response in responses} == {(200, b"call 1")}
+    assert coalescing._inflight == {}
+
+
+def test_leader_failure_makes_followers_rerun():
+    async def run():
+        release = asyncio.Event()
+        app, calls = counting_app(release, fail_first=True)
+        middleware = CoalescingMiddleware(app, paths=("/api/spotify/top",))
+        leader, follower = await start_duplicates(middleware, 2)
+        release.set()
+        return await asyncio.gather(leader, follower, return_exceptions=True), calls
+
+    (leader, follower), calls = asyncio.run(run())
+    assert isinstance(leader, RuntimeError)
+    assert follower["status"] == 200 and follower["body"] == b"call 2"
+    assert len(calls) == 2
+    assert coalescing._inflight == {}
+
+
+def test_other_methods_and_paths_are_not_coalesced():
+    async def run():
+        release = asyncio.Event()
+        release.set()
+        app, calls = counting_app(release)
+        middleware = CoalescingMiddleware(app, paths=("/api/spotify/top",))
+        await asyncio.gather(
+            call_asgi(middleware, "/api/spotify/top", method="POST"),
+            call_asgi(middleware, "/api/spotify/top", method="POST"),
+            call_asgi(middleware, "/api/spotify/topx"),
+            call_asgi(middleware, "/api/spotify/topx"),
+        )
+        return calls
+
+    assert len(asyncio.run(run())) == 4
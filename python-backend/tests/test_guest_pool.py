@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from routers import guest
+
+
+class FakeAdmin:
+    """auth.admin stand-in: counts creations and the peak number running at once."""
+
+    def __init__(self):
+        self.fail = False
+        self.created: list[dict] = []
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def create_user(self, payload: dict):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            time.sleep(0.01)
+            if self.fail:
+                raise RuntimeError("auth down")
+            with self._lock:
+                self.created.append(payload)
+                user_id = f"user-{len(self.created)}"
+            return SimpleNamespace(user=SimpleNamespace(id=user_id))
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def __getattr__(self, name):
+        raise AssertionError(f"unexpected admin call: {name}")
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    fake = FakeAdmin()
+    monkeypatch.setattr(guest, "supabase", SimpleNamespace(auth=SimpleNamespace(admin=fake)))
+    monkeypatch.setattr(guest, "_pool", deque())
+    monkeypatch.setattr(guest, "_refill_lock", asyncio.Lock())
+    monkeypatch.setattr(guest, "_pool_stats", {name: 0 for name in guest._pool_stats})
+    monkeypatch.setattr(guest, "_below_low_water_since", None)
+    monkeypatch.setattr(guest, "_last_refill_lag", None)
+    monkeypatch.setattr(guest, "_max_refill_lag", 0.0)
+    monkeypatch.setattr(guest, "POOL_LOW_WATER", 5)
+    monkeypatch.setattr(guest, "POOL_REFILL_CONCURRENCY", 2)
+    # Claims would otherwise start a background refill and race the assertions.
+    monkeypatch.setattr(guest, "request_refill", lambda: None)
+    return fake
+
+
+def pooled(index: int, age: timedelta = timedelta(0)) -> guest.PooledGuest:
+    created_at = datetime.now(timezone.utc) - age
+    expires_at = created_at + timedelta(hours=guest.POOL_TTL_HOURS, days=guest.GUEST_SESSION_DAYS)
+    return guest.PooledGuest(f"pooled-{index}", f"pooled-{index}@guest.local", "pw", created_at, expires_at)
+
+
+def test_refill_respects_low_water_and_concurrency(admin):
+    assert asyncio.run(guest.refill_pool()) == 5
+    assert len(guest._pool) == 5
+    assert admin.peak == 2
+    assert asyncio.run(guest.refill_pool()) == 0
+    assert len(admin.created) == 5
+
+
+def test_pooled_accounts_carry_their_final_expiry(admin):
+    asyncio.run(guest.refill_pool())
+    account = guest._pool[0]
+    assert account.expires_at - account.created_at == timedelta(hours=guest.POOL_TTL_HOURS, days=guest.GUEST_SESSION_DAYS)
+    assert admin.created[0]["user_metadata"]["expires_at"] == account.expires_at.isoformat()
+
+
+def test_refill_stops_when_every_creation_fails(admin):
+    admin.fail = True
+    assert asyncio.run(guest.refill_pool()) == 0
+    assert guest._pool_stats["create_failures"] == 2
+    assert guest._pool_stats["refills"] == 1
+
+
+def test_claim_takes_exactly_one_account_without_admin_calls(admin):
+    guest._pool.extend(pooled(index) for index in range(3))
+    session = asyncio.run(guest.create_guest_session())
+    assert session.user_id == "pooled-0"
+    assert [account.user_id for account in guest._pool] == ["pooled-1", "pooled-2"]
+    assert admin.created == []
+    assert guest._pool_stats["claimed"] == 1
+    remaining = datetime.fromisoformat(session.expires_at) - datetime.now(timezone.utc)
+    assert remaining >= timedelta(days=guest.GUEST_SESSION_DAYS)
+
+
+def test_concurrent_claims_never_share_an_account(admin):
+    guest._pool.extend(pooled(index) for index in range(4))
+
+    async def run():
+        return await asyncio.gather(*(guest.create_guest_session() for _ in range(6)))
+
+    user_ids = [session.user_id for session in asyncio.run(run())]
+    assert len(set(user_ids)) == 6
+    assert sorted(user_id for user_id in user_ids if user_id.startswith("pooled-")) == [f"pooled-{i}" for i in range(4)]
+    assert guest._pool_stats["claimed"] == 4
+    assert guest._pool_stats["fallback_created"] == 2
+
+
+def test_stale_account_is_skipped_and_empty_pool_creates_inline(admin):
+    guest._pool.append(pooled(0, age=timedelta(hours=guest.POOL_TTL_HOURS, minutes=1)))
+    session = asyncio.run(guest.create_guest_session())
+    assert session.user_id == "user-1"
+    assert len(guest._pool) == 0
+    assert guest._pool_stats["discarded_stale"] == 1
+    assert guest._pool_stats["fallback_created"] == 1
+    assert admin.created[0]["user_metadata"]["expires_at"] == session.expires_at
+
+
+def test_pool_stats_and_metrics(admin):
+    guest._pool.extend([pooled(0, age=timedelta(minutes=10)), pooled(1)])
+    asyncio.run(guest.create_guest_session())
+    stats = guest.pool_stats()
+    assert stats["enabled"] is True
+    assert (stats["size"], stats["low_water"], stats["claimed"]) == (1, 5, 1)
+    assert stats["oldest_age_seconds"] < 60
+    assert stats["current_refill_lag_seconds"] >= 0.0
+
+    collected = {name: samples for name, _kind, _help, samples in guest._collect_metrics()}
+    assert collected["guest_pool_size"] == [({}, 1)]
+    assert collected["guest_pool_low_water"] == [({}, 5)]
+    events = {labels["event"]: value for labels, value in collected["guest_pool_events_total"]}
+    assert events == {name: stats[name] for name in guest._pool_stats}
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from routers import timeline
+
+
+def make_item(source: str, occurred_at: str, key_id: str) -> dict:
+    return {
+        "id": f"{source}:{key_id}",
+        "source": source,
+        "occurred_at": timeline.normalize_ts(occurred_at),
+        "key_id": key_id,
+        "photos": [],
+        "data": {},
+    }
+
+
+# Ties on occurred_at across and within sources exercise the (ts, source, id) key.
+ITEMS = [
+    make_item("life_update", "2026-10-03T10:00:00Z", "b"),
+    make_item("life_update", "2026-10-03T10:00:00Z", "a"),
+    make_item("strava", "2026-10-03T10:00:00Z", f"{7:020d}"),
+    make_item("strava", "2026-10-02T08:30:00+02:00", f"{12:020d}"),
+    make_item("spotify", "2026-10-02T06:30:00Z", ""),
+    make_item("spotify", "2026-10-01T23:59:59.5Z", ""),
+    make_item("calendar", "2026-10-02T06:30:00Z", "2026-10:00"),
+    make_item("calendar", "2026-09-30T12:00:00Z", "2026-09:01"),
+    make_item("life_update", "2026-09-01T00:00:00Z", "c"),
+]
+
+
+def fake_fetch_source(name, user_id, before, limit):
+    rows = [item for item in ITEMS if item["source"] == name]
+    if before:
+        rows = [item for item in rows if timeline.sort_key(item) < before]
+    rows.sort(key=timeline.sort_key, reverse=True)
+    return [dict(item) for item in rows[:limit]]
+
+
+@pytest.fixture
+def fake_sources(monkeypatch):
+    monkeypatch.setattr(timeline, "supabase", object())
+    monkeypatch.setattr(timeline, "fetch_source", fake_fetch_source)
+    monkeypatch.setattr(timeline.storage_urls, "resolve_many", lambda sb, lists: lists)
+
+
+def load_page(cursor=None, limit=3) -> dict:
+    response = asyncio.run(timeline.timeline(user_id="u1", limit=limit, cursor=cursor, sources=None))
+    return response if isinstance(response, dict) else json.loads(response.body)
+
+
+def test_cursor_round_trip():
+    key = (timeline.normalize_ts("2026-10-02T08:30:00+02:00"), "strava", f"{12:020d}")
+    assert timeline.decode_cursor(timeline.encode_cursor(key)) == key
+    assert key[0] == "2026-10-02T06:30:00.000000+00:00"
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", timeline.encode_cursor(("2026-10-01", "nope", "x")), "W10"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        timeline.decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, len(ITEMS)])
+def test_pages_cover_every_item_newest_first(fake_sources, limit):
+    expected = [item["id"] for item in sorted(ITEMS, key=timeline.sort_key, reverse=True)]
+    seen: list[str] = []
+    cursor = None
+    for _ in range(len(ITEMS) + 1):
+        page = load_page(cursor, limit)
+        assert len(page["items"]) <= limit
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+
+
+class FakeHighlightsQuery:
+    """The calendar_highlights query chain fetch_calendar builds, over in-memory rows."""
+
+    def __init__(self, rows: list[dict], log: list):
+        self.rows = rows
+        self.log = log
+        self.filters = []
+        self.row_limit = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row[column] == value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda row: row[column] <= value)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda row: row[column] < value)
+        return self
+
+    def order(self, column, desc=False):
+        return self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    def execute(self):
+        rows = sorted((row for row in self.rows if all(f(row) for f in self.filters)), key=lambda row: row["month"], reverse=True)
+        self.log.append(len(rows[: self.row_limit]))
+        return type("Result", (), {"data": rows[: self.row_limit]})()
+
+
+class FakeHighlightsClient:
+    def __init__(self, rows: list[dict]):
+        self.rows = rows
+        self.queries: list[int] = []
+
+    def table(self, name):
+        assert name == "calendar_highlights"
+        return FakeHighlightsQuery(self.rows, self.queries)
+
+
+def sparse_months(count: int) -> list[dict]:
+    """One highlight per month, newest month first (2026-12 back)."""
+    rows = []
+    for offset in range(count):
+        year, month = 2026 - offset // 12, 12 - offset % 12
+        rows.append({
+            "user_id": "u1",
+            "month": f"{year}-{month:02d}",
+            "highlights": [{"title": f"h{offset}", "start": f"{year}-{month:02d}-15T10:00:00Z"}],
+        })
+    return rows
+
+
+def test_fetch_calendar_reads_older_months_when_they_are_sparse(monkeypatch):
+    client = FakeHighlightsClient(sparse_months(30) + [{"user_id": "other", "month": "2026-11", "highlights": [{"title": "x"}]}])
+    monkeypatch.setattr(timeline, "supabase", client)
+    items = timeline.fetch_calendar("u1", None, 20)
+    assert [item["title"] for item in items] == [f"h{offset}" for offset in range(20)]
+    assert len(client.queries) > 1
+
+    before = timeline.sort_key(items[-1])
+    rest = timeline.fetch_calendar("u1", before, 20)
+    assert [item["title"] for item in rest] == [f"h{offset}" for offset in range(20, 30)]
+    assert timeline.fetch_calendar("u1", timeline.sort_key(rest[-1]), 20) == []
+
+
+def test_sparse_calendar_feed_pages_to_the_end(monkeypatch):
+    monkeypatch.setattr(timeline, "supabase", FakeHighlightsClient(sparse_months(45)))
+    monkeypatch.setattr(timeline.storage_urls, "resolve_many", lambda sb, lists: lists)
+    titles: list[str] = []
+    cursor = None
+    for _ in range(10):
+        response = asyncio.run(timeline.timeline(user_id="u1", limit=20, cursor=cursor, sources="calendar"))
+        page = response if isinstance(response, dict) else json.loads(response.body)
+        titles += [item["title"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert titles == [f"h{offset}" for offset in range(45)]
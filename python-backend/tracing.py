@@ -0,0 +1,201 @@
+"""
+Lightweight request tracing with structured JSON logs.
+
+Every HTTP request gets a request id (the incoming X-Request-ID header, or a
+fresh one) held in a contextvar, so it follows the request through awaits,
+asyncio tasks and asyncio.to_thread. span() times a unit of work and logs it
+as one JSON line with its parent span, duration and any attributes (sizes,
+status codes, row counts). metrics.track_upstream opens a span too, so every
+Supabase query, provider HTTP call and LLM call shows up under the request
+that made it.
+
+Background jobs get their own id per run (see background_jobs.py).
+
+A slow request can be broken down with e.g.
+  jq 'select(.request_id == "...") | [.span, .duration_ms]'
+
+Env (python-backend/.env):
+  LOG_LEVEL=INFO
+  LOG_FORMAT=json                           # or "text" for local development
+  TRACE_SPANS=1                             # 0 keeps logs but drops span lines
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import secrets
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Iterator, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+TRACE_SPANS = os.getenv("TRACE_SPANS", "1") not in ("0", "false", "no")
+REQUEST_ID_HEADER = "x-request-id"
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+span_logger = logging.getLogger("trace")
+
+# Attributes every LogRecord has; anything else was passed via `extra=` and is emitted as a field.
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def new_id() -> str:
+    return secrets.token_hex(8)
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "attrs", "started")
+
+    def __init__(self, name: str, parent: Optional["Span"], attrs: dict[str, Any]):
+        self.name = name
+        self.span_id = new_id()
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = attrs
+        self.started = time.perf_counter()
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span]:
+    """Time a block as a child of the current span and log it when it ends."""
+    current = Span(name, _current_span.get(), attrs)
+    token = _current_span.set(current)
+    status = "ok"
+    try:
+        yield current
+    except BaseException as exc:
+        status = "error"
+        current.attrs.setdefault("error", f"{type(exc).__name__}: {exc}"[:300])
+        raise
+    finally:
+        _current_span.reset(token)
+        if TRACE_SPANS:
+            span_logger.info(
+                name,
+                extra={
+                    "span": name,
+                    "span_id": current.span_id,
+                    "parent_id": current.parent_id,
+                    "duration_ms": round((time.perf_counter() - current.started) * 1000, 2),
+                    "status": status,
+                    **current.attrs,
+                },
+            )
+
+
+@contextmanager
+def request_context(request_id: Optional[str] = None) -> Iterator[str]:
+    """Bind a request id for the enclosed block (a new one if none is given)."""
+    request_id = request_id or new_id()
+    token = _request_id.set(request_id)
+    try:
+        yield request_id
+    finally:
+        _request_id.reset(token)
+
+
+def route_template(scope: dict) -> str:
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        # Unmatched paths (404s, scanners) share one label to keep cardinality bounded.
+        return "<unmatched>"
+    # Depending on the FastAPI version the route path may or may not include the
+    # include_router prefix; prefixes here are static, so take it from the request path.
+    parts = scope.get("path", "").split("/")
+    depth = template.count("/")
+    prefix = "/".join(parts[: len(parts) - depth]) if depth < len(parts) else ""
+    return prefix + template
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = _request_id.get()
+        if request_id:
+            payload["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = {k: v for k, v in record.__dict__.items() if k not in _RESERVED_ATTRS and not k.startswith("_")}
+        request_id = _request_id.get()
+        if request_id:
+            fields["request_id"] = request_id
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+def configure_logging() -> None:
+    """Send app logs (and span lines) to stdout in the configured format."""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+    # Upstream calls already have spans; httpx's per-request INFO lines would just duplicate them.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+class TracingMiddleware:
+    """Binds a request id, wraps the request in a root span and echoes X-Request-ID."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for key, value in scope.get("headers") or []:
+            if key == REQUEST_ID_HEADER.encode():
+                incoming = value.decode("latin-1")[:64]
+                break
+
+        with request_context(incoming) as request_id:
+            with span("http.request", method=scope.get("method"), path=scope.get("path")) as root:
+
+                async def send_wrapper(message):
+                    if message["type"] == "http.response.start":
+                        root.set(status_code=message["status"])
+                        headers = list(message.get("headers") or [])
+                        headers.append((REQUEST_ID_HEADER.encode(), request_id.encode()))
+                        message = {**message, "headers": headers}
+                    await send(message)
+
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    root.set(route=route_template(scope))
@@ -1,3 +1,5 @@
+import { supabase } from "@/integrations/supabase/client";
+
 const DEFAULT_API_PORT = (import.meta.env.VITE_API_PORT as string) || "8000";
 
 const stripTrailingSlash = (value: string) => value.replace(/\/+$/, "");
@@ -34,3 +36,10 @@ export const buildApiUrl = (path: string) => {
   }
   return `${API_BASE_URL}${path}`;
 };
+
+// Bearer token for the backend; admission control rate-limits per signed-in user.
+export const authHeaders = async (): Promise<Record<string, string>> => {
+  const { data } = await supabase.auth.getSession();
+  const token = data.session?.access_token;
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
@@ -32,7 +32,7 @@ import {
   type CalendarSettings,
   type SanitizedCalendarEvent,
 } from "@/integrations/google/auth";
-import { API_BASE_URL } from "@/lib/apiBase";
+import { API_BASE_URL, authHeaders } from "@/lib/apiBase";
 
 type StravaActivity = {
   id: number;
@@ -174,8 +174,7 @@ const handlePhotoUpload = (e: React.ChangeEvent<HTMLInputElement>) => {
       const { data: { user } } = await supabase.auth.getUser();
       setUserId(user?.id ?? null);
       if (user?.id) {
-        fetchStravaActivities(user.id);
-        fetchSpotifyData(user.id);
+        fetchDashboard(user.id);
         loadCalendarPreferences(user.id);
         fetchGoogleData(user.id);
       }
@@ -199,6 +198,59 @@ const handlePhotoUpload = (e: React.ChangeEvent<HTMLInputElement>) => {
     return () => clearTimeout(id);
   }, [isSubmitting, loadingStep, loadingMessages.length]);
 
+  // Initial load: Strava + Spotify in one round trip; the per-section refresh buttons use the dedicated fetchers below.
+  const fetchDashboard = async (uid: string) => {
+    setActivitiesLoading(true);
+    setActivitiesError(null);
+    setSpotifyLoading(true);
+    setSpotifyError(null);
+    try {
+      const res = await fetch(`${API_BASE_URL}/api/dashboard?user_id=${encodeURIComponent(uid)}&strava_per_page=5&top_limit=5&recent_limit=6`, {
+        headers: await authHeaders(),
+      });
+      if (!res.ok) {
+        const text = await res.text().catch(() => "");
+        throw new Error(text || `Failed with ${res.status}`);
+      }
+      const { sections } = await res.json();
+      const { strava, spotify_top: spotifyTop, spotify_recent: spotifyRecent } = sections;
+
+      setStravaConnected(strava.status !== "not_connected");
+      if (strava.status === "ok") {
+        setStravaActivities(strava.data?.items || []);
+      } else {
+        setStravaActivities([]);
+        setActivitiesError(
+          strava.status === "not_connected"
+            ? "Strava not connected. Connect to pull workouts."
+            : strava.error || "Could not load Strava data"
+        );
+      }
+
+      setSpotifyConnected(spotifyTop.status !== "not_connected");
+      if (spotifyTop.status === "not_connected") {
+        setSpotifyTopTracks([]);
+        setSpotifyTopArtists([]);
+        setSpotifyRecent([]);
+        setSpotifyError("Spotify not connected. Connect in Settings to pull listening data.");
+      } else {
+        setSpotifyTopTracks(spotifyTop.data?.tracks || []);
+        setSpotifyTopArtists(spotifyTop.data?.artists || []);
+        setSpotifyRecent(spotifyRecent.data?.items || []);
+        const failed = [spotifyTop, spotifyRecent].find((section) => section.status === "error");
+        setSpotifyError(failed ? failed.error || "Could not load Spotify data" : null);
+      }
+    } catch (err: unknown) {
+      console.error("Failed to load dashboard", err);
+      const message = err instanceof Error ? err.message : "Could not load integrations";
+      setActivitiesError(message);
+      setSpotifyError(message);
+    } finally {
+      setActivitiesLoading(false);
+      setSpotifyLoading(false);
+    }
+  };
+
   const fetchStravaActivities = async (uid: string) => {
     setActivitiesLoading(true);
     setActivitiesError(null);
@@ -215,7 +267,9 @@ const handlePhotoUpload = (e: React.ChangeEvent<HTMLInputElement>) => {
         console.warn("Could not verify Strava status", statusError);
       }
 
-      const res = await fetch(`${API_BASE_URL}/api/strava/activities?user_id=${encodeURIComponent(uid)}&per_page=5`);
+      const res = await fetch(`${API_BASE_URL}/api/strava/activities?user_id=${encodeURIComponent(uid)}&per_page=5`, {
+        headers: await authHeaders(),
+      });
       if (!res.ok) {
         const text = await res.text().catch(() => "");
         if (res.status === 401 || res.status === 403) {
@@ -252,14 +306,18 @@ const handlePhotoUpload = (e: React.ChangeEvent<HTMLInputElement>) => {
         return;
       }
 
-      const topRes = await fetch(`${API_BASE_URL}/api/spotify/top?user_id=${encodeURIComponent(uid)}&limit=5&time_range=short_term`);
+      const topRes = await fetch(`${API_BASE_URL}/api/spotify/top?user_id=${encodeURIComponent(uid)}&limit=5&time_range=short_term`, {
+        headers: await authHeaders(),
+      });
       if (!topRes.ok) {
         const text = await topRes.text().catch(() => "");
         throw new Error(text || `Failed to load Spotify top tracks (${topRes.status})`);
       }
       const top = await topRes.json();
 
-      const recentRes = await fetch(`${API_BASE_URL}/api/spotify/recent?user_id=${encodeURIComponent(uid)}&limit=6`);
+      const recentRes = await fetch(`${API_BASE_URL}/api/spotify/recent?user_id=${encodeURIComponent(uid)}&limit=6`, {
+        headers: await authHeaders(),
+      });
       if (!recentRes.ok) {
         const text = await recentRes.text().catch(() => "");
         throw new Error(text || `Failed to load recent listening (${recentRes.status})`);
@@ -462,6 +520,7 @@ const handlePhotoUpload = (e: React.ChangeEvent<HTMLInputElement>) => {
 
         const response = await fetch(`${API_BASE_URL}/summarize-update`, {
           method: "POST",
+          headers: await authHeaders(),
           body: fd, // IMPORTANT: no manual Content-Type header
           // credentials / headers as needed (CORS, auth, etc.)
         });
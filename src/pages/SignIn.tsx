@@ -1,6 +1,7 @@
 import { useState } from "react";
 import { useNavigate } from "react-router-dom";
 import { supabase } from "@/integrations/supabase/client";
+import { API_BASE_URL } from "@/lib/apiBase";
 import { Input } from "@/components/ui/input";
 import { Button } from "@/components/ui/button";
 import { Card, CardHeader, CardContent, CardTitle } from "@/components/ui/card";
@@ -18,8 +19,19 @@ export default function SignIn() {
   const handleSignIn = async (e: React.FormEvent) => {
     e.preventDefault();
     setLoading(true);
-    const { error } = await supabase.auth.signInWithPassword({ email, password });
+    const { data, error } = await supabase.auth.signInWithPassword({ email, password });
     setLoading(false);
+    if (data?.user?.id) {
+      // Fire-and-forget: refresh integration tokens and warm caches before the first page loads.
+      fetch(`${API_BASE_URL}/api/prefetch`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          ...(data.session ? { Authorization: `Bearer ${data.session.access_token}` } : {}),
+        },
+        body: JSON.stringify({ user_id: data.user.id }),
+      }).catch(() => undefined);
+    }
     if (error) {
       toast({
         title: "Sign in failed",
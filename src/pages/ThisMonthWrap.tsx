@@ -3,7 +3,7 @@ import { useLocation, useNavigate } from "react-router-dom";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { supabase } from "@/integrations/supabase/client";
-import { API_BASE_URL } from "@/lib/apiBase";
+import { API_BASE_URL, authHeaders } from "@/lib/apiBase";
 import {
   Activity,
   CalendarDays,
@@ -196,7 +196,7 @@ export default function ThisMonthWrap() {
         url.searchParams.set("user_prompt", userPrompt);
       }
 
-      const res = await fetch(url.toString());
+      const res = await fetch(url.toString(), { headers: await authHeaders() });
       if (!res.ok) {
         const text = await res.text().catch(() => "");
         throw new Error(text || `Failed to load wrap (${res.status})`);
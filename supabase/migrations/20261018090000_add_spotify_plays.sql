@@ -0,0 +1,53 @@
+-- Compact Spotify listening history ingested by the Python backend.
+-- Spotify only exposes the last 50 plays, so the backend polls
+-- /me/player/recently-played and keeps one row per play here.
+create table if not exists public.spotify_plays (
+  user_id uuid not null references auth.users(id) on delete cascade,
+  played_at timestamptz not null,
+  track_id text not null,
+  duration_ms integer not null default 0,
+  primary key (user_id, played_at)
+);
+
+-- Rows are written with the service role; users may only read their own plays.
+alter table public.spotify_plays enable row level security;
+
+drop policy if exists "Users can view their own plays" on public.spotify_plays;
+create policy "Users can view their own plays"
+on public.spotify_plays
+for select
+using (auth.uid() = user_id);
+
+-- Aggregate a user's listening window in a single round trip.
+create or replace function public.spotify_listening_stats(
+  p_user_id uuid,
+  p_start timestamptz,
+  p_end timestamptz,
+  p_top integer default 5
+)
+returns jsonb
+language sql
+stable
+as $$
+  select jsonb_build_object(
+    'play_count', count(*),
+    'total_ms', coalesce(sum(p.duration_ms), 0),
+    'top_tracks', coalesce((
+      select jsonb_agg(t)
+      from (
+        select track_id, count(*) as plays, sum(duration_ms) as total_ms
+        from public.spotify_plays
+        where user_id = p_user_id
+          and played_at >= p_start
+          and played_at <= p_end
+        group by track_id
+        order by count(*) desc, sum(duration_ms) desc
+        limit p_top
+      ) t
+    ), '[]'::jsonb)
+  )
+  from public.spotify_plays p
+  where p.user_id = p_user_id
+    and p.played_at >= p_start
+    and p.played_at <= p_end;
+$$;
@@ -0,0 +1,19 @@
+-- Precomputed calendar highlights for the monthly wrap.
+-- The Python backend refreshes one row per user and month in the background
+-- so /api/wrap/this-month can read a ready, sanitized list.
+create table if not exists public.calendar_highlights (
+  user_id uuid not null references auth.users(id) on delete cascade,
+  month text not null,
+  highlights jsonb not null default '[]'::jsonb,
+  fingerprint text,
+  computed_at timestamptz not null default now(),
+  primary key (user_id, month)
+);
+
+alter table public.calendar_highlights enable row level security;
+
+drop policy if exists "Users can view their own calendar highlights" on public.calendar_highlights;
+create policy "Users can view their own calendar highlights"
+on public.calendar_highlights
+for select
+using (auth.uid() = user_id);
@@ -0,0 +1,29 @@
+-- Compact copy of Strava activities, written by the Python backend whenever
+-- it fetches a fresh page from Strava. Feeds /api/timeline.
+create table if not exists public.strava_activities (
+  user_id uuid not null references auth.users(id) on delete cascade,
+  activity_id bigint not null,
+  start_date timestamptz not null,
+  name text,
+  sport_type text,
+  distance_m double precision not null default 0,
+  moving_time_s integer not null default 0,
+  primary key (user_id, activity_id)
+);
+
+-- Timeline pages walk a user's activities newest first.
+create index if not exists strava_activities_user_start_idx
+  on public.strava_activities (user_id, start_date desc, activity_id desc);
+
+-- Life updates are paged the same way.
+create index if not exists life_updates_user_created_idx
+  on public.life_updates (user_id, created_at desc, id desc);
+
+-- Rows are written with the service role; users may only read their own activities.
+alter table public.strava_activities enable row level security;
+
+drop policy if exists "Users can view their own activities" on public.strava_activities;
+create policy "Users can view their own activities"
+on public.strava_activities
+for select
+using (auth.uid() = user_id);
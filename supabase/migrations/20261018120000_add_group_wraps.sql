@@ -0,0 +1,29 @@
+-- Batch-computed monthly recap per group.
+-- The Python backend writes one row per group and month and only recomputes
+-- it (one LLM call) after a member posts, joins or leaves.
+create table if not exists public.group_wraps (
+  group_id uuid not null references public.groups(id) on delete cascade,
+  month text not null,
+  recap text not null,
+  -- Group totals only; per-member listening/calendar data is never stored here.
+  stats jsonb not null default '{}'::jsonb,
+  photo_urls jsonb not null default '[]'::jsonb,
+  fingerprint text,
+  computed_at timestamptz not null default now(),
+  primary key (group_id, month)
+);
+
+alter table public.group_wraps enable row level security;
+
+drop policy if exists "Group members can view group wraps" on public.group_wraps;
+create policy "Group members can view group wraps"
+on public.group_wraps
+for select
+using (
+  exists (
+    select 1
+    from public.group_members gm
+    where gm.group_id = group_wraps.group_id
+      and gm.user_id = auth.uid()
+  )
+);
@@ -0,0 +1,18 @@
+-- Index of content-addressed photos in the storage bucket.
+-- The Python backend stores each distinct image once at objects/<aa>/<sha256><ext>
+-- and looks it up here before uploading, so retries and re-shares skip the upload.
+create table if not exists public.photo_objects (
+  sha256 text primary key,
+  path text not null unique,
+  bytes integer not null,
+  content_type text,
+  created_at timestamptz not null default now(),
+  last_seen_at timestamptz not null default now()
+);
+
+-- Guest cleanup checks whether other updates still point at a shared photo.
+create index if not exists life_updates_photos_gin_idx
+  on public.life_updates using gin (photos);
+
+-- Only the service role reads or writes the index.
+alter table public.photo_objects enable row level security;